@@ -2,5 +2,6 @@ from .productos import router as productos_router
 from .pagos import router as pagos_router
 from .usuarios import router as usuarios_router
 from .divisas import router as divisas_router
+from .contacto import router as contacto_router
 
-__all__ = ["productos_router", "pagos_router", "usuarios_router", "divisas_router"]
\ No newline at end of file
+__all__ = ["productos_router", "pagos_router", "usuarios_router", "divisas_router", "contacto_router"]
\ No newline at end of file
@@ -0,0 +1,79 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.security import get_usuario_actual
+from app.data.database import get_db, get_db_escritura
+from app.data.models.usuarios import RolEnum, Usuario
+from app.api.schemas import ContactoCreate, ContactoRecibido, BandejaResponse
+from app.services.mensajes import MensajeService
+
+router = APIRouter()
+
+
+def _verificar_vendedor(usuario: Usuario, vendedor_id: int) -> None:
+    """Solo el propio vendedor (o un administrador, que ve también los sin asignar) accede a su bandeja."""
+    if usuario.rol != RolEnum.admin and usuario.id != vendedor_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puede ver la bandeja de otro vendedor")
+
+# =============================================================================
+# ENDPOINTS DE CONTACTO
+# =============================================================================
+
+@router.post("/", response_model=ContactoRecibido, status_code=status.HTTP_202_ACCEPTED, summary="Enviar mensaje de contacto")
+def enviar_mensaje(data: ContactoCreate):
+    """
+    Recibe un mensaje de contacto. El mensaje queda en cola y se guarda en la
+    base en el siguiente lote (no ocupa una conexión durante la petición).
+    """
+    resultado = MensajeService().recibir_mensaje({
+        "cliente_nombre": data.usuario,
+        "cliente_email": data.email,
+        "cliente_telefono": data.telefono,
+        "vendedor_id": data.vendedor_id,
+        "asunto": data.asunto,
+        "contenido": data.mensaje,
+    })
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=resultado["error"],
+            headers={"Retry-After": "5"}
+        )
+    return resultado
+
+@router.get("/bandeja/{vendedor_id}", response_model=BandejaResponse, summary="Bandeja de un vendedor")
+def obtener_bandeja(
+    vendedor_id: int,
+    solo_no_leidos: bool = Query(False),
+    pagina: int = Query(1, ge=1),
+    por_pagina: int = Query(20, ge=1, le=100),
+    usuario: Usuario = Depends(get_usuario_actual),
+    db: Session = Depends(get_db)
+):
+    """Mensajes del vendedor, del más reciente al más antiguo, paginados (requiere ser ese vendedor)."""
+    _verificar_vendedor(usuario, vendedor_id)
+    return MensajeService(db).get_bandeja(vendedor_id, solo_no_leidos, pagina, por_pagina)
+
+@router.get("/bandeja/{vendedor_id}/no-leidos", summary="Cantidad de mensajes no leídos")
+def contar_no_leidos(vendedor_id: int, usuario: Usuario = Depends(get_usuario_actual), db: Session = Depends(get_db)):
+    """Contador para el indicador del panel del vendedor."""
+    _verificar_vendedor(usuario, vendedor_id)
+    return {"vendedor_id": vendedor_id, "no_leidos": MensajeService(db).contar_no_leidos(vendedor_id)}
+
+@router.put("/mensajes/{mensaje_id}/leido", summary="Marcar mensaje como leído")
+def marcar_leido(mensaje_id: int, usuario: Usuario = Depends(get_usuario_actual), db: Session = Depends(get_db_escritura)):
+    """Marca como leído un mensaje del vendedor del token (un administrador, cualquiera)."""
+    vendedor_id = None if usuario.rol == RolEnum.admin else usuario.id
+    resultado = MensajeService(db).marcar_leido(mensaje_id, vendedor_id)
+    if "error" in resultado:
+        if resultado.get("prohibido"):
+            codigo = status.HTTP_403_FORBIDDEN
+        elif "no encontrado" in resultado["error"]:
+            codigo = status.HTTP_404_NOT_FOUND
+        else:
+            codigo = status.HTTP_400_BAD_REQUEST
+        raise HTTPException(
+            status_code=codigo,
+            detail=resultado["error"]
+        )
+    return resultado
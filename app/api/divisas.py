@@ -1,10 +1,19 @@
-from fastapi import APIRouter
-from app.integrations.banco_central import obtener_valor_divisa
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Query
+
+from app.core.divisas import DivisaService
 
 router = APIRouter()
 
 @router.get("/{moneda}", tags=["divisas"])
-def obtener_valor(moneda: str):
-    moneda = moneda.lower()
-    resultado = obtener_valor_divisa(moneda)
-    return resultado
+def obtener_valor(moneda: str, fecha: Optional[date] = Query(None, description="Tasa vigente en esta fecha (por defecto hoy)")):
+    resultado = DivisaService().obtener_tasa_cambio(moneda.lower(), fecha)
+    if "error" in resultado:
+        return resultado
+    return {
+        "moneda": resultado["moneda"],
+        "fecha": resultado["fecha"],
+        "valor_clp": float(resultado["tasa"])
+    }
@@ -1,7 +1,21 @@
 # app/api/pagos.py
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.api.schemas import LineaCotizacion, ResumenPagosResponse
+from app.core.security import requiere_rol
+from app.data.models.usuarios import RolEnum, Usuario
+from app.data.database import get_db_escritura, get_db_lectura
+from app.data.repositories.pago_repository import PagoRepository
 from app.integrations.webpay import crear_transaccion, confirmar_transaccion
+from app.services.productos import ProductoService
+from app.services import resumen_pagos
 
 router = APIRouter()
 
@@ -12,25 +26,104 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 class TransaccionRequest(BaseModel):
     buy_order: str
     session_id: str
-    amount: float
+    amount: Optional[float] = None
     return_url: str
+    # El monto se calcula con los precios de la base a partir de las líneas del carrito;
+    # `amount`, si se envía, debe coincidir con ese total
+    items: Optional[List[LineaCotizacion]] = Field(None, min_length=1, max_length=200)
+
+def _monto_desde_items(data: TransaccionRequest, db: Session) -> Tuple[int, List[Dict[str, Any]]]:
+    """
+    Total del carrito con los precios vigentes y sus líneas; rechaza carritos incompletos o
+    montos desactualizados.
+    """
+    cotizacion = ProductoService(db).cotizar_productos(data.items)
+    if "error" in cotizacion:
+        raise HTTPException(status_code=500, detail=cotizacion["error"])
+    if not cotizacion["completo"]:
+        raise HTTPException(
+            status_code=422,
+            detail={
+                "mensaje": "El carrito tiene productos inexistentes, inactivos o sin precio",
+                "no_encontrados": cotizacion["no_encontrados"]
+            }
+        )
+    if data.amount is not None and Decimal(str(data.amount)) != cotizacion["total"]:
+        raise HTTPException(
+            status_code=409,
+            detail={
+                "mensaje": "El monto no coincide con los precios vigentes",
+                "amount": int(cotizacion["total"])
+            }
+        )
+    lineas = [
+        {"codigo": item["codigo"], "cantidad": item["cantidad"], "precio_unitario": item["precio_unitario"]}
+        for item in cotizacion["items"]
+    ]
+    return int(cotizacion["total"]), lineas
+
+def _registrar_confirmacion(db: Session, token: str, resultado: Dict[str, Any]) -> None:
+    """Marca el pago como autorizado o rechazado; si se autorizó, su carrito se descuenta del stock."""
+    autorizado = resultado.get("status") == "AUTHORIZED" and resultado.get("response_code") == 0
+    PagoRepository(db).confirmar(token, autorizado, resultado.get("payment_type_code"))
 
 @router.post("/webpay/iniciar")
-def iniciar_pago(data: TransaccionRequest):
-    resultado, status = crear_transaccion(data.buy_order, data.session_id, data.amount, data.return_url)
+def iniciar_pago(data: TransaccionRequest, db: Session = Depends(get_db_escritura)):
+    lineas = []
+    if data.items:
+        amount, lineas = _monto_desde_items(data, db)
+    elif data.amount is not None and settings.WEBPAY_MONTO_SIN_ITEMS:
+        amount = data.amount
+    else:
+        raise HTTPException(status_code=422, detail="Debe indicar los items del carrito")
+    pagos = PagoRepository(db)
+    if pagos.get_by_orden_id(data.buy_order):
+        raise HTTPException(status_code=409, detail="La orden ya tiene un pago")
+    resultado, status = crear_transaccion(data.buy_order, data.session_id, amount, data.return_url)
     if status != 200:
         raise HTTPException(status_code=status, detail=resultado)
+    # Las líneas quedan con el pago: al confirmarlo se descuentan del stock como ventas
+    pagos.registrar_inicio(resultado["token"], data.buy_order, amount, data.return_url, lineas)
     return resultado
 
 @router.get("/webpay/confirmar/{token}")
-def confirmar_pago(token: str):
+def confirmar_pago(token: str, db: Session = Depends(get_db_escritura)):
     resultado, status = confirmar_transaccion(token)
     if status != 200:
         raise HTTPException(status_code=status, detail=resultado)
+    _registrar_confirmacion(db, token, resultado)
     return resultado
 @router.get("/webpay/estado/{token}")
-def estado_pago(token: str):
+def estado_pago(token: str, db: Session = Depends(get_db_escritura)):
     resultado, status = confirmar_transaccion(token)
     if status != 200:
         raise HTTPException(status_code=status, detail=resultado)
+    _registrar_confirmacion(db, token, resultado)
+    return resultado
+
+@router.get("/resumen", response_model=ResumenPagosResponse, summary="Resumen de pagos por día u hora")
+def resumen_de_pagos(
+    desde: Optional[date] = Query(None, description="Por defecto, 30 días antes de `hasta`"),
+    hasta: Optional[date] = Query(None, description="Por defecto, hoy (UTC)"),
+    granularidad: str = Query("dia", pattern="^(dia|hora)$"),
+    estado: Optional[str] = Query(None, max_length=20),
+    metodo_pago: Optional[str] = Query(None, max_length=50),
+    db: Session = Depends(get_db_lectura),
+    usuario: Usuario = Depends(requiere_rol(RolEnum.empleado, RolEnum.admin))
+):
+    """
+    Cantidad y monto de los pagos por periodo, estado y método de pago, leídos solo de
+    las tablas de resumen (se actualizan en segundo plano desde la marca de agua).
+    Solo para empleados y administradores.
+
+    ### Ejemplo de uso:
+    ```
+    GET /api/pagos/resumen?desde=2024-06-01&hasta=2024-06-30&estado=AUTORIZADO
+    ```
+    """
+    hasta = hasta or datetime.utcnow().date()
+    desde = desde or hasta - timedelta(days=30)
+    resultado = resumen_pagos.consultar(db, desde, hasta, granularidad, estado, metodo_pago)
+    if "error" in resultado:
+        raise HTTPException(status_code=400, detail=resultado["error"])
     return resultado
\ No newline at end of file
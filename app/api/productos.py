@@ -1,8 +1,10 @@
-from fastapi import APIRouter, Depends, Query, HTTPException, status
+from fastapi import APIRouter, Depends, Query, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import Optional, List
+from typing import Optional, List, Literal
+import gzip
 
-from app.data.database import get_db
+from app.core.http import RespuestaJSON, calcular_etag, etag_codificado, etag_coincide, respuesta_json_etag, respuesta_precalculada
+from app.data.database import get_db, get_db_lectura, get_db_escritura
 
 from app.api.schemas import (
     ProductoCreate, 
@@ -12,26 +14,128 @@ from app.api.schemas import (
     HistorialPreciosResponse,
     CategoriaCompleteResponse,
     MarcaCompleteResponse,
-    ProductosDestacadosResponse
+    ProductosDestacadosResponse,
+    ProductoPromocion,
+    FiltrosProducto,
+    BusquedaProductosResponse,
+    CotizacionRequest,
+    CotizacionResponse,
+    CambiosProductosResponse,
+    StockAlResponse
 )
 
 from app.services.productos import ProductoService
+from app.services.sugerencias import sugerir
+from app.services import sincronizacion
+from app.services.portada import constructor_portada
+from app.core.divisas import DivisaService
 
 router = APIRouter()
 
+def _respuesta_listado(resultado, moneda: Optional[str] = None):
+    """Serializa un listado de ProductoBasic ya construido o traduce el error del servicio."""
+    if isinstance(resultado, dict) and "error" in resultado:
+        if "no encontrad" in resultado["error"].lower():
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=resultado["error"]
+            )
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=resultado["error"]
+        )
+    resultado, headers = _convertir_precios(resultado, moneda)
+    return RespuestaJSON(resultado, headers=headers)
+
+def _convertir_precios(productos: list, moneda: Optional[str]):
+    """
+    Convierte el precio_actual de todos los productos a `moneda` en un solo lote.
+    Devuelve copias (los originales pueden venir de caché) y los headers con la tasa usada.
+    """
+    if not moneda:
+        return productos, {}
+    conversion = DivisaService().convertir_desde_clp([p.precio_actual for p in productos], moneda)
+    if "error" in conversion:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"No se pudo obtener el tipo de cambio: {conversion['error']}"
+        )
+    convertidos = [
+        producto.model_copy(update={"precio_actual": precio})
+        for producto, precio in zip(productos, conversion["montos"])
+    ]
+    headers = {"X-Moneda": conversion["moneda"], "X-Tipo-Cambio": str(conversion["tasa"])}
+    if conversion["fecha"]:
+        headers["X-Tipo-Cambio-Fecha"] = conversion["fecha"]
+    return convertidos, headers
+
+MonedaPrecio = Optional[Literal["usd", "eur"]]
+
 # =============================================================================
 # ENDPOINTS DE PRODUCTOS
 # =============================================================================
 
+@router.get("/productos/cambios", response_model=CambiosProductosResponse, summary="Cambios del catálogo desde un token")
+def obtener_cambios_productos(
+    since: str = Query(..., description="Token de la respuesta anterior (o del snapshot)"),
+    limite: int = Query(500, ge=1, le=sincronizacion.LIMITE_MAXIMO, description="Cambios por página"),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Sincronización incremental para terminales POS y clientes móviles.
+
+    Devuelve los productos creados, modificados o con nuevo precio (con su estado actual)
+    y los códigos eliminados desde el token, junto con el token siguiente. Renombrar una
+    categoría o marca reenvía sus productos solo si se registra en el registro de cambios
+    (`CATEGORIA`/`MARCA`, `ACTUALIZAR`, id). Si `hay_mas`
+    es true se pide de inmediato la página siguiente. Un token que apunta a cambios ya
+    purgados responde 410: el dispositivo debe volver a descargar el snapshot.
+
+    ### Ejemplo de uso:
+    ```
+    GET /api/productos/productos/cambios/snapshot
+    GET /api/productos/productos/cambios?since=djE6MTIzNDU
+    ```
+    """
+    resultado = sincronizacion.cambios_desde(db, since, limite)
+
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE if resultado.get("expirado") else status.HTTP_400_BAD_REQUEST,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
+
+@router.get("/productos/cambios/snapshot", summary="Catálogo completo para inicializar un dispositivo")
+def obtener_snapshot_productos(request: Request, db: Session = Depends(get_db_lectura)):
+    """
+    Catálogo activo completo (`token`, `generado`, `total`, `productos`) en JSON comprimido
+    con gzip. Con el `token` se piden luego los cambios en `/productos/cambios`.
+
+    Cada codificación (gzip o sin comprimir) tiene su propio ETag fuerte.
+    """
+    cuerpo = sincronizacion.snapshot(db)
+    con_gzip = "gzip" in request.headers.get("accept-encoding", "")
+    etag = etag_codificado(calcular_etag(cuerpo), "gzip") if con_gzip else calcular_etag(cuerpo)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate", "Vary": "Accept-Encoding"}
+    if etag_coincide(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if not con_gzip:
+        return Response(content=gzip.decompress(cuerpo), media_type="application/json", headers=headers)
+    return Response(content=cuerpo, media_type="application/json", headers={**headers, "Content-Encoding": "gzip"})
+
 @router.get("/productos/{codigo}", response_model=ProductoResponse, summary="Obtener producto por código")
 def obtener_producto_por_codigo(
     codigo: str, 
+    moneda: MonedaPrecio = Query(None, description="Expresar el precio en esta moneda (por defecto CLP)"),
     db: Session = Depends(get_db)
 ):
     """
     Obtiene los detalles completos de un producto específico por su código.
     
     - **codigo**: Código único del producto
+    - **moneda**: `usd` o `eur` para convertir el precio con el tipo de cambio del día
     
     ### Ejemplo de uso:
     ```
@@ -39,21 +143,24 @@ def obtener_producto_por_codigo(
     ```
     """
     service = ProductoService(db)
-    resultado = service.get_producto_by_codigo(codigo)
+    resultado = service.get_producto_detalle(codigo)
     
-    if "error" in resultado:
+    if isinstance(resultado, dict):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=resultado["error"]
         )
     
-    return resultado
+    # El servicio entrega el modelo ya construido: se serializa sin re-validar
+    (resultado,), headers = _convertir_precios([resultado], moneda)
+    return RespuestaJSON(resultado, headers=headers)
 
 @router.get("/productos/", response_model=List[ProductoBasic], summary="Buscar productos con filtros")
 def buscar_productos(
     nombre: Optional[str] = Query(None, description="Buscar por nombre (búsqueda parcial)", example="martillo"),
     categoria: Optional[str] = Query(None, description="Filtrar por categoría", example="Herramientas"),
     stock_max: Optional[int] = Query(None, ge=0, description="Productos con stock menor o igual a este valor", example=10),
+    moneda: MonedaPrecio = Query(None, description="Expresar los precios en esta moneda (por defecto CLP)"),
     db: Session = Depends(get_db)
 ):
     """
@@ -62,6 +169,7 @@ def buscar_productos(
     - **nombre**: Búsqueda parcial por nombre del producto
     - **categoria**: Filtrar productos por categoría
     - **stock_max**: Mostrar productos con stock menor o igual al valor especificado
+    - **moneda**: `usd` o `eur` para convertir los precios con el tipo de cambio del día
     
     Al menos uno de los filtros debe ser proporcionado.
     
@@ -70,21 +178,53 @@ def buscar_productos(
     GET /api/productos/?nombre=martillo
     GET /api/productos/?categoria=Herramientas
     GET /api/productos/?stock_max=5
+    GET /api/productos/?nombre=martillo&moneda=usd
     ```
     """
     service = ProductoService(db)
     
     if nombre:
-        return service.search_productos_by_name(nombre)
+        resultado = service.search_productos_by_name(nombre)
     elif categoria:
-        return service.get_productos_by_categoria(categoria)
+        resultado = service.get_productos_by_categoria(categoria)
     elif stock_max is not None:
-        return service.get_productos_by_stock(stock_max)
+        resultado = service.get_productos_by_stock(stock_max)
     else:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Debes especificar al menos un filtro (nombre, categoria o stock_max)"
         )
+    
+    return _respuesta_listado(resultado, moneda)
+
+@router.post("/productos/lote/", response_model=CotizacionResponse, summary="Consultar varios productos en lote")
+def cotizar_productos(
+    cotizacion: CotizacionRequest,
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Resuelve hasta 200 líneas de un carrito o cotización en una sola consulta.
+
+    Devuelve las líneas en el mismo orden, con el producto, su precio vigente y el
+    total de la línea; los códigos inexistentes o inactivos quedan con `encontrado: false`
+    y se listan en `no_encontrados`. El total se calcula con los precios de la base.
+
+    ### Ejemplo de uso:
+    ```
+    POST /api/productos/productos/lote/
+    {"items": [{"codigo": "MTL-001", "cantidad": 2}, {"codigo": "TAL-010", "cantidad": 1}]}
+    ```
+    """
+    service = ProductoService(db)
+    resultado = service.cotizar_productos(cotizacion.items)
+
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
 
 @router.get("/productos/{codigo}/precios", response_model=HistorialPreciosResponse, summary="Historial de precios")
 def obtener_historial_precios(
@@ -115,10 +255,37 @@ def obtener_historial_precios(
     
     return resultado
 
+@router.get("/productos/{codigo}/stock", response_model=StockAlResponse, summary="Stock a una fecha")
+def obtener_stock_al(
+    codigo: str,
+    fecha: Optional[str] = Query(None, description="Fecha u hora (ISO); una fecha sola es el cierre de ese día", example="2024-01-01"),
+    dias_venta: int = Query(30, ge=1, le=365, description="Días previos para la velocidad de venta"),
+    db: Session = Depends(get_db_lectura)
+):
+    """
+    Stock de un producto a una fecha, calculado desde el libro de movimientos
+    (último corte diario más los movimientos posteriores), y sus ventas recientes.
+
+    ### Ejemplo de uso:
+    ```
+    GET /api/productos/productos/MTL-001/stock?fecha=2024-01-01
+    ```
+    """
+    service = ProductoService(db)
+    resultado = service.get_stock_al(codigo, fecha, dias_venta)
+
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if "no encontrad" in resultado["error"] else status.HTTP_400_BAD_REQUEST,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
+
 @router.post("/productos/", response_model=ProductoResponse, status_code=status.HTTP_201_CREATED, summary="Crear nuevo producto")
 def crear_producto(
     producto_data: ProductoCreate, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_escritura)
 ):
     """
     Crea un nuevo producto en el sistema.
@@ -162,7 +329,7 @@ def crear_producto(
 def actualizar_producto(
     codigo: str, 
     producto_data: ProductoUpdate, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_escritura)
 ):
     """
     Actualiza un producto existente.
@@ -210,7 +377,7 @@ def actualizar_producto(
 @router.delete("/productos/{codigo}", summary="Eliminar producto")
 def eliminar_producto(
     codigo: str, 
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db_escritura)
 ):
     """
     Elimina lógicamente un producto (lo marca como inactivo).
@@ -231,35 +398,106 @@ def eliminar_producto(
     
     return resultado
 
+@router.get("/sugerencias/", summary="Sugerencias de búsqueda (autocompletar)")
+def sugerir_productos(
+    q: str = Query(..., min_length=1, max_length=100, description="Texto escrito hasta ahora", example="mar"),
+    limite: int = Query(8, ge=1, le=20)
+):
+    """
+    Sugerencias por prefijo sobre código, nombre y marca, con el código exacto primero.
+    Se resuelve desde un índice en memoria: no consulta la base por tecla.
+
+    ### Ejemplo de uso:
+    ```
+    GET /api/productos/sugerencias/?q=mart
+    ```
+    """
+    return RespuestaJSON(sugerir(q, limite))
+
+@router.get("/busqueda/", response_model=BusquedaProductosResponse, summary="Búsqueda avanzada con facetas")
+def buscar_productos_facetado(
+    filtros: FiltrosProducto = Depends(),
+    pagina: int = Query(1, ge=1),
+    por_pagina: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Combina filtros de categoría (incluye subcategorías), marca, rango de stock y de precio,
+    destacados, promociones y stock bajo. Junto a la página se devuelven los conteos de
+    cada faceta ("Stanley (42) · DeWalt (17)"); los de una faceta filtrada ignoran su propio
+    filtro para poder ofrecer las alternativas.
+
+    ### Ejemplos de uso:
+    ```
+    GET /api/productos/busqueda/?categoria_id=3
+    GET /api/productos/busqueda/?categoria_id=3&marca_id=7&precio_max=20000
+    ```
+    """
+    service = ProductoService(db)
+    resultado = service.buscar_productos_avanzado(filtros, pagina, por_pagina)
+
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
+
 # =============================================================================
 # ENDPOINTS DE PRODUCTOS DESTACADOS
 # =============================================================================
 
 @router.get("/productos-destacados/", response_model=ProductosDestacadosResponse, summary="Obtener productos destacados")
-def obtener_productos_destacados(db: Session = Depends(get_db)):
+def obtener_productos_destacados(request: Request, db: Session = Depends(get_db)):
     """
     Obtiene productos destacados incluyendo promociones y lanzamientos recientes.
+    Se sirve ya serializado desde la portada precalculada (sin consultar la base).
     
     ### Retorna:
     - **promociones**: Productos con cambios de precio recientes
     - **lanzamientos**: Productos creados recientemente
     """
+    portada = constructor_portada.portada
+    if portada is not None:
+        return respuesta_precalculada(request, portada.destacados, portada.etag_destacados)
+
     service = ProductoService(db)
-    return service.get_productos_destacados()
+    resultado = service.get_productos_destacados()
+
+    if "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
 
-@router.get("/promociones/", response_model=List[ProductoBasic], summary="Productos en promoción")
+@router.get("/promociones/", response_model=List[ProductoPromocion], summary="Productos en promoción")
 def obtener_promociones(db: Session = Depends(get_db)):
     """
     Obtiene todos los productos actualmente en promoción.
     
-    Se consideran en promoción los productos que han tenido 
-    cambios de precio en los últimos 15 días.
+    Se consideran en promoción los productos cuyo último cambio de precio,
+    en los últimos 15 días, fue una rebaja. Se ordenan de mayor a menor descuento.
+
+    Es independiente de la marca `en_promocion` del producto (asignada a mano), que es
+    la que usan el filtro `solo_promociones` y la faceta de la búsqueda.
     """
     service = ProductoService(db)
-    return service.get_productos_en_promocion()
+    resultado = service.get_productos_en_promocion()
+
+    if isinstance(resultado, dict) and "error" in resultado:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=resultado["error"]
+        )
+
+    return RespuestaJSON(resultado)
 
 @router.get("/lanzamientos/", response_model=List[ProductoBasic], summary="Productos lanzados recientemente")
 def obtener_lanzamientos(
+    request: Request,
     dias: Optional[int] = Query(30, ge=1, le=365, description="Días hacia atrás para considerar como reciente"),
     db: Session = Depends(get_db)
 ):
@@ -274,8 +512,13 @@ def obtener_lanzamientos(
     GET /api/lanzamientos/?dias=7
     ```
     """
+    portada = constructor_portada.portada
+    if portada is not None:
+        contenido, etag = portada.lanzamientos(dias)
+        return respuesta_precalculada(request, contenido, etag)
+
     service = ProductoService(db)
-    return service.get_productos_lanzamiento(dias)
+    return _respuesta_listado(service.get_productos_lanzamiento(dias))
 
 # =============================================================================
 # ENDPOINTS DE CATEGORÍAS Y MARCAS
@@ -300,17 +543,25 @@ def listar_categorias(db: Session = Depends(get_db)):
     return service.get_categorias()
 
 @router.get("/marcas/", response_model=List[MarcaCompleteResponse], summary="Listar todas las marcas")
-def listar_marcas(db: Session = Depends(get_db)):
+def listar_marcas(
+    request: Request,
+    por_categoria: bool = Query(False, description="Incluir el conteo de productos por categoría (facetas)"),
+    db: Session = Depends(get_db)
+):
     """
     Obtiene todas las marcas disponibles con información adicional.
     
     ### Información incluida:
     - ID y nombre de la marca
     - Código de la marca
-    - Total de productos por marca
+    - Total de productos activos por marca
+    - Conteo por categoría si se indica **por_categoria**
+    
+    La respuesta incluye un `ETag`; si el cliente envía `If-None-Match`
+    con el mismo valor se responde `304 Not Modified`.
     
     ### Marcas disponibles incluyen:
     Bosch, DeWalt, Stanley, Makita, Black & Decker, Hilti, entre otras.
     """
     service = ProductoService(db)
-    return service.get_marcas()
\ No newline at end of file
+    return respuesta_json_etag(request, service.get_marcas(por_categoria))
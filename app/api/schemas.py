@@ -1,8 +1,9 @@
 # app/api/schemas.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, List
-from datetime import datetime
+from typing import Optional, List, Union
+from datetime import date, datetime
+from decimal import Decimal
 
 # =============================================================================
 # 🟦 SCHEMAS PARA PRODUCTOS
@@ -54,11 +55,50 @@ class ProductoUpdate(BaseModel):
     categoria_id: Optional[int] = None
     marca_id: Optional[int] = None
 
+class ProductoPromocion(ProductoBasic):
+    """Producto cuyo último cambio de precio (en los últimos 15 días) fue una rebaja"""
+    precio_anterior: float
+    descuento: float = Field(..., description="Porcentaje bajo el precio anterior")
+    fecha_cambio: datetime
+
 class ProductosDestacadosResponse(BaseModel):
     """Schema para productos destacados"""
-    promociones: List[ProductoBasic] = []
+    promociones: List[ProductoPromocion] = []
     lanzamientos: List[ProductoBasic] = []
 
+class LineaCotizacion(BaseModel):
+    """Línea de un carrito o cotización"""
+    codigo: str = Field(..., min_length=1, max_length=50)
+    cantidad: int = Field(1, ge=1, le=100000)
+
+class CotizacionRequest(BaseModel):
+    """Códigos a resolver en lote, en el orden en que se muestran"""
+    items: List[LineaCotizacion] = Field(..., min_length=1, max_length=200)
+
+class LineaCotizacionResponse(BaseModel):
+    """Línea resuelta con el precio vigente; `encontrado` es False si el código no existe o está inactivo"""
+    codigo: str
+    cantidad: int
+    encontrado: bool
+    producto: Optional[ProductoBasic] = None
+    precio_unitario: Optional[float] = None
+    total_linea: Optional[float] = None
+    stock_suficiente: Optional[bool] = None
+
+class CotizacionResponse(BaseModel):
+    """Líneas en el orden pedido y el total calculado con los precios de la base"""
+    items: List[LineaCotizacionResponse] = []
+    total: float
+    completo: bool = Field(..., description="Todas las líneas existen y tienen precio")
+    no_encontrados: List[str] = []
+
+class CambiosProductosResponse(BaseModel):
+    """Productos que cambiaron desde un token de sincronización"""
+    token: str = Field(..., description="Token para pedir los cambios siguientes")
+    hay_mas: bool = Field(..., description="Quedan cambios: pedir de inmediato con el nuevo token")
+    productos: List[ProductoBasic] = Field([], description="Productos creados o modificados, con su estado actual")
+    eliminados: List[str] = Field([], description="Códigos eliminados o desactivados")
+
 # =============================================================================
 # 🟨 SCHEMAS PARA CATEGORÍAS Y SUBCATEGORÍAS
 # =============================================================================
@@ -102,12 +142,19 @@ class MarcaCreate(BaseModel):
     nombre: str = Field(..., min_length=2, max_length=100)
     codigo: Optional[str] = Field(None, max_length=20)
 
+class MarcaCategoriaConteo(BaseModel):
+    """Conteo de productos de una marca dentro de una categoría (facetas)"""
+    categoria_id: Optional[int] = None
+    categoria: Optional[str] = None
+    total_productos: int = 0
+
 class MarcaCompleteResponse(BaseModel):
     """Schema completo para marcas con información adicional"""
     id: int
     nombre: str
     codigo: Optional[str] = None
     total_productos: int = 0
+    categorias: Optional[List[MarcaCategoriaConteo]] = None
 
 # =============================================================================
 # 🟪 SCHEMAS PARA PRECIOS
@@ -123,6 +170,15 @@ class HistorialPreciosResponse(BaseModel):
     precio_actual: Optional[float] = None
     historial: List[PrecioHistoricoResponse]
 
+class StockAlResponse(BaseModel):
+    """Stock de un producto a una fecha y su velocidad de venta previa"""
+    codigo: str
+    fecha: datetime
+    stock: int
+    ventas: int = Field(..., description="Unidades vendidas en los `dias_venta` días previos")
+    dias_venta: int
+    velocidad_diaria: float
+
 # =============================================================================
 # 🟧 SCHEMAS PARA ESTADÍSTICAS GENERALES
 # =============================================================================
@@ -148,6 +204,108 @@ class FiltrosProducto(BaseModel):
     precio_min: Optional[float] = None
     precio_max: Optional[float] = None
     solo_destacados: Optional[bool] = False
-    solo_promociones: Optional[bool] = False
+    solo_promociones: Optional[bool] = False  # Marca en_promocion del producto, no las rebajas de /promociones/
     stock_bajo: Optional[bool] = False
     solo_activos: Optional[bool] = True
+
+class FacetaValor(BaseModel):
+    """Valor de una faceta (categoría o marca) con su total de productos"""
+    id: int
+    nombre: Optional[str] = None
+    total: int
+
+class FacetaTramo(BaseModel):
+    """Tramo de precio o stock [desde, hasta) con su total de productos"""
+    desde: Optional[float] = None
+    hasta: Optional[float] = None
+    total: int
+
+class FacetasProducto(BaseModel):
+    """Conteos por faceta de una búsqueda avanzada"""
+    categoria: List[FacetaValor] = []
+    marca: List[FacetaValor] = []
+    precio: List[FacetaTramo] = []
+    stock: List[FacetaTramo] = []
+    destacado: int = 0
+    en_promocion: int = 0
+    stock_bajo: int = 0
+
+class BusquedaProductosResponse(BaseModel):
+    """Página de resultados de la búsqueda avanzada con sus facetas"""
+    productos: List[ProductoBasic] = []
+    total: int
+    pagina: int
+    total_paginas: int
+    productos_por_pagina: int
+    facetas: Optional[FacetasProducto] = None
+
+# =============================================================================
+# 🟫 SCHEMAS PARA MENSAJES DE CONTACTO
+# =============================================================================
+
+class ContactoCreate(BaseModel):
+    """Mensaje enviado desde el formulario de contacto del cliente"""
+    mensaje: str = Field(..., min_length=1, max_length=5000)
+    usuario: Optional[str] = Field(None, max_length=100, description="Nombre del cliente")
+    email: Optional[str] = Field(None, max_length=100)
+    telefono: Optional[str] = Field(None, max_length=20)
+    asunto: Optional[str] = Field(None, max_length=200)
+    vendedor_id: Optional[int] = None
+
+class ContactoRecibido(BaseModel):
+    estado: str
+    fecha: datetime
+
+class MensajeResponse(BaseModel):
+    id: int
+    cliente_nombre: str
+    cliente_email: str
+    cliente_telefono: Optional[str] = None
+    asunto: Optional[str] = None
+    contenido: str
+    fecha: datetime
+    leido: bool
+    respondido: bool
+
+    model_config = {"from_attributes": True}
+
+class BandejaResponse(BaseModel):
+    """Página de la bandeja de un vendedor"""
+    vendedor_id: int
+    pagina: int
+    por_pagina: int
+    hay_mas: bool
+    no_leidos: int
+    mensajes: List[MensajeResponse]
+
+# =============================================================================
+# ⬜ SCHEMAS PARA RESUMEN DE PAGOS
+# =============================================================================
+
+class ResumenPagosFila(BaseModel):
+    """Pagos de un periodo (día, o hora en UTC) con un estado y método de pago"""
+    periodo: Union[datetime, date]
+    estado: str
+    metodo_pago: Optional[str] = None
+    cantidad: int
+    monto: Decimal
+
+class ResumenPagosEstado(BaseModel):
+    estado: str
+    cantidad: int
+    monto: Decimal
+
+class ResumenPagosMetodo(BaseModel):
+    metodo_pago: Optional[str] = None
+    cantidad: int
+    monto: Decimal
+
+class ResumenPagosResponse(BaseModel):
+    """Resumen de pagos para el dashboard, leído de las tablas de resumen"""
+    desde: date
+    hasta: date
+    granularidad: str
+    actualizado_hasta: Optional[datetime] = Field(None, description="Los pagos modificados después aún no se reflejan")
+    filas: List[ResumenPagosFila] = []
+    por_estado: List[ResumenPagosEstado] = []
+    por_metodo: List[ResumenPagosMetodo] = []
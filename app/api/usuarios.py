@@ -1,6 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from app.data.database import get_db
+from app.data.database import get_db, get_db_escritura, get_db_lectura
 from app.data.schemas.usuarios import UsuarioCreate, UsuarioOut, UsuarioLogin
 from app.data.repositories import usuarios as repo
 from app.core import security
@@ -14,7 +14,7 @@ router = APIRouter(tags=["Usuarios"])  # Sin prefijo aquí
 
 
 @router.post("/", response_model=UsuarioOut)
-def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
+def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db_escritura)):
     if repo.get_by_email(db, usuario.email):
         raise HTTPException(status_code=400, detail="El correo ya está registrado.")
     if not usuario.email or not usuario.email.strip():
@@ -41,7 +41,7 @@ def crear_usuario(usuario: UsuarioCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error al crear usuario: {str(e)}")
 
 @router.post("/login", response_model=dict)
-def login_usuario(data: UsuarioLogin, db: Session = Depends(get_db)):
+def login_usuario(data: UsuarioLogin, db: Session = Depends(get_db_lectura)):
     user = repo.get_by_email(db, data.email)
     if not user or not security.verify_password(data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
@@ -55,7 +55,7 @@ def verificar_usuario(email: str, db: Session = Depends(get_db)):
     return {"exists": exists}
 
 @router.post("/login", response_model=dict)
-def login_usuario(data: UsuarioLogin, db: Session = Depends(get_db)):
+def login_usuario(data: UsuarioLogin, db: Session = Depends(get_db_lectura)):
     user = repo.get_by_email(db, data.email)
     if not user or not security.verify_password(data.password, user.password_hash):
         raise HTTPException(status_code=401, detail="Credenciales inválidas")
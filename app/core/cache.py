@@ -0,0 +1,371 @@
+import logging
+import os
+import pickle
+import sqlite3
+import stat
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_AUSENTE = object()
+
+
+class CacheLocal:
+    """
+    Nivel 1: LRU en memoria del proceso con TTL por clave.
+    El tamaño se controla en bytes (tamaño serializado de cada valor) y al
+    superarse se desalojan las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_usados = 0
+        self.desalojos = 0
+        self._datos: "OrderedDict[str, Tuple[float, Any, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, clave: str) -> Any:
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return _AUSENTE
+            expira, valor, tamano = entrada
+            if expira < time.time():
+                del self._datos[clave]
+                self.bytes_usados -= tamano
+                return _AUSENTE
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave: str, valor: Any, expira: float, tamano: int) -> None:
+        if tamano > self.max_bytes // 4:
+            return  # Valores muy grandes solo viven en el nivel compartido
+        with self._lock:
+            anterior = self._datos.pop(clave, None)
+            if anterior is not None:
+                self.bytes_usados -= anterior[2]
+            self._datos[clave] = (expira, valor, tamano)
+            self.bytes_usados += tamano
+            while self.bytes_usados > self.max_bytes and self._datos:
+                _, (_, _, tamano_desalojado) = self._datos.popitem(last=False)
+                self.bytes_usados -= tamano_desalojado
+                self.desalojos += 1
+
+    def delete(self, clave: str) -> None:
+        with self._lock:
+            entrada = self._datos.pop(clave, None)
+            if entrada is not None:
+                self.bytes_usados -= entrada[2]
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+
+def _directorio_privado(directorio: Path) -> None:
+    """
+    Crea el directorio del nivel compartido accesible solo para el usuario actual (0700).
+    Los valores se leen con pickle: si otro usuario pudiera escribir ahí (por ejemplo,
+    creando antes el directorio en /tmp) podría ejecutar código en la app, así que un
+    directorio ajeno, un enlace simbólico o uno con escritura para otros se rechaza.
+    """
+    directorio.mkdir(mode=0o700, parents=True, exist_ok=True)
+    if not hasattr(os, "getuid"):
+        return  # Windows: el directorio temporal ya es del usuario
+    estado = directorio.lstat()
+    if stat.S_ISLNK(estado.st_mode) or estado.st_uid != os.getuid():
+        raise OSError(f"{directorio} no es un directorio del usuario actual")
+    if estado.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        raise OSError(f"{directorio} tiene permisos de escritura para otros usuarios")
+
+
+class CacheCompartida:
+    """
+    Nivel 2: almacén en disco local compartido por todos los workers (SQLite en
+    modo WAL con lecturas vía mmap). No requiere servicios externos.
+    También guarda la versión de cada namespace para invalidaciones masivas y los
+    token buckets compartidos del limitador de tasa.
+    """
+
+    def __init__(self, ruta: Path, mmap_bytes: int = 64 * 1024 * 1024):
+        self.ruta = ruta
+        self.mmap_bytes = mmap_bytes
+        self._local = threading.local()
+        self._escrituras = 0
+        _directorio_privado(ruta.parent)
+        conn = self._conexion()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entradas (clave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entradas_expira ON entradas (expira)")
+        conn.execute("CREATE TABLE IF NOT EXISTS namespaces (nombre TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS secuencias (nombre TEXT PRIMARY KEY, secuencia INTEGER NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS buckets (clave TEXT PRIMARY KEY, tokens REAL NOT NULL, actualizado REAL NOT NULL)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.ruta), timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+            self._local.conn = conn
+        return conn
+
+    def get(self, clave: str) -> Optional[Tuple[bytes, float]]:
+        fila = self._conexion().execute(
+            "SELECT valor, expira FROM entradas WHERE clave = ? AND expira >= ?", (clave, time.time())
+        ).fetchone()
+        return (fila[0], fila[1]) if fila else None
+
+    def set(self, clave: str, datos: bytes, expira: float) -> None:
+        conn = self._conexion()
+        conn.execute("INSERT OR REPLACE INTO entradas (clave, valor, expira) VALUES (?, ?, ?)", (clave, datos, expira))
+        self._escrituras += 1
+        if self._escrituras % 500 == 0:
+            conn.execute("DELETE FROM entradas WHERE expira < ?", (time.time(),))
+            conn.execute("DELETE FROM buckets WHERE actualizado < ?", (time.time() - 3600,))
+
+    def delete(self, clave: str) -> None:
+        self._conexion().execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+
+    def tomar_token(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        """
+        Token bucket atómico entre procesos (BEGIN IMMEDIATE serializa a los workers).
+        Devuelve 0 si se concedió el token o los segundos a esperar para el siguiente.
+        """
+        conn = self._conexion()
+        ahora = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            fila = conn.execute("SELECT tokens, actualizado FROM buckets WHERE clave = ?", (clave,)).fetchone()
+            tokens = capacidad if fila is None else min(capacidad, fila[0] + (ahora - fila[1]) * por_segundo)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / por_segundo
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (clave, tokens, actualizado) VALUES (?, ?, ?)", (clave, tokens, ahora)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return espera
+
+    def version(self, namespace: str) -> int:
+        fila = self._conexion().execute("SELECT version FROM namespaces WHERE nombre = ?", (namespace,)).fetchone()
+        return fila[0] if fila else 0
+
+    def incrementar_version(self, namespace: str, secuencia: Optional[int] = None) -> int:
+        """
+        Nueva versión del namespace. Con `secuencia` (del registro de cambios) solo
+        incrementa si esa secuencia no se aplicó antes: todos los workers procesan el
+        mismo cambio, pero el namespace se invalida una sola vez.
+        """
+        conn = self._conexion()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            aplicar = True
+            if secuencia is not None:
+                fila = conn.execute("SELECT secuencia FROM secuencias WHERE nombre = ?", (namespace,)).fetchone()
+                aplicar = fila is None or fila[0] < secuencia
+                if aplicar:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO secuencias (nombre, secuencia) VALUES (?, ?)", (namespace, secuencia)
+                    )
+            if aplicar:
+                conn.execute(
+                    "INSERT INTO namespaces (nombre, version) VALUES (?, 1) "
+                    "ON CONFLICT(nombre) DO UPDATE SET version = version + 1",
+                    (namespace,)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return self.version(namespace)
+
+
+class CacheDosNiveles:
+    """
+    Caché de la aplicación: LRU local delante de un almacén compartido entre workers.
+
+    Las claves viven dentro de un namespace versionado ("marcas", "divisas", ...).
+    `invalidar(namespace)` incrementa su versión en el nivel compartido, lo que deja
+    inaccesibles todas sus entradas en todos los workers (cada worker relee la versión
+    como máximo cada CACHE_VERSION_TTL_SEG segundos).
+    """
+
+    def __init__(self, local: CacheLocal, compartida: Optional[CacheCompartida],
+                 ttl_por_defecto: int = 300, ttl_version: float = 1.0):
+        self.local = local
+        self.compartida = compartida
+        self.ttl_por_defecto = ttl_por_defecto
+        self.ttl_version = ttl_version
+        self._versiones: Dict[str, Tuple[int, float]] = {}
+        self._secuencias: Dict[str, int] = {}  # Última secuencia de cambios aplicada por namespace
+        self._metricas: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    # -- métricas -----------------------------------------------------------------
+
+    def _contar(self, namespace: str, evento: str) -> None:
+        with self._lock:
+            contadores = self._metricas.setdefault(
+                namespace, {"hits_local": 0, "hits_compartida": 0, "misses": 0, "sets": 0, "invalidaciones": 0}
+            )
+            contadores[evento] += 1
+
+    def metricas(self) -> Dict[str, Any]:
+        with self._lock:
+            por_namespace = {ns: dict(c) for ns, c in self._metricas.items()}
+        for contadores in por_namespace.values():
+            consultas = contadores["hits_local"] + contadores["hits_compartida"] + contadores["misses"]
+            contadores["hit_ratio"] = round(
+                (contadores["hits_local"] + contadores["hits_compartida"]) / consultas, 3
+            ) if consultas else 0.0
+        return {
+            "local": {
+                "entradas": len(self.local),
+                "bytes": self.local.bytes_usados,
+                "max_bytes": self.local.max_bytes,
+                "desalojos": self.local.desalojos,
+            },
+            "compartida": str(self.compartida.ruta) if self.compartida else None,
+            "namespaces": por_namespace,
+        }
+
+    # -- versiones de namespace ---------------------------------------------------
+
+    def _version(self, namespace: str) -> int:
+        ahora = time.monotonic()
+        cacheada = self._versiones.get(namespace)
+        if cacheada and ahora - cacheada[1] < self.ttl_version:
+            return cacheada[0]
+        version = cacheada[0] if cacheada else 0
+        if self.compartida:
+            try:
+                version = self.compartida.version(namespace)
+            except sqlite3.Error as e:
+                logger.warning(f"Caché compartida no disponible (versión de {namespace}): {e}")
+        self._versiones[namespace] = (version, ahora)
+        return version
+
+    def version(self, namespace: str) -> int:
+        """Versión vigente del namespace (cambia con cada `invalidar(namespace)`)."""
+        return self._version(namespace)
+
+    def _clave(self, namespace: str, clave: str) -> str:
+        return f"{namespace}:v{self._version(namespace)}:{clave}"
+
+    # -- API ----------------------------------------------------------------------
+
+    def get(self, namespace: str, clave: str, default: Any = None) -> Any:
+        """Busca en el nivel local y luego en el compartido (promoviendo el valor al local)."""
+        return self._leer(namespace, self._clave(namespace, clave), default)
+
+    def _leer(self, namespace: str, clave_completa: str, default: Any) -> Any:
+        valor = self.local.get(clave_completa)
+        if valor is not _AUSENTE:
+            self._contar(namespace, "hits_local")
+            return valor
+
+        if self.compartida:
+            try:
+                encontrado = self.compartida.get(clave_completa)
+            except sqlite3.Error as e:
+                logger.warning(f"Caché compartida no disponible (get {clave_completa}): {e}")
+                encontrado = None
+            if encontrado is not None:
+                datos, expira = encontrado
+                valor = pickle.loads(datos)
+                self.local.set(clave_completa, valor, expira, len(datos))
+                self._contar(namespace, "hits_compartida")
+                return valor
+
+        self._contar(namespace, "misses")
+        return default
+
+    def set(self, namespace: str, clave: str, valor: Any, ttl: Optional[int] = None) -> None:
+        """Guarda el valor en ambos niveles con su TTL en segundos."""
+        self._guardar(namespace, self._clave(namespace, clave), valor, ttl)
+
+    def _guardar(self, namespace: str, clave_completa: str, valor: Any, ttl: Optional[int]) -> None:
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        expira = time.time() + (ttl if ttl is not None else self.ttl_por_defecto)
+        self.local.set(clave_completa, valor, expira, len(datos))
+        if self.compartida:
+            try:
+                self.compartida.set(clave_completa, datos, expira)
+            except sqlite3.Error as e:
+                logger.warning(f"Caché compartida no disponible (set {clave_completa}): {e}")
+        self._contar(namespace, "sets")
+
+    def get_or_set(self, namespace: str, clave: str, fabrica: Callable[[], Any], ttl: Optional[int] = None) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula con `fabrica` y lo guarda (None no se cachea).
+        La versión del namespace se lee una sola vez: si se invalida mientras `fabrica` calcula,
+        el valor queda bajo la versión anterior, inaccesible, en vez de pasar por vigente.
+        """
+        clave_completa = self._clave(namespace, clave)
+        valor = self._leer(namespace, clave_completa, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = fabrica()
+            if valor is not None:
+                self._guardar(namespace, clave_completa, valor, ttl)
+        return valor
+
+    def invalidar(self, namespace: str, clave: Optional[str] = None, secuencia: Optional[int] = None) -> None:
+        """
+        Invalida una clave puntual o, sin clave, el namespace completo en todos los workers.
+        `secuencia` identifica el cambio que origina la invalidación (ver `incrementar_version`).
+        """
+        if clave is not None:
+            clave_completa = self._clave(namespace, clave)
+            self.local.delete(clave_completa)
+            if self.compartida:
+                try:
+                    self.compartida.delete(clave_completa)
+                except sqlite3.Error as e:
+                    logger.warning(f"Caché compartida no disponible (delete {clave_completa}): {e}")
+        else:
+            if secuencia is not None and self._secuencias.get(namespace, -1) >= secuencia:
+                return
+            version = self._version(namespace) + 1
+            if self.compartida:
+                try:
+                    version = self.compartida.incrementar_version(namespace, secuencia)
+                except sqlite3.Error as e:
+                    logger.warning(f"Caché compartida no disponible (invalidar {namespace}): {e}")
+            self._versiones[namespace] = (version, time.monotonic())
+            if secuencia is not None:
+                self._secuencias[namespace] = secuencia
+        self._contar(namespace, "invalidaciones")
+
+
+def _crear_cache() -> CacheDosNiveles:
+    compartida = None
+    if settings.CACHE_COMPARTIDA_ACTIVA:
+        directorio = Path(settings.CACHE_DIR) if settings.CACHE_DIR else Path(tempfile.gettempdir()) / "ferremas_cache"
+        try:
+            compartida = CacheCompartida(directorio / "cache.sqlite3")
+        except (OSError, sqlite3.Error) as e:
+            logger.warning(f"No se pudo abrir la caché compartida en {directorio}; solo caché local: {e}")
+    return CacheDosNiveles(
+        CacheLocal(max_bytes=settings.CACHE_LOCAL_MAX_MB * 1024 * 1024),
+        compartida,
+        ttl_por_defecto=settings.CACHE_TTL_CATALOGO,
+        ttl_version=settings.CACHE_VERSION_TTL_SEG
+    )
+
+
+# Caché única de la aplicación: servicios e integraciones la usan por namespace
+cache = _crear_cache()
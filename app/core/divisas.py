@@ -1,26 +1,120 @@
-from typing import Dict, Any, Optional
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP, localcontext
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+
 from sqlalchemy.orm import Session
 
-from app.integrations.banco_central import BancoCentralIntegration
+from app.core.cache import cache
+from app.core.vectorizado import numpy_para
+from app.data.database import sesion_lectura
+from app.data.repositories.tipo_cambio_repository import TipoCambioRepository
+from app.integrations.banco_central import BancoCentralIntegration, CURRENCY_CODES, DIAS_BUSQUEDA_OBSERVACION
+
+Monto = Union[int, float, Decimal]
+
+# Decimales con que se expresa cada moneda (redondeo comercial, mitad hacia arriba)
+DECIMALES_MONEDA = {"clp": 0, "usd": 2, "eur": 2}
+
+# Distancia relativa a la mitad bajo la cual el camino NumPy recalcula con Decimal
+# (muy por sobre el error de las conversiones y la división en float64)
+MARGEN_EMPATE = 1e-12
+
+# Vida en caché de una tasa ya resuelta desde la serie local
+TTL_TASA = 60 * 60
+
+
+def convertir_montos(montos_clp: Sequence[Optional[Monto]], tasa: Decimal, moneda: str) -> List[Optional[float]]:
+    """
+    Convierte una página completa de montos en CLP a `moneda` con una sola tasa.
+    Los None se mantienen. El resultado se redondea según DECIMALES_MONEDA, igual con o sin NumPy.
+    """
+    decimales = DECIMALES_MONEDA[moneda]
+    indices = [i for i, monto in enumerate(montos_clp) if monto is not None]
+    convertidos: List[Optional[float]] = [None] * len(montos_clp)
+    if not indices:
+        return convertidos
+
+    cuanto = Decimal(1).scaleb(-decimales)
+
+    def redondear(monto: Monto) -> float:
+        monto = monto if isinstance(monto, Decimal) else Decimal(str(monto))
+        return float((monto / tasa).quantize(cuanto))
+
+    np = numpy_para(len(indices))
+    if np is not None:
+        escala = 10 ** decimales
+        valores = np.array([float(montos_clp[i]) for i in indices], dtype=np.float64) / float(tasa) * escala
+        absolutos = np.abs(valores)
+        # ROUND_HALF_UP aleja la mitad del cero: se redondea el valor absoluto y se repone el signo
+        resultado = np.copysign(np.floor(absolutos + 0.5), valores) / escala
+        # El error del cálculo en float es de unos pocos ulp: lejos de la mitad, este redondeo
+        # coincide con el de Decimal. Los casi empates se recalculan con Decimal
+        dudosos = np.flatnonzero(
+            np.abs(absolutos - np.floor(absolutos) - 0.5) <= np.maximum(absolutos, 1.0) * MARGEN_EMPATE
+        )
+        with localcontext() as ctx:
+            ctx.rounding = ROUND_HALF_UP
+            for j in dudosos.tolist():
+                resultado[j] = redondear(montos_clp[indices[j]])
+        for i, valor in zip(indices, resultado.tolist()):
+            convertidos[i] = valor
+        return convertidos
+
+    with localcontext() as ctx:
+        ctx.rounding = ROUND_HALF_UP
+        for i in indices:
+            convertidos[i] = redondear(montos_clp[i])
+    return convertidos
+
 
 class DivisaService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Optional[Session] = None):
         self.db = db
         self.bc_api = BancoCentralIntegration()
 
-    def obtener_tasa_cambio(self, moneda: str) -> Dict[str, Any]:
-        """Obtiene la tasa de cambio actual desde el Banco Central."""
+    def obtener_tasa_cambio(self, moneda: str, fecha: Optional[date] = None) -> Dict[str, Any]:
+        """
+        Tasa vigente en `fecha` (por defecto hoy) según la serie local `tipos_cambio`,
+        con la última observación anterior como respaldo para fines de semana y feriados.
+        Las fechas pasadas nunca consultan al Banco Central; solo el día en curso recurre
+        a la API si la serie local todavía no está al día.
+        """
+        moneda = moneda.lower()
+        if moneda not in CURRENCY_CODES:
+            return {"error": f"No se encontró tasa para la moneda '{moneda}'"}
+        hoy = date.today()
+        fecha = fecha or hoy
+
         try:
-            tasa = self.bc_api.obtener_tasa(moneda)
-            if tasa is None:
-                return {"error": f"No se encontró tasa para la moneda '{moneda}'"}
+            vigente = cache.get_or_set(
+                "tasas", f"{moneda}:{fecha.isoformat()}", lambda: self._tasa_local(moneda, fecha), ttl=TTL_TASA
+            )
+            if vigente is None and fecha >= hoy:
+                observacion = self.bc_api.obtener_observacion(moneda, fecha.isoformat())
+                if observacion is not None:
+                    vigente = (date.fromisoformat(observacion[0]), Decimal(str(observacion[1])))
+            if vigente is None:
+                return {"error": f"Sin tipo de cambio {moneda.upper()} registrado hasta {fecha.isoformat()}"}
+            fecha_observacion, tasa = vigente
             return {
                 "moneda": moneda.upper(),
-                "tasa": tasa
+                "tasa": Decimal(tasa),
+                "fecha": fecha_observacion.isoformat()
             }
         except Exception as e:
             return {"error": str(e)}
 
+    def _tasa_local(self, moneda: str, fecha: date) -> Optional[Tuple[date, Decimal]]:
+        """Observación local vigente, descartada si es más antigua que la ventana de búsqueda."""
+        if self.db is not None:
+            vigente = TipoCambioRepository(self.db).get_vigente(moneda, fecha)
+        else:
+            with sesion_lectura() as db:
+                vigente = TipoCambioRepository(db).get_vigente(moneda, fecha)
+        if vigente is None or (fecha - vigente[0]).days > DIAS_BUSQUEDA_OBSERVACION:
+            return None
+        return vigente
+
     def convertir_a_clp(self, moneda: str, monto: float) -> Dict[str, Any]:
         """Convierte un monto en otra divisa a pesos chilenos."""
         try:
@@ -36,3 +130,17 @@ class DivisaService:
             }
         except Exception as e:
             return {"error": str(e)}
+
+    def convertir_desde_clp(self, montos: Sequence[Optional[Monto]], moneda: str) -> Dict[str, Any]:
+        """Convierte una lista de montos en CLP a `moneda` en un solo lote con la tasa del día."""
+        moneda = moneda.lower()
+        if moneda not in DECIMALES_MONEDA:
+            return {"error": f"Moneda no soportada: '{moneda}'"}
+        if moneda == "clp":
+            return {"moneda": "CLP", "tasa": Decimal(1), "fecha": None,
+                    "montos": convertir_montos(montos, Decimal(1), "clp")}
+
+        tasa = self.obtener_tasa_cambio(moneda)
+        if "error" in tasa:
+            return tasa
+        return {**tasa, "montos": convertir_montos(montos, tasa["tasa"], moneda)}
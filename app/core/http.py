@@ -0,0 +1,84 @@
+import hashlib
+from datetime import date
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi import Request, Response, status
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _orjson_default(obj: Any) -> Any:
+    """Tipos que orjson no serializa de forma nativa."""
+    if isinstance(obj, BaseModel):
+        # Los servicios entregan modelos ya construidos desde datos tipados de la BD:
+        # se serializan sus campos directamente, sin volver a validarlos.
+        return obj.__dict__
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, date):
+        return obj.isoformat()
+    raise TypeError(f"Tipo no serializable a JSON: {type(obj).__name__}")
+
+
+def serializar_json(datos: Any) -> bytes:
+    """Serializa a JSON con orjson (Decimal, datetime y modelos pydantic incluidos)."""
+    return orjson.dumps(datos, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class RespuestaJSON(JSONResponse):
+    """
+    Respuesta JSON por defecto de la API, serializada con orjson.
+    Devolverla directamente desde un endpoint evita la re-validación contra
+    `response_model`; el modelo sigue declarado para la documentación OpenAPI.
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return serializar_json(content)
+
+
+def calcular_etag(contenido: bytes) -> str:
+    """Genera un ETag fuerte a partir del cuerpo serializado."""
+    return '"' + hashlib.sha1(contenido).hexdigest() + '"'
+
+
+def etag_codificado(etag: str, codificacion: str) -> str:
+    """ETag fuerte de la variante comprimida (`"abc"` -> `"abc-gzip"`), distinto del sin comprimir."""
+    return f'{etag[:-1]}-{codificacion}"'
+
+
+def etag_coincide(request: Request, etag: str) -> bool:
+    """Indica si el cliente ya tiene la representación actual (If-None-Match)."""
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidatos = [valor.strip() for valor in if_none_match.split(",")]
+    return "*" in candidatos or etag in candidatos or f"W/{etag}" in candidatos
+
+
+def respuesta_json_etag(request: Request, datos: Any, max_age: int = 0) -> Response:
+    """
+    Serializa `datos` a JSON y responde con ETag.
+    Si el cliente envía un If-None-Match vigente se responde 304 sin cuerpo.
+    """
+    contenido = serializar_json(datos)
+    etag = calcular_etag(contenido)
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+
+    if etag_coincide(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return Response(content=contenido, media_type="application/json", headers=headers)
+
+
+def respuesta_precalculada(request: Request, contenido: bytes, etag: str, max_age: int = 0) -> Response:
+    """
+    Responde un JSON ya serializado (y su ETag ya calculado) sin tocarlo: 304 si el
+    cliente tiene la versión vigente.
+    """
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={max_age}, must-revalidate"}
+    if etag_coincide(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=contenido, media_type="application/json", headers=headers)
@@ -1,8 +1,16 @@
 from fastapi import Request, Response
 from fastapi.middleware.gzip import GZipMiddleware
+from starlette.routing import Match
+import math
 import time
 import logging
 
+from app.data.database import router, COOKIE_ESCRITURA, METODOS_LECTURA
+from app.data.pool_monitor import ruta_actual
+from app.data.sql_profiler import PerfilSQL, perfil_actual
+from app.core.rate_limit import limitar_tasa
+from config import settings
+
 logger = logging.getLogger(__name__)
 
 async def log_requests(request: Request, call_next):
@@ -49,8 +57,79 @@ async def security_headers(request: Request, call_next):
             response.headers["Strict-Transport-Security"] = "max-age=31536000; includeSubDomains"
     return response
 
+async def marcar_escrituras(request: Request, call_next):
+    """
+    Tras una escritura exitosa marca al cliente para que sus lecturas siguientes
+    vayan al primario mientras las réplicas puedan estar atrasadas (read-your-writes).
+    """
+    response = await call_next(request)
+    if router.replicas and request.method not in METODOS_LECTURA and response.status_code < 400:
+        response.set_cookie(
+            COOKIE_ESCRITURA,
+            f"{time.time():.3f}",
+            max_age=max(1, math.ceil(router.lag_tolerancia)),
+            httponly=True,
+            samesite="lax"
+        )
+    return response
+
+def plantilla_ruta(request: Request) -> str:
+    """Plantilla de la ruta que atenderá la request (ej. /api/productos/productos/{codigo})."""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return f"{request.method} {getattr(route, 'path', request.url.path)}"
+    return f"{request.method} {request.url.path}"
+
+async def registrar_ruta(request: Request, call_next):
+    """Expone la ruta en curso para atribuir el uso del pool de conexiones."""
+    token = ruta_actual.set(plantilla_ruta(request))
+    try:
+        return await call_next(request)
+    finally:
+        ruta_actual.reset(token)
+
+async def perfilar_sql(request: Request, call_next):
+    """
+    Cuenta las consultas y el tiempo de BD de cada request y detecta patrones N+1.
+    En DEBUG se exponen como headers X-DB-*; en cualquier modo las requests lentas
+    o con sospecha de N+1 quedan en el log con su resumen.
+    """
+    perfil = PerfilSQL()
+    token = perfil_actual.set(perfil)
+    start_time = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        perfil_actual.reset(token)
+    process_time = (time.perf_counter() - start_time) * 1000
+
+    sospechas = perfil.sospechas_n_mas_1(settings.SQL_N_MAS_1_UMBRAL)
+
+    if settings.DEBUG:
+        response.headers["X-DB-Queries"] = str(perfil.consultas)
+        response.headers["X-DB-Time-ms"] = f"{perfil.tiempo_total * 1000:.2f}"
+        response.headers["X-DB-N1"] = str(len(sospechas))
+
+    ruta = ruta_actual.get()
+    for sospecha in sospechas:
+        logger.warning(
+            f"Posible N+1 en {ruta}: {sospecha['repeticiones']} ejecuciones "
+            f"({sospecha['tiempo_ms']}ms) de: {sospecha['sentencia'][:300]}"
+        )
+
+    if process_time > settings.SLOW_REQUEST_MS:
+        logger.warning(f"Request lenta {ruta} Time={process_time:.2f}ms SQL={perfil.resumen()}")
+
+    return response
+
 def setup_middlewares(app):
+    app.middleware("http")(perfilar_sql)
+    app.middleware("http")(registrar_ruta)
+    app.middleware("http")(marcar_escrituras)
     app.middleware("http")(security_headers)
+    # Antes que todo lo demás (salvo el log): las requests rechazadas no llegan a la app
+    app.middleware("http")(limitar_tasa)
     app.middleware("http")(log_requests)
     app.add_middleware(GZipMiddleware, minimum_size=1000)
     logger.info("✅ Middlewares configurados correctamente")
\ No newline at end of file
@@ -0,0 +1,123 @@
+"""
+Páginas HTML del frontend renderizadas una vez y servidas desde memoria.
+
+Las plantillas se compilan al arrancar (`precompilar`): las que faltan quedan en el log y
+usan su página de respaldo, en lugar de costar una excepción por request. Cada página se
+renderiza una sola vez por (plantilla, versión del contexto) y se guarda con su versión
+gzip y un ETag para cada codificación, así una request cuesta un lookup en un diccionario.
+"""
+import gzip
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response, status
+from jinja2 import Environment, FileSystemLoader, Template, TemplateNotFound, select_autoescape
+
+from app.core.http import calcular_etag, etag_codificado, etag_coincide
+
+logger = logging.getLogger(__name__)
+
+MAX_PAGINAS = 64  # Páginas renderizadas en memoria (plantilla x versión del contexto)
+
+
+class PaginaRenderizada(NamedTuple):
+    html: bytes
+    gzip: Optional[bytes]  # None si comprimir no la achica
+    etag: str
+    etag_gzip: Optional[str]  # ETag propio de la versión gzip (cada codificación tiene el suyo)
+
+
+class PaginasHTML:
+    """
+    Plantillas Jinja2 precompiladas y páginas renderizadas por versión de contexto.
+
+    El contexto de estas páginas no depende de la request: quien llama entrega una
+    `version` que cambia cuando cambia el contexto (por ejemplo, la versión de la app).
+    Con `recargar` (modo DEBUG) se revisa si el archivo cambió y se vuelve a compilar.
+    """
+
+    def __init__(self, directorio: Path, recargar: bool = False):
+        self.env = Environment(
+            loader=FileSystemLoader(str(directorio)),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=recargar,
+        )
+        self.recargar = recargar
+        self._registradas: Dict[str, Optional[str]] = {}  # nombre -> HTML de respaldo
+        self._plantillas: Dict[str, Template] = {}
+        self._renderizadas: Dict[Tuple[str, str], PaginaRenderizada] = {}
+        self.faltantes: list = []
+        self._lock = threading.Lock()
+
+    def registrar(self, nombre: str, respaldo: Optional[str] = None) -> None:
+        """Declara una página que se sirve; `respaldo` es el HTML a usar si falta la plantilla."""
+        self._registradas[nombre] = respaldo
+
+    def precompilar(self) -> None:
+        """Compila las plantillas registradas. Las faltantes usan su respaldo y se informan una vez."""
+        self.faltantes = []
+        for nombre in self._registradas:
+            self._compilar(nombre)
+        if self.faltantes:
+            logger.warning(f"Plantillas no encontradas (se sirve su página de respaldo): {', '.join(self.faltantes)}")
+
+    def _compilar(self, nombre: str) -> Template:
+        try:
+            plantilla = self.env.get_template(nombre)
+        except TemplateNotFound:
+            respaldo = self._registradas.get(nombre)
+            if respaldo is None:
+                raise
+            if nombre not in self.faltantes:
+                self.faltantes.append(nombre)
+            plantilla = self.env.from_string(respaldo)
+        self._plantillas[nombre] = plantilla
+        return plantilla
+
+    def _plantilla(self, nombre: str) -> Template:
+        plantilla = self._plantillas.get(nombre)
+        if plantilla is None or (self.recargar and plantilla.filename and not plantilla.is_up_to_date):
+            with self._lock:
+                plantilla = self._compilar(nombre)
+                # Lo renderizado con la versión anterior del archivo ya no sirve
+                for clave in [c for c in self._renderizadas if c[0] == nombre]:
+                    del self._renderizadas[clave]
+        return plantilla
+
+    def renderizar(self, nombre: str, contexto: Optional[Dict[str, Any]] = None, version: str = "") -> PaginaRenderizada:
+        """Página renderizada de la plantilla; se renderiza y comprime solo la primera vez por versión."""
+        plantilla = self._plantilla(nombre)
+        pagina = self._renderizadas.get((nombre, version))
+        if pagina is not None:
+            return pagina
+
+        html = plantilla.render(**(contexto or {})).encode("utf-8")
+        comprimido = gzip.compress(html, compresslevel=9)
+        etag = calcular_etag(html)
+        if len(comprimido) < len(html):
+            pagina = PaginaRenderizada(html, comprimido, etag, etag_codificado(etag, "gzip"))
+        else:
+            pagina = PaginaRenderizada(html, None, etag, None)
+        with self._lock:
+            if len(self._renderizadas) >= MAX_PAGINAS:
+                self._renderizadas.pop(next(iter(self._renderizadas)))
+            self._renderizadas[(nombre, version)] = pagina
+        return pagina
+
+    def respuesta(self, request: Request, nombre: str, contexto: Optional[Dict[str, Any]] = None,
+                  version: str = "") -> Response:
+        """
+        Responde la página con ETag (304 si el cliente la tiene) y, si el cliente acepta
+        gzip, con el cuerpo ya comprimido.
+        """
+        pagina = self.renderizar(nombre, contexto, version)
+        con_gzip = pagina.gzip is not None and "gzip" in request.headers.get("accept-encoding", "")
+        etag = pagina.etag_gzip if con_gzip else pagina.etag
+        headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_coincide(request, etag):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        if con_gzip:
+            return Response(content=pagina.gzip, media_type="text/html", headers={**headers, "Content-Encoding": "gzip"})
+        return Response(content=pagina.html, media_type="text/html", headers=headers)
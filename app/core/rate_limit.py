@@ -0,0 +1,210 @@
+import logging
+import math
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import jwt
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from config import settings
+from app.core.cache import cache
+from app.core.security import SECRET_KEY, ALGORITHM
+
+logger = logging.getLogger(__name__)
+
+_UNIDADES = {
+    "s": 1, "seg": 1, "segundo": 1, "second": 1,
+    "m": 60, "min": 60, "minuto": 60, "minute": 60,
+    "h": 3600, "hora": 3600, "hour": 3600,
+}
+
+
+@dataclass(frozen=True)
+class Politica:
+    """Límite de una ruta: `capacidad` solicitudes de ráfaga que se reponen a `por_segundo`."""
+    ruta: str
+    capacidad: float
+    por_segundo: float
+
+    @classmethod
+    def desde_texto(cls, ruta: str, texto: str) -> "Politica":
+        """Interpreta "5/minuto", "10/s", "100/hora"."""
+        cantidad, unidad = texto.strip().split("/")
+        segundos = _UNIDADES[unidad.strip().lower()]
+        return cls(ruta=ruta, capacidad=float(cantidad), por_segundo=float(cantidad) / segundos)
+
+
+class LimitadorLocal:
+    """Token buckets en memoria del proceso (un worker)."""
+
+    def __init__(self, max_claves: int = 100_000):
+        self.max_claves = max_claves
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def tomar_token(self, clave: str, capacidad: float, por_segundo: float) -> float:
+        ahora = time.monotonic()
+        with self._lock:
+            tokens, actualizado = self._buckets.get(clave, (capacidad, ahora))
+            tokens = min(capacidad, tokens + (ahora - actualizado) * por_segundo)
+            espera = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                espera = (1 - tokens) / por_segundo
+            self._buckets[clave] = (tokens, ahora)
+            if len(self._buckets) > self.max_claves:
+                self._podar(ahora)
+        return espera
+
+    def _podar(self, ahora: float) -> None:
+        """Descarta los buckets sin uso en la última hora (ya estarían llenos)."""
+        for clave in [c for c, (_, actualizado) in self._buckets.items() if ahora - actualizado > 3600]:
+            del self._buckets[clave]
+
+
+class LimitadorTasa:
+    """
+    Control de admisión por ruta. Cada política aplica un token bucket por IP y, si la
+    request trae un token Bearer válido, otro por usuario; deben conceder ambos. Además puede
+    limitar cuántas requests de una ruta se atienden a la vez en este worker.
+    Con `compartido=True` los buckets viven en la caché compartida (todos los workers).
+    """
+
+    def __init__(self, politicas: Dict[str, str], concurrencia: Dict[str, int],
+                 compartido: bool = False, confiar_proxy: bool = False):
+        self.politicas = {ruta: Politica.desde_texto(ruta, texto) for ruta, texto in politicas.items()}
+        self.concurrencia = dict(concurrencia)
+        self.compartido = compartido and cache.compartida is not None
+        self.confiar_proxy = confiar_proxy
+        self.local = LimitadorLocal()
+        self._en_curso: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        rutas = set(self.politicas) | set(self.concurrencia)
+        self._con_parametros = any("{" in ruta for ruta in rutas)
+        self._rutas = rutas
+
+    def ruta_limitada(self, request: Request) -> Optional[str]:
+        """Ruta (con el formato de las políticas) si tiene algún límite; None si no."""
+        literal = f"{request.method} {request.url.path}"
+        if literal in self._rutas:
+            return literal
+        if self._con_parametros:
+            from app.core.middlewares import plantilla_ruta
+            plantilla = plantilla_ruta(request)
+            if plantilla in self._rutas:
+                return plantilla
+        return None
+
+    def claves(self, request: Request, ruta: str) -> List[str]:
+        """Claves de los buckets a consultar, en orden: primero la del usuario (si hay) y luego la de la IP."""
+        claves = []
+        usuario = _usuario_del_token(request)
+        if usuario:
+            claves.append(f"{ruta}|usuario:{usuario}")
+        claves.append(f"{ruta}|ip:{self._ip(request)}")
+        return claves
+
+    def _ip(self, request: Request) -> str:
+        if self.confiar_proxy:
+            reenviada = request.headers.get("x-forwarded-for")
+            if reenviada:
+                return reenviada.split(",")[0].strip()
+        return request.client.host if request.client else "desconocido"
+
+    def _tomar(self, clave: str, politica: Politica) -> float:
+        if self.compartido:
+            try:
+                return cache.compartida.tomar_token(clave, politica.capacidad, politica.por_segundo)
+            except sqlite3.Error as e:
+                logger.warning(f"Limitador compartido no disponible, se usa el local: {e}")
+        return self.local.tomar_token(clave, politica.capacidad, politica.por_segundo)
+
+    def admitir(self, request: Request, ruta: str) -> float:
+        """0 si la request puede pasar; si no, segundos sugeridos para reintentar."""
+        politica = self.politicas.get(ruta)
+        if politica is None:
+            return 0.0
+        # Si un bucket rechaza no se consultan los siguientes: un usuario que agotó el suyo
+        # no gasta los tokens de su IP (compartida, por ejemplo, detrás de un NAT)
+        for clave in self.claves(request, ruta):
+            espera = self._tomar(clave, politica)
+            if espera > 0:
+                return espera
+        return 0.0
+
+    def entrar(self, ruta: str) -> bool:
+        """Reserva un lugar entre las requests concurrentes de la ruta."""
+        maximo = self.concurrencia.get(ruta)
+        if maximo is None:
+            return True
+        with self._lock:
+            if self._en_curso.get(ruta, 0) >= maximo:
+                return False
+            self._en_curso[ruta] = self._en_curso.get(ruta, 0) + 1
+        return True
+
+    def salir(self, ruta: str) -> None:
+        if ruta in self.concurrencia:
+            with self._lock:
+                self._en_curso[ruta] -= 1
+
+
+def _usuario_del_token(request: Request) -> Optional[str]:
+    """
+    `sub` del JWT Bearer con la firma verificada. Un token inválido o vencido no tiene
+    bucket de usuario (solo el de su IP): así nadie puede agotar el bucket de otro
+    usuario forjando un token con su `sub`.
+    """
+    autorizacion = request.headers.get("authorization", "")
+    if not autorizacion.lower().startswith("bearer "):
+        return None
+    try:
+        datos = jwt.decode(autorizacion[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    return str(datos["sub"]) if datos.get("sub") else None
+
+
+def _demasiadas_solicitudes(espera: float, detalle: str) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": detalle},
+        headers={"Retry-After": str(max(1, math.ceil(espera)))}
+    )
+
+
+limitador = LimitadorTasa(
+    settings.RATE_LIMIT_POLITICAS,
+    settings.RATE_LIMIT_CONCURRENCIA,
+    compartido=settings.RATE_LIMIT_COMPARTIDO,
+    confiar_proxy=settings.RATE_LIMIT_CONFIAR_PROXY
+)
+
+
+async def limitar_tasa(request: Request, call_next):
+    """
+    Rechaza con 429 + Retry-After antes de ejecutar el handler (sin bcrypt ni
+    llamadas a Webpay) cuando el cliente superó la política de la ruta.
+    """
+    if not settings.RATE_LIMIT_ACTIVO:
+        return await call_next(request)
+    ruta = limitador.ruta_limitada(request)
+    if ruta is None:
+        return await call_next(request)
+
+    espera = limitador.admitir(request, ruta)
+    if espera > 0:
+        logger.warning(f"Límite de tasa superado en {ruta} por {limitador._ip(request)}")
+        return _demasiadas_solicitudes(espera, "Demasiadas solicitudes, intente nuevamente más tarde")
+
+    if not limitador.entrar(ruta):
+        return _demasiadas_solicitudes(1, "Servidor ocupado, intente nuevamente en unos segundos")
+    try:
+        return await call_next(request)
+    finally:
+        limitador.salir(ruta)
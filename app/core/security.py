@@ -1,9 +1,53 @@
+import jwt
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from passlib.context import CryptContext
+from sqlalchemy.orm import Session
+
+from app.data.database import get_db_lectura
+from app.data.models.usuarios import RolEnum, Usuario
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Clave y algoritmo con que se firman y validan los tokens JWT
+SECRET_KEY = "h3n1234sdfg1234h3n1234sdfg1234h3n1234sdfg1234"
+ALGORITHM = "HS256"
+
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
+
+# Seguridad con HTTP Bearer (JWT)
+bearer = HTTPBearer()
+
+# Dependencia para obtener el usuario actual a partir del JWT
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer)):
+    try:
+        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        user_id = payload.get("sub")
+        if user_id is None:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+        # Aquí podrías consultar la base de datos para obtener el usuario si lo necesitas
+        return {"user_id": user_id}
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expirado")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
+
+
+def get_usuario_actual(usuario: dict = Depends(get_current_user), db: Session = Depends(get_db_lectura)) -> Usuario:
+    """Usuario activo dueño del token (el `sub` es su email)."""
+    encontrado = db.query(Usuario).filter(Usuario.email == usuario["user_id"]).first()
+    if encontrado is None or not encontrado.activo:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Usuario no encontrado o inactivo")
+    return encontrado
+
+def requiere_rol(*roles: RolEnum):
+    """Dependencia que exige que el usuario del token tenga alguno de los roles indicados."""
+    def verificar(usuario: Usuario = Depends(get_usuario_actual)) -> Usuario:
+        if usuario.rol not in roles:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tiene permisos para este recurso")
+        return usuario
+    return verificar
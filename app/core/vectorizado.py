@@ -0,0 +1,23 @@
+"""
+NumPy opcional para los cálculos en bloque (conversión de monedas, descuentos).
+
+NumPy no es una dependencia obligatoria: quien calcula pide el módulo con `numpy_para`
+y, si recibe None, sigue por su camino en Python puro.
+"""
+from types import ModuleType
+from typing import Optional
+
+# Desde este número de elementos se usa NumPy (si está instalado); con pocos la
+# conversión a arreglos cuesta más que el cálculo
+UMBRAL_NUMPY = 256
+
+
+def numpy_para(cantidad: int) -> Optional[ModuleType]:
+    """Módulo numpy si conviene para `cantidad` elementos y está instalado; si no, None."""
+    if cantidad < UMBRAL_NUMPY:
+        return None
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
@@ -1,7 +1,17 @@
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session, declarative_base  # ✅
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base  # ✅
+from sqlalchemy.sql.dml import UpdateBase
+from contextlib import contextmanager
+from fastapi import Request
+from typing import List, Optional
+import itertools
+import threading
 import logging
+import time
 from config import settings
+from app.data.pool_monitor import PoolInstrumentado, monitor_pool
+from app.data.sql_profiler import instrumentar_engine
 
 # ✅ Crear el Base global de los modelos
 Base = declarative_base()
@@ -9,41 +19,171 @@ Base = declarative_base()
 
 DATABASE_URL = settings.DATABASE_URL
 
+# Cookie con la marca de tiempo de la última escritura del cliente (read-your-writes)
+COOKIE_ESCRITURA = "ferremas_rw"
+METODOS_LECTURA = {"GET", "HEAD", "OPTIONS"}
+
 # Configurar logging para SQLAlchemy
 logging.basicConfig()
 logging.getLogger('sqlalchemy.engine').setLevel(logging.INFO if __name__ == "__main__" else logging.WARNING)
 
-# Crear el engine con configuraciones específicas para MySQL
-engine = create_engine(
-    DATABASE_URL,
-    echo=False,  # Cambiar a True para debug SQL
-    pool_pre_ping=True,  # Verificar conexiones antes de usarlas
-    pool_recycle=3600,   # Reciclar conexiones cada hora
-    pool_size=10,        # Tamaño del pool de conexiones
-    max_overflow=20,     # Conexiones adicionales permitidas
-    connect_args={
-        "charset": "utf8mb4",
-        "use_unicode": True,
-        "autocommit": False
-    }
+
+def _es_sqlite_en_memoria(url: str) -> bool:
+    return url in ("sqlite://", "sqlite:///:memory:")
+
+
+def _sin_transacciones(engine: Engine) -> Engine:
+    """
+    En AUTOCOMMIT no hay transacción que cerrar, pero algunos drivers (mysql-connector)
+    envían igual un ROLLBACK al cerrar la sesión. Se anulan solo en el dialecto de
+    este engine (cada engine tiene su propia instancia).
+    """
+    engine.dialect.do_rollback = lambda dbapi_connection: None
+    engine.dialect.do_commit = lambda dbapi_connection: None
+    return engine
+
+
+def crear_engine(url: str, solo_lectura: bool = False) -> Engine:
+    """
+    Crea un engine para MySQL o SQLite (desarrollo y pruebas locales, p. ej. dos
+    archivos que hacen de primario y réplica). El pool se dimensiona desde Settings
+    y queda instrumentado por `monitor_pool` y el perfilador SQL.
+
+    Con `solo_lectura=True` las conexiones quedan en AUTOCOMMIT desde que se abren, el
+    pool no las resetea al devolverlas y la sesión no emite COMMIT/ROLLBACK: una lectura
+    cuesta solo sus consultas.
+    """
+    opciones_lectura = {"isolation_level": "AUTOCOMMIT", "pool_reset_on_return": None} if solo_lectura else {}
+
+    if url.startswith("sqlite"):
+        sqlite_engine = create_engine(
+            url,
+            echo=settings.SQL_ECHO,
+            connect_args={"check_same_thread": False},
+            **({} if _es_sqlite_en_memoria(url) else {"poolclass": PoolInstrumentado}),
+            **opciones_lectura
+        )
+        monitor_pool.instrumentar(sqlite_engine)
+        instrumentar_engine(sqlite_engine)
+        return _sin_transacciones(sqlite_engine) if solo_lectura else sqlite_engine
+
+    # Crear el engine con configuraciones específicas para MySQL
+    mysql_engine = create_engine(
+        url,
+        echo=settings.SQL_ECHO,  # SQL_ECHO=True en .env para debug SQL
+        poolclass=PoolInstrumentado,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        connect_args={
+            "charset": "utf8mb4",
+            "use_unicode": True,
+            "autocommit": solo_lectura
+        },
+        **opciones_lectura
+    )
+    monitor_pool.instrumentar(mysql_engine)
+    instrumentar_engine(mysql_engine)
+    return _sin_transacciones(mysql_engine) if solo_lectura else mysql_engine
+
+
+class SessionRouter:
+    """
+    Elige el engine para cada operación: escrituras al primario y lecturas
+    de sesiones de solo lectura repartidas entre las réplicas (round-robin).
+    Sin réplicas, las lecturas usan `lectura_primario` (el primario en AUTOCOMMIT).
+    """
+
+    def __init__(self, primario: Engine, replicas: List[Engine], lag_tolerancia: float,
+                 lectura_primario: Optional[Engine] = None):
+        self.primario = primario
+        self.replicas = replicas
+        self.lag_tolerancia = lag_tolerancia
+        self.lectura_primario = lectura_primario or primario
+        self._ciclo = itertools.cycle(replicas) if replicas else None
+        self._lock = threading.Lock()
+
+    def engine_lectura(self) -> Engine:
+        """Siguiente réplica disponible, o el primario de lectura si no hay réplicas."""
+        if not self._ciclo:
+            return self.lectura_primario
+        with self._lock:
+            return next(self._ciclo)
+
+    def escritura_reciente(self, request: Optional[Request]) -> bool:
+        """Indica si el cliente escribió hace menos que la tolerancia de lag de las réplicas."""
+        if request is None:
+            return False
+        marca = request.cookies.get(COOKIE_ESCRITURA)
+        if not marca:
+            return False
+        try:
+            return time.time() - float(marca) < self.lag_tolerancia
+        except ValueError:
+            return False
+
+
+engine = crear_engine(DATABASE_URL)
+replica_engines = [crear_engine(url, solo_lectura=settings.DB_LECTURA_AUTOCOMMIT) for url in settings.DATABASE_REPLICA_URLS]
+
+# Sin réplicas, las lecturas van al primario por un pool propio en AUTOCOMMIT.
+# Una base SQLite en memoria no puede compartirse entre dos engines.
+engine_lectura_primario = (
+    crear_engine(DATABASE_URL, solo_lectura=True)
+    if settings.DB_LECTURA_AUTOCOMMIT and not replica_engines and not _es_sqlite_en_memoria(DATABASE_URL)
+    else None
 )
+router = SessionRouter(engine, replica_engines, settings.REPLICA_LAG_TOLERANCIA_SEG, engine_lectura_primario)
 
-# Configurar el sessionmaker
+def todos_los_engines() -> List[Engine]:
+    """Primario (y su pool de lectura, si existe) seguido de las réplicas."""
+    return [engine, *([engine_lectura_primario] if engine_lectura_primario else []), *replica_engines]
+
+
+class RoutingSession(Session):
+    """
+    Sesión que enruta cada sentencia según `info`:
+    - `solo_lectura=True`: las lecturas van a una réplica (la misma durante toda la sesión).
+    - Cualquier flush o INSERT/UPDATE/DELETE va al primario y marca la sesión como
+      `escritura`, por lo que el resto de la sesión lee también del primario.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["escritura"] = True
+            return router.primario
+        if self.info.get("escritura") or not self.info.get("solo_lectura"):
+            return router.primario
+        if "replica" not in self.info:
+            self.info["replica"] = router.engine_lectura()
+        return self.info["replica"]
+
+
+# Configurar el sessionmaker. Cada request recibe su propia sesión; la conexión
+# se obtiene del pool recién en la primera consulta (los handlers que no tocan la
+# base no ocupan conexión).
 SessionLocal = sessionmaker(
-    bind=engine,
+    class_=RoutingSession,
     autocommit=False,
     autoflush=False,
     expire_on_commit=False
 )
 
-# Crear sesión con scope
-db_session = scoped_session(SessionLocal)
-
-def get_db():
+def get_db(request: Request = None):
     """
-    Generador de sesiones de base de datos para FastAPI Dependency Injection
+    Generador de sesiones de base de datos para FastAPI Dependency Injection.
+    Las rutas GET leen de réplica (o del pool AUTOCOMMIT del primario) salvo que el
+    cliente haya escrito hace menos de REPLICA_LAG_TOLERANCIA_SEG; el resto de
+    métodos usa el primario. Las rutas que escriben deben usar `get_db_escritura`.
     """
-    db = db_session()
+    solo_lectura = (
+        request is not None
+        and request.method in METODOS_LECTURA
+        and not router.escritura_reciente(request)
+    )
+    db = SessionLocal(info={"solo_lectura": solo_lectura})
     try:
         yield db
     except Exception as e:
@@ -52,12 +192,49 @@ def get_db():
     finally:
         db.close()
 
+def get_db_lectura(request: Request = None):
+    """
+    Sesión explícitamente de solo lectura (p. ej. búsquedas o login por POST).
+    Respeta la ventana read-your-writes del cliente.
+    """
+    db = SessionLocal(info={"solo_lectura": not router.escritura_reciente(request)})
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_db_escritura():
+    """
+    Sesión para rutas que escriben, con el ciclo de la transacción explícito:
+    siempre en el primario, COMMIT al terminar el handler sin errores y ROLLBACK
+    si lanza. Los servicios pueden confirmar antes por su cuenta; el COMMIT final
+    de una transacción vacía no llega a la base.
+    """
+    db = SessionLocal(info={"solo_lectura": False})
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+@contextmanager
+def sesion_lectura():
+    """Sesión de solo lectura para scripts y tareas fuera de una request."""
+    db = SessionLocal(info={"solo_lectura": True})
+    try:
+        yield db
+    finally:
+        db.close()
+
 def test_connection():
     """
     Prueba la conexión a la base de datos
     """
     try:
-        db = db_session()
+        db = SessionLocal()
         # Ejecutar una consulta simple para probar la conexión
         result = db.execute("SELECT 1")
         result.fetchone()
@@ -71,4 +248,4 @@ def test_connection():
 
 if __name__ == "__main__":
     print("Probando conexión a la base de datos...")
-    test_connection()
\ No newline at end of file
+    test_connection()
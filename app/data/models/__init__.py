@@ -1,7 +1,13 @@
-from .productos import Producto, Categoria, Marca, PrecioHistorico, Proveedor
-from .webpay import Pago, Mensaje
+from .productos import Producto, Categoria, Marca, PrecioHistorico, Proveedor, ProductoProveedor
+from .webpay import Pago, PagoLinea, Mensaje, ContadorMensajes, ResumenPagosHora, ResumenPagosDia, AvanceResumen
+from .divisas import TipoCambio
+from .cambios import Cambio
+from .inventario import MovimientoStock, CorteStock
 
 __all__ = [
-    "Producto", "Categoria", "Marca", "PrecioHistorico", "Proveedor",
-    "Pago", "Mensaje"
+    "Producto", "Categoria", "Marca", "PrecioHistorico", "Proveedor", "ProductoProveedor",
+    "Pago", "PagoLinea", "Mensaje", "ContadorMensajes", "ResumenPagosHora", "ResumenPagosDia", "AvanceResumen",
+    "TipoCambio",
+    "Cambio",
+    "MovimientoStock", "CorteStock"
 ]
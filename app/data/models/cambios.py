@@ -0,0 +1,24 @@
+# app/data/models/cambios.py
+
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Index
+from datetime import datetime
+from app.data.database import Base
+
+
+class Cambio(Base):
+    """
+    Registro append-only de escrituras del catálogo. El id es la secuencia: cada worker
+    lee las filas posteriores a la última que procesó e invalida lo afectado.
+    """
+    __tablename__ = 'cambios'
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    entidad = Column(String(20), nullable=False)  # producto, precio, categoria, marca
+    clave = Column(String(50), nullable=False)  # Código del producto o id de la categoría/marca
+    operacion = Column(String(10), nullable=False)  # crear, actualizar, eliminar
+    fecha = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_cambio_fecha', 'fecha'),
+        {'sqlite_autoincrement': True},  # Los tokens de sincronización no deben reutilizar ids purgados
+    )
@@ -0,0 +1,22 @@
+# app/data/models/divisas.py
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, Numeric, Index
+from datetime import datetime
+from app.data.database import Base
+
+
+class TipoCambio(Base):
+    """Observación diaria de una divisa en CLP (serie del Banco Central)"""
+    __tablename__ = 'tipos_cambio'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    moneda = Column(String(3), nullable=False)
+    fecha = Column(Date, nullable=False)
+    valor = Column(Numeric(12, 4), nullable=False)
+    fuente = Column(String(30), default='bcentral', nullable=False)
+    fecha_registro = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        # Consulta "vigente a la fecha X": moneda = ? AND fecha <= X ORDER BY fecha DESC LIMIT 1
+        Index('idx_tipo_cambio_moneda_fecha', 'moneda', 'fecha', unique=True),
+    )
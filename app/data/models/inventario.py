@@ -0,0 +1,39 @@
+# app/data/models/inventario.py
+
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, ForeignKey, Index
+from datetime import datetime
+from app.data.database import Base
+
+
+class MovimientoStock(Base):
+    """
+    Libro de movimientos de stock: cada cambio de `Producto.stock` agrega una fila con la
+    diferencia (positiva o negativa) en la misma transacción.
+    """
+    __tablename__ = 'movimientos_stock'
+
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    producto_id = Column(Integer, ForeignKey('productos.id', ondelete='CASCADE'), nullable=False)
+    tipo = Column(String(10), nullable=False)  # entrada, venta, ajuste, reserva
+    cantidad = Column(Integer, nullable=False)  # Diferencia aplicada al stock
+    fecha = Column(DateTime, default=datetime.utcnow, nullable=False)
+    referencia = Column(String(200))  # Orden de compra, pago, lista de proveedor, etc.
+
+    __table_args__ = (
+        # Stock a una fecha: movimientos de un producto entre su último corte y la fecha
+        Index('idx_movimiento_producto_fecha', 'producto_id', 'fecha'),
+        Index('idx_movimiento_fecha', 'fecha'),
+    )
+
+
+class CorteStock(Base):
+    """Stock de un producto al cierre de `fecha` (se escribe solo si tuvo movimientos desde el corte anterior)"""
+    __tablename__ = 'cortes_stock'
+
+    producto_id = Column(Integer, ForeignKey('productos.id', ondelete='CASCADE'), primary_key=True)
+    fecha = Column(DateTime, primary_key=True)
+    stock = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index('idx_corte_fecha', 'fecha'),
+    )
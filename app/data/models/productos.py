@@ -68,6 +68,8 @@ class Producto(Base):
         Index('idx_producto_stock', 'stock'),
         Index('idx_producto_destacado', 'destacado', 'activo'),
         Index('idx_producto_promocion', 'en_promocion', 'activo'),
+        # Lanzamientos: rango de fecha_creacion de los activos, ya en orden
+        Index('idx_producto_activo_fecha_creacion', 'activo', 'fecha_creacion'),
     )
 
     @property
@@ -107,3 +109,22 @@ class Proveedor(Base):
     activo = Column(Boolean, default=True, nullable=False)
     fecha_creacion = Column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class ProductoProveedor(Base):
+    """
+    Huella de la última fila recibida de un proveedor para un producto: hash del contenido
+    de la fila de su lista de precios. Si la fila llega igual, la sincronización no escribe.
+    """
+    __tablename__ = 'productos_proveedores'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    proveedor_id = Column(Integer, ForeignKey('proveedores.id', ondelete='CASCADE'), nullable=False)
+    codigo = Column(String(50), nullable=False)  # Código del producto en la lista del proveedor
+    producto_id = Column(Integer, ForeignKey('productos.id', ondelete='CASCADE'), nullable=False)
+    huella = Column(String(16), nullable=False)
+    fecha_sincronizacion = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_producto_proveedor_codigo', 'proveedor_id', 'codigo', unique=True),
+    )
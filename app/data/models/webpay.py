@@ -1,6 +1,6 @@
 # app/data/models/webpay.py
 
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, DateTime, Text, Index, ForeignKey
 from datetime import datetime
 from app.data.database import Base
 
@@ -19,6 +19,20 @@ class Mensaje(Base):
     leido = Column(Boolean, default=False, nullable=False)
     respondido = Column(Boolean, default=False, nullable=False)
 
+    __table_args__ = (
+        # Bandeja de cada vendedor: filtro por leído y orden por fecha sin ordenar en memoria
+        Index('idx_mensaje_vendedor_leido_fecha', 'vendedor_id', 'leido', 'fecha'),
+    )
+
+
+class ContadorMensajes(Base):
+    """Mensajes no leídos por vendedor, mantenido en cada alta o lectura (vendedor_id 0 = sin asignar)"""
+    __tablename__ = 'mensajes_no_leidos'
+
+    vendedor_id = Column(Integer, primary_key=True, autoincrement=False)
+    no_leidos = Column(Integer, default=0, nullable=False)
+    fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
 
 class Pago(Base):
     __tablename__ = 'pagos'
@@ -35,4 +49,55 @@ class Pago(Base):
     fecha_creacion = Column(DateTime, default=datetime.utcnow, nullable=False)
     fecha_actualizacion = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     fecha_confirmacion = Column(DateTime)
-    
\ No newline at end of file
+    
+
+    __table_args__ = (
+        # Marca de agua de los resúmenes (pagos que cambiaron) y recálculo de una hora de pagos
+        Index('idx_pago_fecha_actualizacion', 'fecha_actualizacion'),
+        Index('idx_pago_fecha_creacion', 'fecha_creacion'),
+    )
+
+
+class PagoLinea(Base):
+    """Línea del carrito de un pago: se descuenta del stock cuando Webpay autoriza el pago"""
+    __tablename__ = 'pago_lineas'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    pago_id = Column(Integer, ForeignKey('pagos.id', ondelete='CASCADE'), nullable=False, index=True)
+    producto_id = Column(Integer, ForeignKey('productos.id'), nullable=False)
+    cantidad = Column(Integer, nullable=False)
+    precio_unitario = Column(Numeric(12, 2))  # Precio vigente al iniciar el pago
+
+
+class ResumenPagosHora(Base):
+    """Cantidad y monto de los pagos creados en cada hora (UTC), por estado y método de pago"""
+    __tablename__ = 'resumen_pagos_hora'
+
+    fecha = Column(Date, primary_key=True)
+    hora = Column(Integer, primary_key=True, autoincrement=False)
+    estado = Column(String(20), primary_key=True)
+    metodo_pago = Column(String(50), primary_key=True)  # '' si el pago no tiene método
+    cantidad = Column(Integer, nullable=False)
+    monto = Column(Numeric(16, 2), nullable=False)
+
+
+class ResumenPagosDia(Base):
+    """Suma diaria de `resumen_pagos_hora`"""
+    __tablename__ = 'resumen_pagos_dia'
+
+    fecha = Column(Date, primary_key=True)
+    estado = Column(String(20), primary_key=True)
+    metodo_pago = Column(String(50), primary_key=True)
+    cantidad = Column(Integer, nullable=False)
+    monto = Column(Numeric(16, 2), nullable=False)
+
+
+class AvanceResumen(Base):
+    """
+    Marca de agua de cada resumen: los pagos modificados hasta `hasta` ya están reflejados.
+    También guarda los turnos de los procesos de fondo (`hasta` = vencimiento del turno).
+    """
+    __tablename__ = 'resumenes_avance'
+
+    nombre = Column(String(50), primary_key=True)
+    hasta = Column(DateTime, nullable=False)
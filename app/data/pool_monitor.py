@@ -0,0 +1,195 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from typing import Dict, Any, List, Optional, Tuple
+import sys
+import threading
+import traceback
+import logging
+import time
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Ruta (plantilla) de la request en curso; la fija el middleware `registrar_ruta`
+ruta_actual: ContextVar[str] = ContextVar("ruta_actual", default="-")
+
+PROFUNDIDAD_PILA = 40  # Frames que se guardan de quien obtiene cada conexión
+
+
+def _capturar_pila(saltar: int) -> List[Tuple[Any, int]]:
+    """
+    Código y línea de los frames del llamador, del más interno al más externo. Corre en
+    cada checkout: no lee archivos ni formatea nada (eso se hace solo si hay que reportar
+    una fuga) ni retiene los frames.
+    """
+    frame = sys._getframe(saltar + 1)
+    pila = []
+    while frame is not None and len(pila) < PROFUNDIDAD_PILA:
+        pila.append((frame.f_code, frame.f_lineno))
+        frame = frame.f_back
+    return pila
+
+
+@dataclass
+class EstadisticaRuta:
+    """Acumulados de uso del pool para una ruta"""
+    checkouts: int = 0
+    espera_total: float = 0.0
+    espera_max: float = 0.0
+    retencion_total: float = 0.0
+    retencion_max: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "checkouts": self.checkouts,
+            "espera_media_ms": round(self.espera_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "retencion_media_ms": round(self.retencion_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "retencion_max_ms": round(self.retencion_max * 1000, 3)
+        }
+
+
+class MonitorPool:
+    """
+    Registra, por ruta, el tiempo de espera para obtener una conexión del pool y
+    el tiempo que se retiene. Las conexiones retenidas más de `umbral_fuga`
+    segundos se reportan con la pila que las obtuvo.
+    """
+
+    def __init__(self, umbral_fuga: float = 30.0):
+        self.umbral_fuga = umbral_fuga
+        self._rutas: Dict[str, EstadisticaRuta] = {}
+        self._activas: Dict[int, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._detector: Optional[threading.Thread] = None
+
+    def _estadistica(self, ruta: str) -> EstadisticaRuta:
+        estadistica = self._rutas.get(ruta)
+        if estadistica is None:
+            estadistica = self._rutas[ruta] = EstadisticaRuta()
+        return estadistica
+
+    def registrar_espera(self, segundos: float) -> None:
+        """Tiempo bloqueado esperando una conexión libre (lo reporta PoolInstrumentado)."""
+        with self._lock:
+            estadistica = self._estadistica(ruta_actual.get())
+            estadistica.checkouts += 1
+            estadistica.espera_total += segundos
+            estadistica.espera_max = max(estadistica.espera_max, segundos)
+
+    def instrumentar(self, engine: Engine) -> None:
+        """Engancha los eventos checkout/checkin del pool del engine."""
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy) -> None:
+        pila = _capturar_pila(1) if self.umbral_fuga > 0 else None
+        with self._lock:
+            self._activas[id(connection_record)] = {
+                "inicio": time.perf_counter(),
+                "ruta": ruta_actual.get(),
+                "hilo": threading.current_thread().name,
+                "pila": pila,
+                "reportada": False
+            }
+
+    def _on_checkin(self, dbapi_connection, connection_record) -> None:
+        with self._lock:
+            uso = self._activas.pop(id(connection_record), None)
+            if uso is None:
+                return
+            retencion = time.perf_counter() - uso["inicio"]
+            estadistica = self._estadistica(uso["ruta"])
+            estadistica.retencion_total += retencion
+            estadistica.retencion_max = max(estadistica.retencion_max, retencion)
+        if uso["reportada"]:
+            logger.warning(f"Conexión reportada como fuga devuelta al pool tras {retencion:.1f}s (ruta {uso['ruta']})")
+
+    def revisar_fugas(self) -> int:
+        """Reporta (una vez) las conexiones retenidas más allá del umbral."""
+        ahora = time.perf_counter()
+        nuevas = []
+        with self._lock:
+            for uso in self._activas.values():
+                if not uso["reportada"] and ahora - uso["inicio"] > self.umbral_fuga:
+                    uso["reportada"] = True
+                    nuevas.append(dict(uso))
+        for uso in nuevas:
+            # Se omiten los frames internos de SQLAlchemy: interesa el código que pidió la conexión
+            frames = [
+                traceback.FrameSummary(codigo.co_filename, linea, codigo.co_name)
+                for codigo, linea in reversed(uso["pila"] or []) if "sqlalchemy" not in codigo.co_filename
+            ]
+            pila = "".join(traceback.format_list(frames)) if frames else "(pila no capturada)\n"
+            logger.warning(
+                f"⚠️ Posible fuga de conexión: retenida {ahora - uso['inicio']:.1f}s "
+                f"(ruta={uso['ruta']}, hilo={uso['hilo']}). Obtenida en:\n{pila}"
+            )
+        return len(nuevas)
+
+    def iniciar_detector(self, intervalo: float = 5.0) -> None:
+        """Inicia (una sola vez) el hilo que revisa fugas periódicamente."""
+        if self.umbral_fuga <= 0 or (self._detector and self._detector.is_alive()):
+            return
+
+        def _ciclo():
+            while True:
+                time.sleep(intervalo)
+                try:
+                    self.revisar_fugas()
+                except Exception as e:
+                    logger.error(f"Error revisando fugas de conexiones: {e}")
+
+        self._detector = threading.Thread(target=_ciclo, name="detector-fugas-pool", daemon=True)
+        self._detector.start()
+
+    def estado(self, engines: List[Engine]) -> Dict[str, Any]:
+        """Estado actual de los pools y estadísticas acumuladas por ruta."""
+        ahora = time.perf_counter()
+        with self._lock:
+            rutas = {ruta: est.to_dict() for ruta, est in sorted(self._rutas.items())}
+            activas = [
+                {
+                    "ruta": uso["ruta"],
+                    "hilo": uso["hilo"],
+                    "retenida_ms": round((ahora - uso["inicio"]) * 1000, 1),
+                    "posible_fuga": uso["reportada"]
+                } for uso in self._activas.values()
+            ]
+
+        pools = []
+        for engine in engines:
+            pool = engine.pool
+            pools.append({
+                "url": engine.url.render_as_string(hide_password=True),
+                "clase": type(pool).__name__,
+                "estado": pool.status(),
+                "tamano": pool.size() if hasattr(pool, "size") else None,
+                "disponibles": pool.checkedin() if hasattr(pool, "checkedin") else None,
+                "en_uso": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow": pool.overflow() if hasattr(pool, "overflow") else None
+            })
+
+        return {
+            "pools": pools,
+            "umbral_fuga_seg": self.umbral_fuga,
+            "conexiones_activas": activas,
+            "rutas": rutas
+        }
+
+
+class PoolInstrumentado(QueuePool):
+    """QueuePool que mide el tiempo de espera de cada checkout."""
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            monitor_pool.registrar_espera(time.perf_counter() - inicio)
+
+
+monitor_pool = MonitorPool(umbral_fuga=settings.DB_FUGA_UMBRAL_SEG)
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from app.data.models import Cambio
+
+# Entidades y operaciones del registro de cambios
+PRODUCTO, PRECIO, CATEGORIA, MARCA = "producto", "precio", "categoria", "marca"
+CREAR, ACTUALIZAR, ELIMINAR = "crear", "actualizar", "eliminar"
+
+
+class CambioRegistrado(NamedTuple):
+    secuencia: int
+    entidad: str
+    clave: str
+    operacion: str
+    fecha: Optional[datetime] = None
+
+
+class CambioRepository:
+    """Registro de cambios del catálogo (tabla `cambios`)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def registrar(self, entidad: str, operacion: str, claves: Iterable) -> None:
+        """Agrega un cambio por clave en la transacción en curso (INSERT en bloque). No hace commit."""
+        filas = [
+            {"entidad": entidad, "clave": str(clave), "operacion": operacion}
+            for clave in dict.fromkeys(claves)
+        ]
+        if filas:
+            self.db.execute(insert(Cambio), filas)
+
+    def siguientes(self, desde: int, limite: int, pendientes: Iterable[int] = ()) -> List[CambioRegistrado]:
+        """Cambios con secuencia mayor a `desde` (y los `pendientes` indicados), en orden. Usa la PK."""
+        condicion = Cambio.id > desde
+        pendientes = list(pendientes)
+        if pendientes:
+            condicion = or_(condicion, Cambio.id.in_(pendientes))
+        return [
+            CambioRegistrado(*fila) for fila in self.db.execute(
+                select(Cambio.id, Cambio.entidad, Cambio.clave, Cambio.operacion, Cambio.fecha)
+                .where(condicion).order_by(Cambio.id).limit(limite)
+            )
+        ]
+
+    def ultima_secuencia(self, antes_de: Optional[datetime] = None) -> int:
+        """Mayor secuencia registrada (opcionalmente, entre los cambios anteriores a `antes_de`)."""
+        stmt = select(func.max(Cambio.id))
+        if antes_de is not None:
+            stmt = stmt.where(Cambio.fecha < antes_de)
+        return self.db.execute(stmt).scalar() or 0
+
+    def primera_secuencia(self) -> Optional[int]:
+        """Menor secuencia conservada: los tokens anteriores apuntan a cambios ya purgados."""
+        return self.db.execute(select(func.min(Cambio.id))).scalar()
+
+    def purgar(self, dias: int, ahora: Optional[datetime] = None) -> int:
+        """
+        Elimina los cambios con más de `dias` de antigüedad, salvo el último (marca hasta
+        dónde llegó la secuencia). No hace commit.
+        """
+        limite = (ahora or datetime.utcnow()) - timedelta(days=dias)
+        ultima = self.ultima_secuencia()
+        return self.db.execute(delete(Cambio).where(Cambio.fecha < limite, Cambio.id < ultima)).rowcount
@@ -0,0 +1,209 @@
+from datetime import datetime
+
+from sqlalchemy.orm import Session, aliased
+from sqlalchemy import select, desc, func, and_, type_coerce, Float, Select
+from typing import List, Optional, NamedTuple, Iterable, Dict, Tuple
+
+from app.data.models import Producto, PrecioHistorico, Categoria, Marca
+
+
+class ProductoFila(NamedTuple):
+    """
+    Fila compacta de lectura para listados (mismos campos que ProductoBasic).
+    Al ser una tupla con nombre no tiene __dict__ ni pasa por el identity map.
+    """
+    codigo: str
+    nombre: str
+    stock: int
+    precio_actual: Optional[float]
+    categoria: Optional[str]
+    marca: Optional[str]
+
+
+def _precio_actual_subquery():
+    """Último precio del producto (usa idx_precio_producto_fecha)."""
+    return select(PrecioHistorico.valor).where(
+        PrecioHistorico.producto_id == Producto.id
+    ).order_by(desc(PrecioHistorico.fecha)).limit(1).correlate(Producto).scalar_subquery()
+
+
+class CatalogoReadRepository:
+    """
+    Consultas de solo lectura para listados del catálogo.
+    Seleccionan únicamente las columnas necesarias (sin `descripcion` ni entidades
+    completas) unidas a los nombres de marca y categoría.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def select_basico(self) -> Select:
+        """SELECT base de un listado: columnas de ProductoFila con sus joins."""
+        return select(
+            Producto.codigo,
+            Producto.nombre,
+            Producto.stock,
+            _precio_actual_subquery().label("precio_actual"),
+            Categoria.nombre.label("categoria"),
+            Marca.nombre.label("marca")
+        ).select_from(Producto).outerjoin(
+            Categoria, Categoria.id == Producto.categoria_id
+        ).outerjoin(
+            Marca, Marca.id == Producto.marca_id
+        )
+
+    def fetch(self, stmt: Select) -> List[ProductoFila]:
+        """Ejecuta un SELECT construido desde `select_basico` y devuelve filas compactas."""
+        return [
+            ProductoFila(codigo, nombre, stock, float(precio) if precio is not None else None, categoria, marca)
+            for codigo, nombre, stock, precio, categoria, marca in self.db.execute(stmt)
+        ]
+
+    def count(self, *condiciones) -> int:
+        """Cuenta productos que cumplen las condiciones sin cargar filas."""
+        stmt = select(func.count(Producto.id)).select_from(Producto)
+        if condiciones:
+            stmt = stmt.where(*condiciones)
+        return self.db.execute(stmt).scalar_one()
+
+    def search_by_name(self, nombre: str, offset: int = 0, limit: Optional[int] = None) -> List[ProductoFila]:
+        """Productos activos cuyo nombre contiene el texto indicado."""
+        stmt = self.select_basico().where(
+            Producto.nombre.contains(nombre),
+            Producto.activo == True
+        ).order_by(Producto.nombre).offset(offset)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        return self.fetch(stmt)
+
+    def get_by_categorias(self, categoria_ids: Iterable[int]) -> List[ProductoFila]:
+        """Productos activos de las categorías indicadas."""
+        stmt = self.select_basico().where(
+            Producto.categoria_id.in_(list(categoria_ids)),
+            Producto.activo == True
+        ).order_by(Producto.nombre)
+        return self.fetch(stmt)
+
+    def get_codigos_por_categoria_marca(self, categoria_ids: Iterable[int], marca_ids: Iterable[int]) -> List[str]:
+        """Códigos de los productos activos de las categorías o marcas indicadas."""
+        categoria_ids, marca_ids = list(categoria_ids), list(marca_ids)
+        if not categoria_ids and not marca_ids:
+            return []
+        stmt = select(Producto.codigo).where(
+            Producto.categoria_id.in_(categoria_ids) | Producto.marca_id.in_(marca_ids),
+            Producto.activo == True
+        ).order_by(Producto.codigo)
+        return list(self.db.execute(stmt).scalars())
+
+    def get_by_stock_max(self, stock_max: int) -> List[ProductoFila]:
+        """Productos activos con stock menor o igual al indicado, de menor a mayor."""
+        stmt = self.select_basico().where(
+            Producto.stock <= stock_max,
+            Producto.activo == True
+        ).order_by(Producto.stock)
+        return self.fetch(stmt)
+
+    def get_by_codigos(self, codigos: Iterable[str]) -> Dict[str, ProductoFila]:
+        """Productos activos con los códigos indicados (un solo IN), indexados por código."""
+        stmt = self.select_basico().where(
+            Producto.codigo.in_(list(set(codigos))),
+            Producto.activo == True
+        )
+        return {fila.codigo: fila for fila in self.fetch(stmt)}
+
+    def get_ultimos_cambios_precio(self, desde: datetime) -> List[tuple]:
+        """
+        (codigo, fecha, valor, valor_anterior) del último cambio de precio de cada producto
+        posterior a `desde`, para todos los productos en una consulta: un GROUP BY sobre
+        idx_precio_producto_fecha y, por producto, una búsqueda en el mismo índice del
+        precio previo (None si es el primero). Los precios vienen como float (sin Decimal).
+        """
+        ultimo = select(
+            PrecioHistorico.producto_id, func.max(PrecioHistorico.fecha).label("fecha")
+        ).where(PrecioHistorico.fecha >= desde).group_by(PrecioHistorico.producto_id).subquery()
+        previo = aliased(PrecioHistorico)
+        anterior = select(type_coerce(previo.valor, Float)).where(
+            previo.producto_id == ultimo.c.producto_id,
+            previo.fecha < ultimo.c.fecha
+        ).order_by(desc(previo.fecha)).limit(1).scalar_subquery()
+        stmt = select(
+            Producto.codigo, ultimo.c.fecha, type_coerce(PrecioHistorico.valor, Float), anterior
+        ).select_from(ultimo).join(
+            PrecioHistorico,
+            and_(PrecioHistorico.producto_id == ultimo.c.producto_id, PrecioHistorico.fecha == ultimo.c.fecha)
+        ).join(Producto, Producto.id == ultimo.c.producto_id)
+        return [tuple(fila) for fila in self.db.execute(stmt)]
+
+    def get_lanzamientos(self, desde: datetime, limite: int) -> List[Tuple[datetime, ProductoFila]]:
+        """
+        (fecha_creacion, fila) de los productos activos creados desde `desde`, del más
+        reciente al más antiguo (un rango de idx_producto_activo_fecha_creacion, sin ordenar).
+        """
+        stmt = self.select_basico().add_columns(Producto.fecha_creacion).where(
+            Producto.activo == True,
+            Producto.fecha_creacion >= desde
+        ).order_by(desc(Producto.fecha_creacion)).limit(limite)
+        return [
+            (fecha, ProductoFila(codigo, nombre, stock, float(precio) if precio is not None else None, categoria, marca))
+            for codigo, nombre, stock, precio, categoria, marca, fecha in self.db.execute(stmt)
+        ]
+
+    def get_subcategoria_ids(self, categoria_id: int) -> List[int]:
+        """
+        IDs de todas las subcategorías (recursivo) de una categoría.
+        Carga el par (id, padre_id) de todo el árbol en una consulta y lo recorre en memoria.
+        """
+        hijos: Dict[int, List[int]] = {}
+        for id_, padre_id in self.db.execute(select(Categoria.id, Categoria.padre_id)):
+            if padre_id is not None:
+                hijos.setdefault(padre_id, []).append(id_)
+
+        resultado: List[int] = []
+        vistos = {categoria_id}
+        pendientes = list(hijos.get(categoria_id, []))
+        while pendientes:
+            actual = pendientes.pop()
+            if actual in vistos:
+                continue
+            vistos.add(actual)
+            resultado.append(actual)
+            pendientes.extend(hijos.get(actual, []))
+        return resultado
+
+    def get_terminos_busqueda(self, codigos: Optional[Iterable[str]] = None) -> List[tuple]:
+        """
+        (codigo, nombre, marca, activo) para el índice de sugerencias: todos los productos
+        activos o, si se indican códigos, esos productos aunque estén inactivos.
+        """
+        stmt = select(Producto.codigo, Producto.nombre, Marca.nombre, Producto.activo).select_from(
+            Producto
+        ).outerjoin(Marca, Marca.id == Producto.marca_id)
+        if codigos is None:
+            stmt = stmt.where(Producto.activo == True)
+        else:
+            stmt = stmt.where(Producto.codigo.in_(list(codigos)))
+        return [tuple(fila) for fila in self.db.execute(stmt)]
+
+    def get_atributos_facetas(self, codigos: Optional[Iterable[str]] = None) -> List[tuple]:
+        """
+        Columnas de ProductoFila más (categoria_id, marca_id, destacado, en_promocion,
+        stock_minimo, activo) para el índice de facetas: todos los productos activos o,
+        si se indican códigos, esos productos aunque estén inactivos.
+        """
+        stmt = self.select_basico().add_columns(
+            Producto.categoria_id,
+            Producto.marca_id,
+            Producto.destacado,
+            Producto.en_promocion,
+            Producto.stock_minimo,
+            Producto.activo
+        )
+        if codigos is None:
+            stmt = stmt.where(Producto.activo == True)
+        else:
+            stmt = stmt.where(Producto.codigo.in_(list(codigos)))
+        return [tuple(fila) for fila in self.db.execute(stmt)]
+
+    def get_arbol_categorias(self) -> List[tuple]:
+        """(id, nombre, padre_id) de todas las categorías."""
+        return [tuple(fila) for fila in self.db.execute(select(Categoria.id, Categoria.nombre, Categoria.padre_id))]
@@ -0,0 +1,148 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import DateTime, and_, bindparam, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+from app.data.models import Producto, MovimientoStock, CorteStock
+from app.data.repositories.cambio_repository import CambioRepository, PRODUCTO, ACTUALIZAR
+
+# Tipos de movimiento de stock
+ENTRADA, VENTA, AJUSTE, RESERVA = "entrada", "venta", "ajuste", "reserva"
+
+
+class InventarioRepository:
+    """Libro de movimientos de stock y sus cortes periódicos por producto"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def registrar(self, movimientos: List[Dict[str, Any]], fecha: Optional[datetime] = None) -> int:
+        """
+        Agrega al libro, en un solo INSERT, movimientos ya aplicados a `Producto.stock`
+        ({"producto_id", "tipo", "cantidad"[, "referencia"]}). Omite los de cantidad 0. No hace commit.
+        """
+        fecha = fecha or datetime.utcnow()
+        filas = [
+            {"producto_id": m["producto_id"], "tipo": m["tipo"], "cantidad": m["cantidad"],
+             "referencia": m.get("referencia"), "fecha": fecha}
+            for m in movimientos if m["cantidad"]
+        ]
+        if filas:
+            self.db.execute(insert(MovimientoStock), filas)
+        return len(filas)
+
+    def aplicar(self, movimientos: List[Dict[str, Any]]) -> int:
+        """
+        Suma cada movimiento al stock del producto (un UPDATE en bloque) y lo agrega al libro
+        y al registro de cambios en la misma transacción. Para ventas y reservas, que no fijan
+        el stock sino que lo descuentan. No hace commit.
+        """
+        filas = [m for m in movimientos if m["cantidad"]]
+        if filas:
+            tabla = Producto.__table__
+            self.db.execute(
+                update(tabla).where(tabla.c.id == bindparam("b_id")).values(
+                    stock=tabla.c.stock + bindparam("b_cantidad"), fecha_actualizacion=datetime.utcnow()
+                ),
+                [{"b_id": m["producto_id"], "b_cantidad": m["cantidad"]} for m in filas]
+            )
+            CambioRepository(self.db).registrar(PRODUCTO, ACTUALIZAR, self.db.execute(
+                select(Producto.codigo).where(Producto.id.in_({m["producto_id"] for m in filas}))
+            ).scalars())
+        return self.registrar(filas)
+
+    def ultimo_corte(self) -> Optional[datetime]:
+        return self.db.execute(select(func.max(CorteStock.fecha))).scalar()
+
+    def _posteriores(self, fecha: datetime):
+        """Suma de los movimientos del producto de la fila externa posteriores a `fecha`."""
+        return select(func.coalesce(func.sum(MovimientoStock.cantidad), 0)).where(
+            MovimientoStock.producto_id == Producto.id,
+            MovimientoStock.fecha > fecha
+        ).scalar_subquery()
+
+    def generar_cortes(self, hasta: datetime) -> int:
+        """
+        Escribe, en un INSERT ... SELECT, el stock al cierre de `hasta` de los productos que
+        tuvieron movimientos desde el corte anterior (todos en el primer corte): stock actual
+        menos lo movido después de `hasta`. No hace commit.
+        """
+        anterior = self.ultimo_corte()
+        if anterior is not None and anterior >= hasta:
+            return 0
+        if anterior is None:
+            condicion = ~exists().where(CorteStock.producto_id == Producto.id)
+        else:
+            condicion = Producto.id.in_(
+                select(MovimientoStock.producto_id).where(
+                    MovimientoStock.fecha > anterior, MovimientoStock.fecha <= hasta
+                ).distinct()
+            )
+        return self.db.execute(
+            insert(CorteStock).from_select(
+                ["producto_id", "fecha", "stock"],
+                select(Producto.id, literal(hasta, DateTime), Producto.stock - self._posteriores(hasta)).where(condicion)
+            )
+        ).rowcount
+
+    def stock_al(self, fecha: datetime, producto_ids: Optional[Iterable[int]] = None) -> Dict[int, int]:
+        """
+        Stock de cada producto al momento `fecha`: su último corte anterior más los movimientos
+        entre el corte y la fecha (un rango corto del índice producto/fecha). Los productos sin
+        corte previo se calculan hacia atrás desde el stock actual.
+        """
+        ids = list(producto_ids) if producto_ids is not None else None
+        ultimo = select(CorteStock.producto_id, func.max(CorteStock.fecha).label("fecha")).where(CorteStock.fecha <= fecha)
+        if ids is not None:
+            ultimo = ultimo.where(CorteStock.producto_id.in_(ids))
+        ultimo = ultimo.group_by(CorteStock.producto_id).subquery()
+
+        resultado = dict(self.db.execute(
+            select(CorteStock.producto_id, CorteStock.stock).join(
+                ultimo, and_(CorteStock.producto_id == ultimo.c.producto_id, CorteStock.fecha == ultimo.c.fecha)
+            )
+        ).all())
+        for producto_id, cantidad in self.db.execute(
+            select(MovimientoStock.producto_id, func.sum(MovimientoStock.cantidad)).join(
+                ultimo, MovimientoStock.producto_id == ultimo.c.producto_id
+            ).where(
+                MovimientoStock.fecha > ultimo.c.fecha, MovimientoStock.fecha <= fecha
+            ).group_by(MovimientoStock.producto_id)
+        ):
+            resultado[producto_id] += int(cantidad)
+
+        sin_corte = select(Producto.id, Producto.stock - self._posteriores(fecha)).where(
+            ~Producto.id.in_(select(ultimo.c.producto_id))
+        )
+        if ids is not None:
+            sin_corte = sin_corte.where(Producto.id.in_(ids))
+        resultado.update((producto_id, int(stock)) for producto_id, stock in self.db.execute(sin_corte))
+        return resultado
+
+    def stock_producto_al(self, producto_id: int, fecha: datetime) -> int:
+        """`stock_al` de un solo producto: el corte sale de la clave primaria y el resto de un rango del índice."""
+        corte = self.db.execute(
+            select(CorteStock.fecha, CorteStock.stock)
+            .where(CorteStock.producto_id == producto_id, CorteStock.fecha <= fecha)
+            .order_by(CorteStock.fecha.desc())
+            .limit(1)
+        ).first()
+        suma = select(func.coalesce(func.sum(MovimientoStock.cantidad), 0)).where(MovimientoStock.producto_id == producto_id)
+        if corte:
+            return corte.stock + int(self.db.execute(
+                suma.where(MovimientoStock.fecha > corte.fecha, MovimientoStock.fecha <= fecha)
+            ).scalar())
+        actual = self.db.execute(select(Producto.stock).where(Producto.id == producto_id)).scalar()
+        return actual - int(self.db.execute(suma.where(MovimientoStock.fecha > fecha)).scalar())
+
+    def ventas(self, producto_id: int, desde: datetime, hasta: datetime) -> int:
+        """Unidades vendidas de un producto en el rango (para velocidad de venta)."""
+        return -int(self.db.execute(
+            select(func.coalesce(func.sum(MovimientoStock.cantidad), 0)).where(
+                MovimientoStock.producto_id == producto_id,
+                MovimientoStock.tipo == VENTA,
+                MovimientoStock.fecha > desde,
+                MovimientoStock.fecha <= hasta
+            )
+        ).scalar())
@@ -1,51 +1,129 @@
+from sqlalchemy import insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
+from collections import Counter
 
-from app.data.models import Mensaje
+from app.data.models import Mensaje, ContadorMensajes
+
+# Clave del contador para mensajes sin vendedor asignado
+SIN_VENDEDOR = 0
 
 class MensajeRepository:
     def __init__(self, db: Session):
         self.db = db
-    
+
     def create(self, mensaje_data: Dict[str, Any]) -> Mensaje:
         """Crea un nuevo mensaje de contacto."""
         nuevo_mensaje = Mensaje(**mensaje_data)
         self.db.add(nuevo_mensaje)
         self.db.flush()
+        self.ajustar_no_leidos({nuevo_mensaje.vendedor_id or SIN_VENDEDOR: 1})
         return nuevo_mensaje
-    
-    def get_all(self, vendedor_id: Optional[int] = None, only_unread: bool = False) -> List[Mensaje]:
-        """Obtiene mensajes, opcionalmente filtrados por vendedor y/o no leídos."""
+
+    def create_many(self, mensajes: List[Dict[str, Any]]) -> int:
+        """
+        Inserta un lote de mensajes en un solo INSERT (executemany) y suma los
+        no leídos de cada vendedor. No hace commit.
+        """
+        if not mensajes:
+            return 0
+        self.db.execute(insert(Mensaje), mensajes)
+        self.ajustar_no_leidos(Counter(m.get("vendedor_id") or SIN_VENDEDOR for m in mensajes))
+        return len(mensajes)
+
+    def get_all(self, vendedor_id: Optional[int] = None, only_unread: bool = False,
+                offset: int = 0, limit: Optional[int] = None) -> List[Mensaje]:
+        """Obtiene mensajes, opcionalmente filtrados por vendedor y/o no leídos, del más reciente al más antiguo."""
         query = self.db.query(Mensaje)
-        
+
         if vendedor_id is not None:
             query = query.filter(Mensaje.vendedor_id == vendedor_id)
-            
+
         if only_unread:
-            query = query.filter(~Mensaje.leido)
-            
-        return query.order_by(Mensaje.fecha.desc()).all()
-    
+            # Comparación explícita: `~leido` no aprovecha el índice (vendedor_id, leido, fecha)
+            query = query.filter(Mensaje.leido == False)  # noqa: E712
+
+        query = query.order_by(Mensaje.fecha.desc(), Mensaje.id.desc()).offset(offset)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    def get_bandeja(self, vendedor_id: int, only_unread: bool = False,
+                    offset: int = 0, limit: int = 20) -> List[Mensaje]:
+        """Página de la bandeja de un vendedor."""
+        return self.get_all(vendedor_id, only_unread, offset=offset, limit=limit)
+
     def get_by_id(self, mensaje_id: int) -> Optional[Mensaje]:
         """Obtiene un mensaje por su ID."""
         return self.db.query(Mensaje).filter(Mensaje.id == mensaje_id).first()
-    
+
+    def contar_no_leidos(self, vendedor_id: int) -> int:
+        """No leídos de un vendedor leyendo su contador (búsqueda por clave primaria)."""
+        no_leidos = self.db.query(ContadorMensajes.no_leidos).filter(
+            ContadorMensajes.vendedor_id == vendedor_id
+        ).scalar()
+        return no_leidos or 0
+
+    def ajustar_no_leidos(self, deltas: Dict[int, int]) -> None:
+        """Suma (o resta) a los contadores de no leídos, creando los que falten."""
+        for vendedor_id, delta in deltas.items():
+            if not delta:
+                continue
+            actualizado = self.db.execute(
+                update(ContadorMensajes)
+                .where(ContadorMensajes.vendedor_id == vendedor_id)
+                .values(no_leidos=ContadorMensajes.no_leidos + delta)
+            ).rowcount
+            if actualizado:
+                continue
+            try:
+                with self.db.begin_nested():
+                    self.db.execute(insert(ContadorMensajes).values(vendedor_id=vendedor_id, no_leidos=max(delta, 0)))
+            except IntegrityError:
+                # Otro worker creó el contador entre el UPDATE y el INSERT
+                self.db.execute(
+                    update(ContadorMensajes)
+                    .where(ContadorMensajes.vendedor_id == vendedor_id)
+                    .values(no_leidos=ContadorMensajes.no_leidos + delta)
+                )
+
+    def recalcular_no_leidos(self) -> None:
+        """Reconstruye todos los contadores desde la tabla de mensajes (reparación)."""
+        conteos = self.db.query(
+            func.coalesce(Mensaje.vendedor_id, SIN_VENDEDOR), func.count(Mensaje.id)
+        ).filter(Mensaje.leido == False).group_by(func.coalesce(Mensaje.vendedor_id, SIN_VENDEDOR)).all()  # noqa: E712
+        self.db.execute(delete(ContadorMensajes))
+        if conteos:
+            self.db.execute(insert(ContadorMensajes), [
+                {"vendedor_id": vendedor_id, "no_leidos": total} for vendedor_id, total in conteos
+            ])
+
     def mark_as_read(self, mensaje_id: int) -> bool:
         """Marca un mensaje como leído."""
         mensaje = self.get_by_id(mensaje_id)
         if not mensaje:
             return False
-            
-        mensaje.leido = True
-        self.db.flush()
+
+        # UPDATE condicional: solo quien cambia leido=False -> True descuenta el contador
+        cambiado = self.db.execute(
+            update(Mensaje)
+            .where(Mensaje.id == mensaje_id, Mensaje.leido == False)  # noqa: E712
+            .values(leido=True)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if cambiado:
+            self.ajustar_no_leidos({mensaje.vendedor_id or SIN_VENDEDOR: -1})
         return True
-    
+
     def delete(self, mensaje_id: int) -> bool:
         """Elimina un mensaje."""
         mensaje = self.get_by_id(mensaje_id)
         if not mensaje:
             return False
-            
+
+        if not mensaje.leido:
+            self.ajustar_no_leidos({mensaje.vendedor_id or SIN_VENDEDOR: -1})
         self.db.delete(mensaje)
         self.db.flush()
-        return True
\ No newline at end of file
+        return True
@@ -1,8 +1,13 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy import desc, func, insert, select, update
+from datetime import datetime
 from typing import List, Optional, Dict, Any
 
-from app.data.models import Pago
+from app.data.models import Pago, PagoLinea, Producto
+from app.data.repositories.inventario_repository import InventarioRepository, VENTA
+
+# Estados de un pago
+PENDIENTE, AUTORIZADO, RECHAZADO = "PENDIENTE", "AUTORIZADO", "RECHAZADO"
 
 class PagoRepository:
     def __init__(self, db: Session):
@@ -35,4 +40,53 @@ class PagoRepository:
     
     def get_recent_pagos(self, limit: int = 10) -> List[Pago]:
         """Obtiene los pagos más recientes."""
-        return self.db.query(Pago).order_by(desc(Pago.fecha_creacion)).limit(limit).all()
\ No newline at end of file
+        return self.db.query(Pago).order_by(desc(Pago.fecha_creacion)).limit(limit).all()
+    
+    def registrar_inicio(self, token: str, orden_id: str, monto, return_url: str,
+                         lineas: List[Dict[str, Any]]) -> Pago:
+        """
+        Guarda el pago recién creado en Webpay como PENDIENTE junto con las líneas del carrito
+        ({"codigo", "cantidad", "precio_unitario"}); los códigos se resuelven en un SELECT ... IN
+        y las líneas se insertan en bloque. No hace commit.
+        """
+        pago = self.create({"token": token, "orden_id": orden_id, "monto": monto, "return_url": return_url})
+        if lineas:
+            ids = dict(self.db.execute(
+                select(Producto.codigo, Producto.id).where(Producto.codigo.in_({l["codigo"] for l in lineas}))
+            ).all())
+            self.db.execute(insert(PagoLinea), [
+                {"pago_id": pago.id, "producto_id": ids[l["codigo"]], "cantidad": l["cantidad"],
+                 "precio_unitario": l.get("precio_unitario")}
+                for l in lineas
+            ])
+        return pago
+    
+    def confirmar(self, token: str, autorizado: bool, metodo_pago: Optional[str] = None) -> bool:
+        """
+        Pasa un pago PENDIENTE a AUTORIZADO o RECHAZADO y, si se autorizó, descuenta su carrito
+        del stock como ventas (libro de movimientos y registro de cambios incluidos). El UPDATE
+        es condicional: si el pago no existe o ya se confirmó devuelve False y no descuenta
+        nada, así una confirmación repetida no vende dos veces. No hace commit.
+        """
+        ahora = datetime.utcnow()
+        tabla = Pago.__table__
+        confirmado = self.db.execute(
+            update(tabla).where(tabla.c.token == token, tabla.c.estado == PENDIENTE).values(
+                estado=AUTORIZADO if autorizado else RECHAZADO,
+                metodo_pago=metodo_pago,
+                fecha_confirmacion=ahora,
+                fecha_actualizacion=ahora
+            )
+        ).rowcount
+        if not confirmado:
+            return False
+        if autorizado:
+            pago_id, orden_id = self.db.execute(select(tabla.c.id, tabla.c.orden_id).where(tabla.c.token == token)).one()
+            InventarioRepository(self.db).aplicar([
+                {"producto_id": producto_id, "tipo": VENTA, "cantidad": -int(cantidad), "referencia": orden_id}
+                for producto_id, cantidad in self.db.execute(
+                    select(PagoLinea.producto_id, func.sum(PagoLinea.cantidad))
+                    .where(PagoLinea.pago_id == pago_id).group_by(PagoLinea.producto_id)
+                )
+            ])
+        return True
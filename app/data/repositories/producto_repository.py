@@ -3,6 +3,10 @@ from sqlalchemy import desc, func
 from typing import List, Optional, Dict, Any
 
 from app.data.models import Producto, PrecioHistorico, Categoria, Marca
+from app.data.repositories.cambio_repository import (
+    CambioRepository, PRODUCTO, PRECIO, CATEGORIA, MARCA, CREAR, ACTUALIZAR, ELIMINAR
+)
+from app.data.repositories.inventario_repository import InventarioRepository, ENTRADA, AJUSTE
 
 class ProductoRepository:
     def __init__(self, db: Session):
@@ -85,6 +89,7 @@ class ProductoRepository:
                 marca = Marca(nombre=marca_nombre, codigo=marca_codigo)
                 self.db.add(marca)
                 self.db.flush()
+                CambioRepository(self.db).registrar(MARCA, CREAR, [marca.id])
         
         # Obtener o crear categoría si es necesario
         categoria = None
@@ -102,6 +107,7 @@ class ProductoRepository:
                 categoria = Categoria(nombre=categoria_nombre)
                 self.db.add(categoria)
                 self.db.flush()
+                CambioRepository(self.db).registrar(CATEGORIA, CREAR, [categoria.id])
                 
         # Extraer precio inicial si existe
         precio_inicial = None
@@ -126,6 +132,17 @@ class ProductoRepository:
             )
             self.db.add(precio)
             self.db.flush()
+
+        if nuevo_producto.stock:
+            InventarioRepository(self.db).registrar([
+                {"producto_id": nuevo_producto.id, "tipo": ENTRADA, "cantidad": nuevo_producto.stock,
+                 "referencia": "Alta de producto"}
+            ])
+
+        cambios = CambioRepository(self.db)
+        cambios.registrar(PRODUCTO, CREAR, [nuevo_producto.codigo])
+        if precio_inicial is not None:
+            cambios.registrar(PRECIO, CREAR, [nuevo_producto.codigo])
         
         return nuevo_producto
     
@@ -140,6 +157,8 @@ class ProductoRepository:
         if "precio" in producto_data:
             nuevo_precio = producto_data.pop("precio")
             
+        stock_anterior = producto.stock
+
         # Actualizar propiedades del producto
         for key, value in producto_data.items():
             if hasattr(producto, key):
@@ -154,6 +173,15 @@ class ProductoRepository:
             self.db.add(precio)
             
         self.db.flush()
+        if producto.stock != stock_anterior:
+            InventarioRepository(self.db).registrar([
+                {"producto_id": producto.id, "tipo": AJUSTE, "cantidad": producto.stock - stock_anterior,
+                 "referencia": "Actualización de producto"}
+            ])
+        cambios = CambioRepository(self.db)
+        cambios.registrar(PRODUCTO, ACTUALIZAR, [producto.codigo])
+        if nuevo_precio is not None:
+            cambios.registrar(PRECIO, CREAR, [producto.codigo])
         return producto
     
     def delete(self, codigo: str) -> bool:
@@ -164,4 +192,5 @@ class ProductoRepository:
             
         producto.activo = False
         self.db.flush()
+        CambioRepository(self.db).registrar(PRODUCTO, ELIMINAR, [producto.codigo])
         return True
\ No newline at end of file
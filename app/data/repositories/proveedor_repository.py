@@ -0,0 +1,104 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.data.models import Producto, PrecioHistorico, Proveedor, ProductoProveedor
+from app.data.repositories.catalogo_read_repository import _precio_actual_subquery
+from app.data.repositories.cambio_repository import CambioRepository, PRODUCTO, PRECIO, CREAR, ACTUALIZAR
+from app.data.repositories.inventario_repository import InventarioRepository
+
+# Columnas de Producto que puede informar la lista de un proveedor (además del precio)
+CAMPOS_PRODUCTO = ("nombre", "descripcion", "stock", "unidad_medida", "peso", "color", "modelo")
+
+
+class ProveedorRepository:
+    """Proveedores y las huellas de sus listas de precios"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_by_codigo(self, codigo: str) -> Optional[Proveedor]:
+        return self.db.query(Proveedor).filter(Proveedor.codigo == codigo, Proveedor.activo == True).first()
+
+    def get_huellas(self, proveedor_id: int, codigos: Iterable[str]) -> Dict[str, str]:
+        """Huella guardada por código para un lote de filas (un solo IN sobre el índice único)."""
+        return dict(self.db.execute(
+            select(ProductoProveedor.codigo, ProductoProveedor.huella).where(
+                ProductoProveedor.proveedor_id == proveedor_id,
+                ProductoProveedor.codigo.in_(list(codigos))
+            )
+        ).all())
+
+    def get_estado_productos(self, codigos: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        Valores actuales (columnas sincronizables y precio vigente) de los productos indicados.
+        Las filas quedan bloqueadas (FOR UPDATE) hasta el commit del lote: `guardar_cambios`
+        escribe el stock como valor absoluto y el AJUSTE se calcula desde el leído, así que
+        una venta aplicada entre medio por InventarioRepository.aplicar se perdería.
+        """
+        columnas = [getattr(Producto, campo) for campo in CAMPOS_PRODUCTO]
+        stmt = select(
+            Producto.id, Producto.codigo, *columnas, _precio_actual_subquery().label("precio")
+        ).where(Producto.codigo.in_(list(codigos))).with_for_update(of=Producto)
+        return {fila.codigo: dict(fila._mapping) for fila in self.db.execute(stmt)}
+
+    def guardar_cambios(self, proveedor_id: int, precios: List[Dict[str, Any]], productos: List[Dict[str, Any]],
+                        huellas: List[Dict[str, Any]], existentes: Iterable[str], motivo: str,
+                        movimientos: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Escribe en bloque los cambios de un lote: nuevos precios en el historial, las columnas
+        de los productos que cambiaron (ambos quedan en el registro de cambios), los
+        movimientos de stock que eso implica y las huellas (nuevas o reemplazadas). No hace commit.
+
+        - precios: {"codigo", "producto_id", "valor"}
+        - productos: {"codigo", "b_id", y un valor por cada campo de CAMPOS_PRODUCTO}
+        - huellas: {"codigo", "producto_id", "huella"}; `existentes` son los códigos que ya tenían huella
+        - movimientos: {"producto_id", "tipo", "cantidad"} (ver InventarioRepository.registrar)
+        """
+        ahora = datetime.utcnow()
+        cambios = CambioRepository(self.db)
+        if precios:
+            self.db.execute(insert(PrecioHistorico), [
+                {"producto_id": precio["producto_id"], "valor": precio["valor"], "fecha": ahora, "motivo": motivo}
+                for precio in precios
+            ])
+            cambios.registrar(PRECIO, CREAR, (precio["codigo"] for precio in precios))
+        if productos:
+            tabla = Producto.__table__
+            self.db.execute(
+                update(tabla).where(tabla.c.id == bindparam("b_id")).values(
+                    fecha_actualizacion=ahora,
+                    **{campo: bindparam(campo) for campo in CAMPOS_PRODUCTO}
+                ),
+                [{clave: valor for clave, valor in producto.items() if clave != "codigo"} for producto in productos]
+            )
+            cambios.registrar(PRODUCTO, ACTUALIZAR, (producto["codigo"] for producto in productos))
+        if movimientos:
+            InventarioRepository(self.db).registrar([{**m, "referencia": motivo} for m in movimientos], fecha=ahora)
+
+        existentes = set(existentes)
+        nuevas = [
+            {**huella, "proveedor_id": proveedor_id, "fecha_sincronizacion": ahora}
+            for huella in huellas if huella["codigo"] not in existentes
+        ]
+        reemplazadas = [
+            {"b_codigo": huella["codigo"], "b_producto_id": huella["producto_id"], "b_huella": huella["huella"]}
+            for huella in huellas if huella["codigo"] in existentes
+        ]
+        if nuevas:
+            self.db.execute(insert(ProductoProveedor), nuevas)
+        if reemplazadas:
+            tabla = ProductoProveedor.__table__
+            self.db.execute(
+                update(tabla).where(
+                    tabla.c.proveedor_id == proveedor_id,
+                    tabla.c.codigo == bindparam("b_codigo")
+                ).values(
+                    producto_id=bindparam("b_producto_id"),
+                    huella=bindparam("b_huella"),
+                    fecha_sincronizacion=ahora
+                ),
+                reemplazadas
+            )
@@ -0,0 +1,203 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, and_, delete, extract, func, insert, or_, select, tuple_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.data.models import Pago, ResumenPagosHora, ResumenPagosDia, AvanceResumen
+
+AVANCE = "pagos"  # Nombre de la marca de agua en `resumenes_avance`
+TURNO = "pagos:turno"  # Fila cuyo `hasta` es el vencimiento del turno del worker que actualiza
+LOTE_HORAS = 200  # Horas recalculadas por sentencia
+
+Clave = Tuple[date, int, str, str]
+
+
+def _fecha(valor: Any) -> date:
+    """`date()` de SQLite devuelve texto; MySQL, un date."""
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+
+class ResumenPagosRepository:
+    """
+    Resúmenes por hora y por día de los pagos, agrupados por estado y método de pago.
+
+    Cada pago cuenta en la hora de su `fecha_creacion`, que no cambia: cuando un pago
+    cambia de estado basta con recalcular su hora (y su día) desde `pagos`. Las horas
+    afectadas salen de los pagos con `fecha_actualizacion` posterior a la marca de agua.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def _agrupado(self):
+        """SELECT de los pagos agrupados por hora, estado y método (sin filtro de fechas)."""
+        dia = func.date(Pago.fecha_creacion, type_=Date)
+        hora = extract("hour", Pago.fecha_creacion)
+        metodo = func.coalesce(Pago.metodo_pago, "")
+        return select(
+            dia, hora, Pago.estado, metodo, func.count(), func.sum(Pago.monto)
+        ).group_by(dia, hora, Pago.estado, metodo)
+
+    def avance(self) -> Optional[datetime]:
+        return self.db.execute(select(AvanceResumen.hasta).where(AvanceResumen.nombre == AVANCE)).scalar()
+
+    def _fijar_avance(self, hasta: datetime) -> None:
+        self.db.merge(AvanceResumen(nombre=AVANCE, hasta=hasta))
+
+    def tomar_turno(self, ahora: datetime, duracion: timedelta, nombre: str = TURNO) -> bool:
+        """
+        Reserva el turno `nombre` para quien llama hasta `ahora + duracion` si el anterior
+        venció (UPDATE condicionado, o INSERT la primera vez). Con varios workers solo uno
+        lo obtiene en cada periodo; otros procesos de fondo usan su propio nombre. Hace
+        commit para que los demás lo vean.
+        """
+        tabla = AvanceResumen.__table__
+        tomado = self.db.execute(
+            update(tabla).where(tabla.c.nombre == nombre, tabla.c.hasta <= ahora).values(hasta=ahora + duracion)
+        ).rowcount
+        if not tomado and self.db.execute(select(tabla.c.nombre).where(tabla.c.nombre == nombre)).first() is None:
+            try:
+                self.db.execute(insert(tabla).values(nombre=nombre, hasta=ahora + duracion))
+                tomado = 1
+            except IntegrityError:
+                self.db.rollback()  # Otro worker lo insertó primero
+                return False
+        self.db.commit()
+        return bool(tomado)
+
+    def horas_modificadas(self, desde: datetime, hasta: datetime) -> List[datetime]:
+        """Horas de creación de los pagos modificados en (desde, hasta] (un rango del índice por fecha_actualizacion)."""
+        filas = self.db.execute(
+            select(func.date(Pago.fecha_creacion), extract("hour", Pago.fecha_creacion)).where(
+                Pago.fecha_actualizacion > desde, Pago.fecha_actualizacion <= hasta
+            ).distinct()
+        )
+        return sorted(datetime.combine(_fecha(dia), datetime.min.time()) + timedelta(hours=int(hora)) for dia, hora in filas)
+
+    def recalcular_horas(self, horas: Iterable[datetime]) -> int:
+        """Reemplaza las filas de esas horas por el agregado actual de sus pagos. No hace commit."""
+        horas = sorted(set(horas))
+        escritas = 0
+        for i in range(0, len(horas), LOTE_HORAS):
+            lote = horas[i:i + LOTE_HORAS]
+            self.db.execute(delete(ResumenPagosHora).where(
+                tuple_(ResumenPagosHora.fecha, ResumenPagosHora.hora).in_([(h.date(), h.hour) for h in lote])
+            ))
+            rangos = or_(*(
+                and_(Pago.fecha_creacion >= h, Pago.fecha_creacion < h + timedelta(hours=1)) for h in lote
+            ))
+            escritas += self.db.execute(
+                insert(ResumenPagosHora).from_select(
+                    ["fecha", "hora", "estado", "metodo_pago", "cantidad", "monto"],
+                    self._agrupado().where(rangos)
+                )
+            ).rowcount
+        return escritas
+
+    def recalcular_dias(self, dias: Iterable[date]) -> int:
+        """Reemplaza las filas diarias de esos días por la suma de sus horas. No hace commit."""
+        dias = sorted(set(dias))
+        if not dias:
+            return 0
+        self.db.execute(delete(ResumenPagosDia).where(ResumenPagosDia.fecha.in_(dias)))
+        h = ResumenPagosHora
+        return self.db.execute(
+            insert(ResumenPagosDia).from_select(
+                ["fecha", "estado", "metodo_pago", "cantidad", "monto"],
+                select(h.fecha, h.estado, h.metodo_pago, func.sum(h.cantidad), func.sum(h.monto))
+                .where(h.fecha.in_(dias))
+                .group_by(h.fecha, h.estado, h.metodo_pago)
+            )
+        ).rowcount
+
+    def actualizar(self, hasta: datetime) -> int:
+        """
+        Lleva los resúmenes hasta `hasta`: recalcula las horas de los pagos modificados
+        desde la marca de agua y la avanza. Devuelve las horas recalculadas (sin marca,
+        reconstruye y devuelve las filas por hora escritas). No hace commit.
+        """
+        desde = self.avance()
+        if desde is None:
+            return self.reconstruir(hasta)
+        if hasta <= desde:
+            return 0
+        horas = self.horas_modificadas(desde, hasta)
+        self.recalcular_horas(horas)
+        self.recalcular_dias(h.date() for h in horas)
+        self._fijar_avance(hasta)
+        return len(horas)
+
+    def reconstruir(self, hasta: datetime) -> int:
+        """Recalcula ambos resúmenes desde cero y fija la marca en `hasta`. Devuelve las filas por hora. No hace commit."""
+        self.db.execute(delete(ResumenPagosHora))
+        self.db.execute(delete(ResumenPagosDia))
+        escritas = self.db.execute(
+            insert(ResumenPagosHora).from_select(
+                ["fecha", "hora", "estado", "metodo_pago", "cantidad", "monto"], self._agrupado()
+            )
+        ).rowcount
+        h = ResumenPagosHora
+        self.db.execute(
+            insert(ResumenPagosDia).from_select(
+                ["fecha", "estado", "metodo_pago", "cantidad", "monto"],
+                select(h.fecha, h.estado, h.metodo_pago, func.sum(h.cantidad), func.sum(h.monto))
+                .group_by(h.fecha, h.estado, h.metodo_pago)
+            )
+        )
+        self._fijar_avance(hasta)
+        return escritas
+
+    def diferencias(self) -> List[Dict[str, Any]]:
+        """
+        Compara las filas por hora con el agregado calculado desde `pagos` y las diarias con
+        la suma de sus horas. Devuelve las claves que no coinciden (vacío si están al día).
+        """
+        esperado: Dict[Clave, Tuple[int, Any]] = {
+            (_fecha(dia), int(hora), estado, metodo): (cantidad, monto)
+            for dia, hora, estado, metodo, cantidad, monto in self.db.execute(self._agrupado())
+        }
+        h = ResumenPagosHora
+        guardado: Dict[Clave, Tuple[int, Any]] = {
+            (fila.fecha, fila.hora, fila.estado, fila.metodo_pago): (fila.cantidad, fila.monto)
+            for fila in self.db.execute(select(h.fecha, h.hora, h.estado, h.metodo_pago, h.cantidad, h.monto))
+        }
+        resultado = [
+            {"resumen": "hora", "clave": clave, "esperado": esperado.get(clave), "guardado": guardado.get(clave)}
+            for clave in sorted(esperado.keys() | guardado.keys())
+            if esperado.get(clave) is None or guardado.get(clave) is None
+            or esperado[clave][0] != guardado[clave][0] or float(esperado[clave][1]) != float(guardado[clave][1])
+        ]
+
+        diario: Dict[Tuple[date, str, str], Tuple[int, float]] = {}
+        for (dia, _, estado, metodo), (cantidad, monto) in guardado.items():
+            previo = diario.get((dia, estado, metodo), (0, 0.0))
+            diario[(dia, estado, metodo)] = (previo[0] + cantidad, previo[1] + float(monto))
+        d = ResumenPagosDia
+        dias = {
+            (fila.fecha, fila.estado, fila.metodo_pago): (fila.cantidad, float(fila.monto))
+            for fila in self.db.execute(select(d.fecha, d.estado, d.metodo_pago, d.cantidad, d.monto))
+        }
+        resultado.extend(
+            {"resumen": "dia", "clave": clave, "esperado": diario.get(clave), "guardado": dias.get(clave)}
+            for clave in sorted(diario.keys() | dias.keys())
+            if diario.get(clave) is None or dias.get(clave) is None
+            or diario[clave][0] != dias[clave][0] or round(diario[clave][1], 2) != round(dias[clave][1], 2)
+        )
+        return resultado
+
+    def consultar(self, desde: date, hasta: date, por_hora: bool = False,
+                  estado: Optional[str] = None, metodo_pago: Optional[str] = None) -> List[Any]:
+        """Filas del resumen diario (o por hora) entre ambas fechas inclusive, solo desde las tablas de resumen."""
+        tabla = ResumenPagosHora if por_hora else ResumenPagosDia
+        columnas = [tabla.fecha] + ([tabla.hora] if por_hora else []) + [
+            tabla.estado, tabla.metodo_pago, tabla.cantidad, tabla.monto
+        ]
+        consulta = select(*columnas).where(tabla.fecha >= desde, tabla.fecha <= hasta)
+        if estado:
+            consulta = consulta.where(tabla.estado == estado)
+        if metodo_pago is not None:
+            consulta = consulta.where(tabla.metodo_pago == metodo_pago)
+        orden = [tabla.fecha] + ([tabla.hora] if por_hora else []) + [tabla.estado, tabla.metodo_pago]
+        return self.db.execute(consulta.order_by(*orden)).all()
@@ -0,0 +1,76 @@
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from app.data.models import TipoCambio
+
+
+class TipoCambioRepository:
+    """Serie local de tipos de cambio (una fila por moneda y día con observación)"""
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_vigente(self, moneda: str, fecha: date) -> Optional[Tuple[date, Decimal]]:
+        """
+        Última observación en o antes de `fecha` (fines de semana y feriados usan la del
+        último día hábil). Se resuelve con el índice único (moneda, fecha).
+        """
+        fila = self.db.execute(
+            select(TipoCambio.fecha, TipoCambio.valor)
+            .where(TipoCambio.moneda == moneda, TipoCambio.fecha <= fecha)
+            .order_by(TipoCambio.fecha.desc())
+            .limit(1)
+        ).first()
+        return (fila.fecha, fila.valor) if fila else None
+
+    def get_rango(self, moneda: str, desde: date, hasta: date) -> List[Tuple[date, Decimal]]:
+        """Observaciones de una moneda entre dos fechas (para reportes)."""
+        return [tuple(fila) for fila in self.db.execute(
+            select(TipoCambio.fecha, TipoCambio.valor)
+            .where(TipoCambio.moneda == moneda, TipoCambio.fecha.between(desde, hasta))
+            .order_by(TipoCambio.fecha)
+        )]
+
+    def ultima_fecha(self, moneda: str) -> Optional[date]:
+        return self.db.execute(
+            select(func.max(TipoCambio.fecha)).where(TipoCambio.moneda == moneda)
+        ).scalar()
+
+    def guardar_observaciones(self, moneda: str, observaciones: Sequence[Tuple[date, Decimal]],
+                              fuente: str = "bcentral") -> Dict[str, int]:
+        """
+        Inserta en bloque las observaciones nuevas y corrige las que cambiaron de valor
+        (el Banco Central revisa algunas cifras). No hace commit.
+        """
+        if not observaciones:
+            return {"insertadas": 0, "actualizadas": 0}
+
+        fechas = [fecha for fecha, _ in observaciones]
+        existentes = dict(self.db.execute(
+            select(TipoCambio.fecha, TipoCambio.valor)
+            .where(TipoCambio.moneda == moneda, TipoCambio.fecha.between(min(fechas), max(fechas)))
+        ).all())
+
+        nuevas = [
+            {"moneda": moneda, "fecha": fecha, "valor": valor, "fuente": fuente}
+            for fecha, valor in observaciones if fecha not in existentes
+        ]
+        cambiadas = [
+            {"b_fecha": fecha, "b_valor": valor}
+            for fecha, valor in observaciones
+            if fecha in existentes and Decimal(existentes[fecha]) != valor
+        ]
+        if nuevas:
+            self.db.execute(insert(TipoCambio), nuevas)
+        if cambiadas:
+            self.db.execute(
+                update(TipoCambio.__table__)
+                .where(TipoCambio.__table__.c.moneda == moneda, TipoCambio.__table__.c.fecha == bindparam("b_fecha"))
+                .values(valor=bindparam("b_valor")),
+                cambiadas
+            )
+        return {"insertadas": len(nuevas), "actualizadas": len(cambiadas)}
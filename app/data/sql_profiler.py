@@ -0,0 +1,98 @@
+from collections import Counter
+from contextvars import ContextVar
+from functools import lru_cache
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from typing import Dict, Any, List, Optional
+import re
+import time
+from config import settings
+
+_ESPACIOS = re.compile(r"\s+")
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTAS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))*\s*\)")
+
+
+@lru_cache(maxsize=2048)
+def huella_sql(sentencia: str) -> str:
+    """
+    Normaliza una sentencia para agrupar ejecuciones equivalentes: literales y
+    listas IN de cualquier largo se reemplazan por marcadores.
+    """
+    huella = _ESPACIOS.sub(" ", sentencia).strip()
+    huella = _CADENAS.sub("?", huella)
+    huella = _NUMEROS.sub("?", huella)
+    return _LISTAS.sub("(?+)", huella)
+
+
+class PerfilSQL:
+    """Consultas ejecutadas durante una request"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tiempo_total = 0.0
+        self.huellas: Counter = Counter()
+        self.tiempo_por_huella: Dict[str, float] = {}
+
+    def registrar(self, sentencia: str, segundos: float) -> None:
+        huella = huella_sql(sentencia)
+        self.consultas += 1
+        self.tiempo_total += segundos
+        self.huellas[huella] += 1
+        self.tiempo_por_huella[huella] = self.tiempo_por_huella.get(huella, 0.0) + segundos
+
+    def sospechas_n_mas_1(self, umbral: int) -> List[Dict[str, Any]]:
+        """SELECT idénticos (salvo parámetros) repetidos `umbral` veces o más."""
+        return [
+            {
+                "sentencia": huella,
+                "repeticiones": repeticiones,
+                "tiempo_ms": round(self.tiempo_por_huella[huella] * 1000, 2)
+            }
+            for huella, repeticiones in self.huellas.most_common()
+            if repeticiones >= umbral and huella.upper().startswith("SELECT")
+        ]
+
+    def resumen(self, top: int = 5) -> Dict[str, Any]:
+        return {
+            "consultas": self.consultas,
+            "tiempo_db_ms": round(self.tiempo_total * 1000, 2),
+            "mas_repetidas": [
+                {"sentencia": huella, "repeticiones": repeticiones}
+                for huella, repeticiones in self.huellas.most_common(top)
+            ]
+        }
+
+
+# Perfil de la request en curso; lo fija el middleware `perfilar_sql`
+perfil_actual: ContextVar[Optional[PerfilSQL]] = ContextVar("perfil_actual", default=None)
+
+
+def _antes_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("perfil_inicio", []).append(time.perf_counter())
+
+
+def _despues_de_ejecutar(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("perfil_inicio")
+    if not inicios:
+        return
+    segundos = time.perf_counter() - inicios.pop()
+    perfil = perfil_actual.get()
+    if perfil is not None:
+        perfil.registrar(statement, segundos)
+
+
+def _error_al_ejecutar(contexto_excepcion):
+    conn = contexto_excepcion.connection
+    if conn is not None and conn.info.get("perfil_inicio"):
+        conn.info["perfil_inicio"].pop()
+
+
+def instrumentar_engine(engine: Engine) -> None:
+    """Mide cada sentencia ejecutada por el engine y la acumula en el perfil de la request."""
+    if not settings.SQL_PERFIL_ACTIVO:
+        return
+    event.listen(engine, "before_cursor_execute", _antes_de_ejecutar)
+    event.listen(engine, "after_cursor_execute", _despues_de_ejecutar)
+    event.listen(engine, "handle_error", _error_al_ejecutar)
@@ -1,16 +1,26 @@
 # app/integrations/banco_central.py
-import bcchapi
-from datetime import datetime
-import pandas as pd
-from typing import Literal
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Literal, Optional, List, Tuple
 
 from pathlib import Path
 
-# Ruta al archivo de credenciales
+from app.core.cache import cache
+
+# Ruta al archivo de credenciales (usuario en la primera línea, clave en la segunda)
 CREDENTIALS_FILE = Path(__file__).parent.parent.parent / "banco_central_credentials.txt"
 
-# Instanciar el cliente Siete
-siete = bcchapi.Siete(file=str(CREDENTIALS_FILE))
+# API REST de la Base de Datos Estadísticos (BDE) del Banco Central
+SIETE_URL = "https://si3.bcentral.cl/SieteRestWS/SieteRestWS.ashx"
+TIMEOUT_SEGUNDOS = 10
+
+# Días hacia atrás consultados para encontrar la última observación (fines de semana y feriados)
+DIAS_BUSQUEDA_OBSERVACION = 10
+
+# Vida en caché de una observación: el día en curso puede publicarse más tarde,
+# las fechas pasadas ya no cambian
+TTL_OBSERVACION_HOY = 60 * 60
+TTL_OBSERVACION_PASADA = 7 * 24 * 60 * 60
 
 # Códigos comunes de divisas: EUR = Euro, USD = Dólar, etc.
 CURRENCY_CODES = {
@@ -19,6 +29,64 @@ CURRENCY_CODES = {
 }
 
 
+@lru_cache(maxsize=1)
+def _credenciales() -> Tuple[str, str]:
+    """Lee las credenciales en el primer uso (no al importar el módulo)."""
+    lineas = CREDENTIALS_FILE.read_text(encoding="utf-8").splitlines()
+    return lineas[0].strip(), lineas[1].strip()
+
+
+@lru_cache(maxsize=1)
+def _sesion_http():
+    """Sesión HTTP reutilizable; `requests` se importa solo cuando se consulta la API."""
+    import requests
+    return requests.Session()
+
+
+def obtener_observaciones(codigo: str, desde: str, hasta: str) -> List[Tuple[str, float]]:
+    """
+    Observaciones (fecha ISO, valor) de una serie entre dos fechas, en una sola llamada.
+    Los días sin dato (NaN) se omiten.
+    """
+    usuario, clave = _credenciales()
+    respuesta = _sesion_http().get(SIETE_URL, params={
+        "user": usuario,
+        "pass": clave,
+        "firstdate": desde,
+        "lastdate": hasta,
+        "timeseries": codigo,
+        "function": "GetSeries",
+    }, timeout=TIMEOUT_SEGUNDOS)
+    respuesta.raise_for_status()
+    datos = respuesta.json()
+    if datos.get("Codigo") != 0:
+        raise RuntimeError(datos.get("Descripcion") or "Error consultando el Banco Central")
+
+    observaciones = []
+    for obs in (datos.get("Series") or {}).get("Obs") or []:
+        try:
+            valor = float(obs["value"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        if valor != valor:  # NaN
+            continue
+        fecha = datetime.strptime(obs["indexDateString"], "%d-%m-%Y").date().isoformat()
+        observaciones.append((fecha, valor))
+    return observaciones
+
+
+def _ultima_observacion(codigo: str, fecha: str) -> Optional[Tuple[str, float]]:
+    """Última observación disponible en o antes de `fecha` (cacheada por serie y fecha)."""
+    ttl = TTL_OBSERVACION_HOY if fecha >= datetime.now().strftime("%Y-%m-%d") else TTL_OBSERVACION_PASADA
+    return cache.get_or_set("divisas", f"{codigo}:{fecha}", lambda: _consultar_ultima_observacion(codigo, fecha), ttl=ttl)
+
+
+def _consultar_ultima_observacion(codigo: str, fecha: str) -> Optional[Tuple[str, float]]:
+    desde = (datetime.strptime(fecha, "%Y-%m-%d") - timedelta(days=DIAS_BUSQUEDA_OBSERVACION)).strftime("%Y-%m-%d")
+    observaciones = obtener_observaciones(codigo, desde, fecha)
+    return observaciones[-1] if observaciones else None
+
+
 def obtener_valor_divisa(moneda: Literal["usd", "eur"], fecha: str = None) -> dict:
     if moneda not in CURRENCY_CODES:
         return {"error": "Moneda no soportada"}
@@ -28,11 +96,13 @@ def obtener_valor_divisa(moneda: Literal["usd", "eur"], fecha: str = None) -> di
         fecha = datetime.now().strftime("%Y-%m-%d")
 
     try:
-        df = siete.series(codigo, desde=fecha, hasta=fecha)
-        valor = df.iloc[0]['value']
+        observacion = _ultima_observacion(codigo, fecha)
+        if observacion is None:
+            return {"error": f"Sin observaciones para {moneda.upper()} hasta {fecha}"}
+        fecha_observacion, valor = observacion
         return {
             "moneda": moneda.upper(),
-            "fecha": fecha,
+            "fecha": fecha_observacion,
             "valor_clp": valor
         }
     except Exception as e:
@@ -45,12 +115,14 @@ def obtener_todas_las_divisas(fecha: str = None) -> list:
     resultados = []
     for moneda, codigo in CURRENCY_CODES.items():
         try:
-            df = siete.series(codigo, desde=fecha, hasta=fecha)
-            valor = df.iloc[0]['value']
+            observacion = _ultima_observacion(codigo, fecha)
+            if observacion is None:
+                raise LookupError(f"Sin observaciones hasta {fecha}")
+            fecha_observacion, valor = observacion
             resultados.append({
                 "moneda": moneda.upper(),
                 "codigo": codigo,
-                "fecha": fecha,
+                "fecha": fecha_observacion,
                 "valor_clp": valor
             })
         except Exception as e:
@@ -61,3 +133,19 @@ def obtener_todas_las_divisas(fecha: str = None) -> list:
                 "error": str(e)
             })
     return resultados
+
+
+class BancoCentralIntegration:
+    """Consulta de tipos de cambio usada por DivisaService (observaciones cacheadas por día)."""
+
+    def obtener_observacion(self, moneda: str, fecha: str = None) -> Optional[Tuple[str, float]]:
+        """(fecha de la observación, CLP por unidad) vigente en `fecha` (por defecto hoy)."""
+        codigo = CURRENCY_CODES.get(moneda.lower())
+        if codigo is None:
+            return None
+        return _ultima_observacion(codigo, fecha or datetime.now().strftime("%Y-%m-%d"))
+
+    def obtener_tasa(self, moneda: str, fecha: str = None) -> Optional[float]:
+        """CLP por unidad de `moneda`, o None si la moneda no está soportada o no hay datos."""
+        observacion = self.obtener_observacion(moneda, fecha)
+        return observacion[1] if observacion else None
@@ -1,5 +1,5 @@
 import os
-import requests
+from functools import lru_cache
 
 # ✅ Configuración Webpay API REST
 API_KEY_ID = os.getenv("WEBPAY_API_KEY_ID", "597055555532")
@@ -12,6 +12,14 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
+@lru_cache(maxsize=1)
+def _sesion_http():
+    """Sesión HTTP con conexiones persistentes; `requests` se importa en el primer uso."""
+    import requests
+    sesion = requests.Session()
+    sesion.headers.update(HEADERS)
+    return sesion
+
 def crear_transaccion(buy_order: str, session_id: str, amount: float, return_url: str):
     payload = {
         "buy_order": buy_order,
@@ -20,10 +28,9 @@ def crear_transaccion(buy_order: str, session_id: str, amount: float, return_url
         "return_url": return_url
     }
     try:
-        response = requests.post(
+        response = _sesion_http().post(
             f"{BASE_URL}/rswebpaytransaction/api/webpay/v1.2/transactions",
-            json=payload,
-            headers=HEADERS
+            json=payload
         )
         return response.json(), response.status_code
     except Exception as e:
@@ -31,9 +38,8 @@ def crear_transaccion(buy_order: str, session_id: str, amount: float, return_url
 
 def confirmar_transaccion(token: str):
     try:
-        response = requests.put(
-            f"{BASE_URL}/rswebpaytransaction/api/webpay/v1.2/transactions/{token}",
-            headers=HEADERS
+        response = _sesion_http().put(
+            f"{BASE_URL}/rswebpaytransaction/api/webpay/v1.2/transactions/{token}"
         )
         return response.json(), response.status_code
     except Exception as e:
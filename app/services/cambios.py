@@ -0,0 +1,168 @@
+"""
+Seguimiento del registro de cambios del catálogo (tabla `cambios`).
+
+Cada escritura de productos, precios, categorías y marcas agrega filas a `cambios` en la
+misma transacción. Cada worker lee (por la PK) las filas posteriores a la última
+secuencia que procesó y se las entrega a los suscriptores, que invalidan o actualizan
+solo lo afectado: los índices en memoria de este worker y los namespaces de la caché.
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.core.cache import cache
+from app.data.database import SessionLocal, sesion_lectura
+from app.data.repositories.cambio_repository import CambioRegistrado, CambioRepository
+
+logger = logging.getLogger(__name__)
+
+HUECO_MAX_SEG = 60.0  # Tiempo que se espera una secuencia faltante antes de darla por descartada
+PURGA_SEG = 3600.0  # Intervalo entre purgas de cambios antiguos
+
+Manejador = Callable[[Session, List[CambioRegistrado]], None]
+
+
+class SeguidorCambios:
+    """
+    Lee el registro de cambios cada `intervalo` segundos y despacha los nuevos a los
+    suscriptores, agrupados por entidad.
+
+    Las secuencias se asignan al insertar pero se hacen visibles al confirmar, así que una
+    transacción larga puede aparecer después de otras posteriores. Los números que faltan
+    entre dos secuencias leídas se siguen consultando durante HUECO_MAX_SEG (un rollback
+    deja huecos que nunca se llenan).
+    """
+
+    def __init__(self, intervalo_seg: float, lote: int):
+        self.intervalo = intervalo_seg
+        self.lote = lote
+        self._suscriptores: List[Tuple[frozenset, Manejador]] = []
+        self._namespaces: List[Tuple[frozenset, str]] = []
+        self._ultima: Optional[int] = None
+        self._huecos: Dict[int, float] = {}  # secuencia faltante -> momento en que se detectó
+        self._lock = threading.Lock()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def suscribir(self, entidades: Iterable[str], manejador: Manejador) -> None:
+        """`manejador(db, cambios)` recibe, en orden, los cambios nuevos de esas entidades."""
+        self._suscriptores.append((frozenset(entidades), manejador))
+
+    @property
+    def secuencia(self) -> Optional[int]:
+        """Última secuencia procesada (None si aún no se inicializó)."""
+        return self._ultima
+
+    def procesar(self, db: Optional[Session] = None) -> int:
+        """
+        Despacha los cambios pendientes y devuelve cuántos había. Tras una escritura propia
+        conviene pasar la sesión que la confirmó, para no depender del retraso de la réplica.
+        """
+        with self._lock:
+            if db is not None:
+                return self._procesar(db)
+            with sesion_lectura() as propia:
+                return self._procesar(propia)
+
+    def _procesar(self, db: Session) -> int:
+        repo = CambioRepository(db)
+        if self._ultima is None:
+            # Lo anterior ya está reflejado en la base que leerán los índices al construirse
+            self._ultima = repo.ultima_secuencia()
+            return 0
+
+        ahora = time.monotonic()
+        for secuencia, detectado in list(self._huecos.items()):
+            if ahora - detectado > HUECO_MAX_SEG:
+                del self._huecos[secuencia]
+
+        total = 0
+        while True:
+            cambios = repo.siguientes(self._ultima, self.lote, self._huecos)
+            nuevos = [c for c in cambios if c.secuencia > self._ultima]
+            for c in cambios:
+                self._huecos.pop(c.secuencia, None)  # Llegó una secuencia que faltaba
+            for anterior, siguiente in zip([self._ultima] + [c.secuencia for c in nuevos], nuevos):
+                for faltante in range(anterior + 1, siguiente.secuencia):
+                    self._huecos.setdefault(faltante, ahora)
+            tardios = [c for c in cambios if c.secuencia <= self._ultima]
+            if tardios:
+                self._despachar(db, tardios, tardios=True)
+            if nuevos:
+                self._ultima = nuevos[-1].secuencia
+                self._despachar(db, nuevos)
+            total += len(cambios)
+            if len(cambios) < self.lote:
+                return total
+
+    def suscribir_namespace(self, namespace: str, entidades: Iterable[str]) -> None:
+        """
+        Invalida el namespace de la caché ante cambios de esas entidades. La secuencia evita
+        que cada worker vuelva a invalidar el nivel compartido por el mismo cambio; los
+        cambios que llegaron tarde (huecos) invalidan sin ella.
+        """
+        self._namespaces.append((frozenset(entidades), namespace))
+
+    def _despachar(self, db: Session, cambios: List[CambioRegistrado], tardios: bool = False) -> None:
+        for entidades, namespace in self._namespaces:
+            propios = [c.secuencia for c in cambios if c.entidad in entidades]
+            if propios:
+                cache.invalidar(namespace, secuencia=None if tardios else propios[-1])
+        for entidades, manejador in self._suscriptores:
+            propios = [c for c in cambios if c.entidad in entidades]
+            if not propios:
+                continue
+            try:
+                manejador(db, propios)
+            except Exception as e:
+                logger.error(f"Error aplicando {len(propios)} cambios en {manejador.__qualname__}: {e}")
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        try:
+            self.procesar()  # Fija la secuencia inicial antes de atender requests
+        except Exception as e:
+            logger.warning(f"No se pudo leer el registro de cambios: {e}")
+
+        def ciclo():
+            proxima_purga = time.monotonic() + PURGA_SEG
+            while not self._detener.wait(self.intervalo):
+                try:
+                    self.procesar()
+                except Exception as e:
+                    logger.warning(f"No se pudo leer el registro de cambios: {e}")
+                if time.monotonic() >= proxima_purga:
+                    proxima_purga = time.monotonic() + PURGA_SEG
+                    purgar(settings.CAMBIOS_RETENCION_DIAS)
+
+        self._hilo = threading.Thread(target=ciclo, name="cambios", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+def purgar(dias: int) -> int:
+    """Elimina los cambios con más de `dias` de antigüedad."""
+    db = SessionLocal()
+    try:
+        eliminados = CambioRepository(db).purgar(dias)
+        db.commit()
+        if eliminados:
+            logger.info(f"Registro de cambios: {eliminados} filas anteriores a {dias} días eliminadas")
+        return eliminados
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"No se pudo purgar el registro de cambios: {e}")
+        return 0
+    finally:
+        db.close()
+
+
+seguidor_cambios = SeguidorCambios(settings.CAMBIOS_INTERVALO_SEG, settings.CAMBIOS_LOTE)
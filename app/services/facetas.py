@@ -0,0 +1,398 @@
+import logging
+import threading
+import time
+from bisect import bisect_right
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import settings
+from app.data.database import sesion_lectura
+from app.data.repositories.cambio_repository import (
+    CambioRegistrado, PRODUCTO, PRECIO as PRECIO_CAMBIO, CATEGORIA as CATEGORIA_CAMBIO
+)
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository, ProductoFila
+from app.services.cambios import seguidor_cambios
+from app.services.sugerencias import normalizar
+
+logger = logging.getLogger(__name__)
+
+# Facetas del índice: cada una tiene un bitmap por valor (bit i = producto en la posición i)
+CATEGORIA, MARCA, PRECIO, STOCK = "categoria", "marca", "precio", "stock"
+DESTACADO, PROMOCION, STOCK_BAJO = "destacado", "en_promocion", "stock_bajo"
+NOMBRE = "nombre"  # Filtro por texto: no tiene bitmap propio, se calcula por consulta
+
+# Sobre esta cantidad de productos fuera de orden se reconstruye el índice completo
+MAX_DESORDENADOS = 1000
+
+_BITS_BYTE = tuple(tuple(bit for bit in range(8) if n >> bit & 1) for n in range(256))
+
+
+def contar(bitmap: int) -> int:
+    return bin(bitmap).count("1")
+
+
+def posiciones(bitmap: int) -> Iterator[int]:
+    """Posiciones de los bits encendidos en orden ascendente (recorre el bitmap por bytes)."""
+    datos = bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+    for i, byte in enumerate(datos):
+        if byte:
+            base = i << 3
+            for bit in _BITS_BYTE[byte]:
+                yield base + bit
+
+
+def desde_posiciones(lista: Iterable[int], tamano: int) -> int:
+    """Bitmap con las posiciones indicadas encendidas (sin un OR de enteros grandes por bit)."""
+    datos = bytearray((tamano + 7) // 8)
+    for posicion in lista:
+        datos[posicion >> 3] |= 1 << (posicion & 7)
+    return int.from_bytes(datos, "little")
+
+
+class ProductoFaceta(NamedTuple):
+    fila: ProductoFila
+    nombre_normalizado: str
+    categoria_id: Optional[int]
+    marca_id: Optional[int]
+    destacado: bool
+    en_promocion: bool
+    stock_minimo: int
+
+
+def _orden(producto: ProductoFaceta) -> Tuple[bool, bool, str]:
+    """Mismo orden que la búsqueda avanzada en SQL: destacados, en promoción, nombre."""
+    return (not producto.destacado, not producto.en_promocion, producto.fila.nombre)
+
+
+def _producto(fila: tuple) -> ProductoFaceta:
+    codigo, nombre, stock, precio, categoria, marca, categoria_id, marca_id, destacado, en_promocion, stock_minimo = fila[:11]
+    return ProductoFaceta(
+        ProductoFila(codigo, nombre, stock, float(precio) if precio is not None else None, categoria, marca),
+        normalizar(nombre), categoria_id, marca_id, bool(destacado), bool(en_promocion), stock_minimo
+    )
+
+
+class IndiceFacetas:
+    """
+    Índice de bitmaps en memoria para la búsqueda facetada de productos activos.
+
+    Cada producto ocupa una posición y cada valor de atributo tiene un entero de Python
+    usado como bitmap: categoría (el producto se marca en su categoría y en todas las
+    ancestras, así el bitmap de una categoría cubre su subárbol), marca, tramo de precio,
+    tramo de stock, destacado, en promoción y stock bajo. Un filtro es un AND de bitmaps
+    y cada conteo de faceta un AND más un popcount, sin consultar la base.
+
+    Las posiciones se asignan en el orden del listado, así una página se obtiene
+    recorriendo los primeros bits del resultado sin ordenar. Los cambios que alteran ese
+    orden (altas, cambio de nombre o de destacado) se agregan al final y obligan a ordenar
+    el resultado hasta la próxima reconstrucción.
+    """
+
+    def __init__(self, tramos_precio: Iterable[int], tramos_stock: Iterable[int]):
+        self.tramos = {PRECIO: sorted(tramos_precio), STOCK: sorted(tramos_stock)}
+        self._productos: List[Optional[ProductoFaceta]] = []
+        self._posicion: Dict[str, int] = {}
+        self._claves: Dict[int, List[Tuple[str, Any]]] = {}  # posición -> (faceta, valor) donde está marcada
+        self._bitmaps: Dict[str, Dict[Any, int]] = {}
+        self._vivos = 0
+        self._categorias: Dict[int, Tuple[str, Optional[int]]] = {}  # id -> (nombre, padre_id)
+        self._hijos: Dict[Optional[int], List[int]] = {}
+        self._marcas: Dict[int, str] = {}
+        self._desordenados = 0
+        self._version: Optional[int] = None
+        self._lock = threading.RLock()
+
+    # -- Construcción y cambios ------------------------------------------------
+
+    @staticmethod
+    def _arbol(categorias: Iterable[tuple]) -> Tuple[Dict[int, Tuple[str, Optional[int]]], Dict[Optional[int], List[int]]]:
+        por_id = {id_: (nombre, padre_id) for id_, nombre, padre_id in categorias}
+        hijos: Dict[Optional[int], List[int]] = {}
+        for id_, (_, padre_id) in por_id.items():
+            hijos.setdefault(padre_id if padre_id in por_id else None, []).append(id_)
+        return por_id, hijos
+
+    def _valores(self, producto: ProductoFaceta, categorias: Dict[int, Tuple[str, Optional[int]]]) -> List[Tuple[str, Any]]:
+        """Pares (faceta, valor) en cuyos bitmaps participa el producto."""
+        valores = []
+        categoria_id, vistas = producto.categoria_id, set()
+        while categoria_id is not None and categoria_id not in vistas:
+            vistas.add(categoria_id)
+            valores.append((CATEGORIA, categoria_id))
+            categoria_id = categorias.get(categoria_id, (None, None))[1]
+        if producto.marca_id is not None:
+            valores.append((MARCA, producto.marca_id))
+        if producto.fila.precio_actual is not None:
+            valores.append((PRECIO, bisect_right(self.tramos[PRECIO], producto.fila.precio_actual)))
+        valores.append((STOCK, bisect_right(self.tramos[STOCK], producto.fila.stock)))
+        if producto.destacado:
+            valores.append((DESTACADO, True))
+        if producto.en_promocion:
+            valores.append((PROMOCION, True))
+        if producto.fila.stock <= producto.stock_minimo:
+            valores.append((STOCK_BAJO, True))
+        return valores
+
+    def construir(self, filas: Iterable[tuple], categorias: Iterable[tuple], version: Optional[int] = None) -> None:
+        """Reconstruye el índice desde filas de `get_atributos_facetas` y el árbol de categorías."""
+        por_id, hijos = self._arbol(categorias)
+        productos: List[Optional[ProductoFaceta]] = sorted((_producto(fila) for fila in filas), key=_orden)
+        posicion = {producto.fila.codigo: i for i, producto in enumerate(productos)}
+        marcas = {p.marca_id: p.fila.marca for p in productos if p.marca_id is not None}
+
+        claves = {i: self._valores(producto, por_id) for i, producto in enumerate(productos)}
+        listas: Dict[Tuple[str, Any], List[int]] = {}
+        for i, valores in claves.items():
+            for clave in valores:
+                listas.setdefault(clave, []).append(i)
+        bitmaps: Dict[str, Dict[Any, int]] = {}
+        for (faceta, valor), lista in listas.items():
+            bitmaps.setdefault(faceta, {})[valor] = desde_posiciones(lista, len(productos))
+
+        with self._lock:
+            self._productos, self._posicion, self._claves, self._bitmaps = productos, posicion, claves, bitmaps
+            self._vivos = (1 << len(productos)) - 1
+            self._categorias, self._hijos, self._marcas = por_id, hijos, marcas
+            self._desordenados = 0
+            self._version = version
+
+    def actualizar(self, filas: Iterable[tuple], categorias: Optional[Iterable[tuple]] = None) -> None:
+        """Aplica cambios de productos (filas de `get_atributos_facetas`); los inactivos se quitan."""
+        with self._lock:
+            if categorias is not None:
+                self._categorias, self._hijos = self._arbol(categorias)
+            for fila in filas:
+                producto, activo = _producto(fila), fila[11]
+                posicion = self._posicion.get(producto.fila.codigo)
+                if posicion is not None:
+                    anterior = self._productos[posicion]
+                    self._quitar(posicion)
+                    if activo and _orden(anterior) == _orden(producto):
+                        self._poner(posicion, producto)
+                        continue
+                if activo:
+                    self._productos.append(None)
+                    self._poner(len(self._productos) - 1, producto)
+                    self._desordenados += 1
+
+    def eliminar(self, codigos: Iterable[str]) -> None:
+        with self._lock:
+            for codigo in codigos:
+                posicion = self._posicion.get(codigo)
+                if posicion is not None:
+                    self._quitar(posicion)
+
+    def _poner(self, posicion: int, producto: ProductoFaceta) -> None:
+        bit = 1 << posicion
+        self._claves[posicion] = self._valores(producto, self._categorias)
+        for faceta, valor in self._claves[posicion]:
+            bitmaps = self._bitmaps.setdefault(faceta, {})
+            bitmaps[valor] = bitmaps.get(valor, 0) | bit
+        self._productos[posicion] = producto
+        self._posicion[producto.fila.codigo] = posicion
+        self._vivos |= bit
+        if producto.marca_id is not None:
+            self._marcas[producto.marca_id] = producto.fila.marca
+
+    def _quitar(self, posicion: int) -> None:
+        producto = self._productos[posicion]
+        mascara = ~(1 << posicion)
+        for faceta, valor in self._claves.pop(posicion):
+            bitmaps = self._bitmaps.get(faceta, {})
+            if valor in bitmaps:
+                bitmaps[valor] &= mascara
+        self._productos[posicion] = None
+        del self._posicion[producto.fila.codigo]
+        self._vivos &= mascara
+
+    # -- Consultas -------------------------------------------------------------
+
+    def _bitmap(self, faceta: str, valor: Any) -> int:
+        return self._bitmaps.get(faceta, {}).get(valor, 0)
+
+    def _rango(self, faceta: str, minimo: Optional[float], maximo: Optional[float]) -> int:
+        """
+        Productos con el atributo en [minimo, maximo]: los tramos contenidos en el rango
+        se toman completos y solo se revisan uno a uno los productos de los tramos de borde.
+        """
+        limites = self.tramos[faceta]
+        resultado, revisar = 0, []
+        for tramo, bitmap in self._bitmaps.get(faceta, {}).items():
+            desde = limites[tramo - 1] if tramo > 0 else None  # incluido
+            hasta = limites[tramo] if tramo < len(limites) else None  # excluido
+            if (maximo is not None and desde is not None and desde > maximo) or \
+                    (minimo is not None and hasta is not None and hasta <= minimo):
+                continue
+            if (minimo is None or (desde is not None and desde >= minimo)) and \
+                    (maximo is None or (hasta is not None and hasta <= maximo)):
+                resultado |= bitmap
+            else:
+                revisar.append(bitmap)
+
+        dentro = []
+        for bitmap in revisar:
+            for posicion in posiciones(bitmap):
+                fila = self._productos[posicion].fila
+                valor = fila.precio_actual if faceta == PRECIO else fila.stock
+                if (minimo is None or valor >= minimo) and (maximo is None or valor <= maximo):
+                    dentro.append(posicion)
+        return resultado | desde_posiciones(dentro, len(self._productos))
+
+    def _por_nombre(self, texto: str) -> int:
+        buscado = normalizar(texto)
+        return desde_posiciones(
+            (i for i, producto in enumerate(self._productos) if producto and buscado in producto.nombre_normalizado),
+            len(self._productos)
+        )
+
+    def _filtros(self, filtros) -> Dict[str, int]:
+        """Bitmap de cada filtro activo de FiltrosProducto, por faceta."""
+        seleccion: Dict[str, int] = {}
+        if filtros.nombre:
+            seleccion[NOMBRE] = self._por_nombre(filtros.nombre)
+        if filtros.categoria_id:
+            seleccion[CATEGORIA] = self._bitmap(CATEGORIA, filtros.categoria_id)
+        if filtros.marca_id:
+            seleccion[MARCA] = self._bitmap(MARCA, filtros.marca_id)
+        if filtros.stock_min is not None or filtros.stock_max is not None:
+            seleccion[STOCK] = self._rango(STOCK, filtros.stock_min, filtros.stock_max)
+        if filtros.precio_min or filtros.precio_max:
+            seleccion[PRECIO] = self._rango(PRECIO, filtros.precio_min or None, filtros.precio_max or None)
+        if filtros.solo_destacados:
+            seleccion[DESTACADO] = self._bitmap(DESTACADO, True)
+        if filtros.solo_promociones:
+            seleccion[PROMOCION] = self._bitmap(PROMOCION, True)
+        if filtros.stock_bajo:
+            seleccion[STOCK_BAJO] = self._bitmap(STOCK_BAJO, True)
+        return seleccion
+
+    def _pagina(self, resultado: int, offset: int, limite: int) -> List[ProductoFila]:
+        if self._desordenados:
+            elegidas = sorted(posiciones(resultado), key=lambda i: _orden(self._productos[i]))[offset:offset + limite]
+        else:
+            elegidas = islice(posiciones(resultado), offset, offset + limite)
+        return [self._productos[i].fila for i in elegidas]
+
+    def _tramos(self, faceta: str, base: int) -> List[Dict[str, Any]]:
+        limites = self.tramos[faceta]
+        return [
+            {
+                "desde": limites[i - 1] if i > 0 else None,
+                "hasta": limites[i] if i < len(limites) else None,
+                "total": contar(base & self._bitmap(faceta, i))
+            }
+            for i in range(len(limites) + 1)
+        ]
+
+    def _facetas(self, seleccion: Dict[str, int], resultado: int, categoria_id: Optional[int]) -> Dict[str, Any]:
+        """
+        Conteos por valor de cada faceta. Los de una faceta filtrada se calculan sin su
+        propio filtro (ej. con marca=Stanley se siguen viendo los totales de las demás marcas).
+        """
+        def base(faceta: str) -> int:
+            if faceta not in seleccion:
+                return resultado
+            bitmap = self._vivos
+            for otra, filtro in seleccion.items():
+                if otra != faceta:
+                    bitmap &= filtro
+            return bitmap
+
+        base_categoria = base(CATEGORIA)
+        categorias = []
+        for id_ in self._hijos.get(categoria_id if categoria_id in self._categorias else None, []):
+            total = contar(base_categoria & self._bitmap(CATEGORIA, id_))
+            if total:
+                categorias.append({"id": id_, "nombre": self._categorias[id_][0], "total": total})
+
+        base_marca = base(MARCA)
+        marcas = []
+        for id_, bitmap in self._bitmaps.get(MARCA, {}).items():
+            total = contar(base_marca & bitmap)
+            if total:
+                marcas.append({"id": id_, "nombre": self._marcas.get(id_), "total": total})
+
+        return {
+            CATEGORIA: sorted(categorias, key=lambda c: (-c["total"], c["nombre"] or "")),
+            MARCA: sorted(marcas, key=lambda m: (-m["total"], m["nombre"] or "")),
+            PRECIO: self._tramos(PRECIO, base(PRECIO)),
+            STOCK: self._tramos(STOCK, base(STOCK)),
+            DESTACADO: contar(base(DESTACADO) & self._bitmap(DESTACADO, True)),
+            PROMOCION: contar(base(PROMOCION) & self._bitmap(PROMOCION, True)),
+            STOCK_BAJO: contar(base(STOCK_BAJO) & self._bitmap(STOCK_BAJO, True)),
+        }
+
+    def buscar(self, filtros, offset: int = 0, limite: int = 20) -> Dict[str, Any]:
+        """
+        Página de productos activos que cumplen `filtros` (FiltrosProducto), el total y los
+        conteos de todas las facetas, resueltos con intersecciones de bitmaps.
+        """
+        with self._lock:
+            seleccion = self._filtros(filtros)
+            resultado = self._vivos
+            for bitmap in seleccion.values():
+                resultado &= bitmap
+            return {
+                "filas": self._pagina(resultado, offset, limite),
+                "total": contar(resultado),
+                "facetas": self._facetas(seleccion, resultado, filtros.categoria_id),
+            }
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def marcar_version(self, version: int) -> None:
+        self._version = version
+
+    @property
+    def desordenados(self) -> int:
+        return self._desordenados
+
+    def __len__(self) -> int:
+        return len(self._posicion)
+
+
+indice_facetas = IndiceFacetas(settings.FACETAS_TRAMOS_PRECIO, settings.FACETAS_TRAMOS_STOCK)
+_lock_construccion = threading.Lock()
+
+
+def _indice_vigente() -> IndiceFacetas:
+    """Construye el índice en el primer uso, tras una invalidación o si perdió el orden."""
+    if indice_facetas.version is not None and indice_facetas.desordenados < MAX_DESORDENADOS:
+        return indice_facetas
+    with _lock_construccion:
+        if indice_facetas.version is None or indice_facetas.desordenados >= MAX_DESORDENADOS:
+            inicio = time.perf_counter()
+            with sesion_lectura() as db:
+                repo = CatalogoReadRepository(db)
+                filas, categorias = repo.get_atributos_facetas(), repo.get_arbol_categorias()
+            indice_facetas.construir(filas, categorias, seguidor_cambios.secuencia or 0)
+            logger.info(f"Índice de facetas construido: {len(indice_facetas)} productos "
+                        f"en {(time.perf_counter() - inicio) * 1000:.0f}ms")
+    return indice_facetas
+
+
+def buscar_facetado(filtros, offset: int = 0, limite: int = 20) -> Dict[str, Any]:
+    return _indice_vigente().buscar(filtros, offset, limite)
+
+
+def aplicar_cambios(db, cambios: List[CambioRegistrado]) -> None:
+    """
+    Suscriptor del registro de cambios: actualiza los bitmaps con el estado actual de los
+    productos afectados (por cambio propio o de precio). Un cambio de categorías recarga el árbol.
+    """
+    with _lock_construccion:
+        if indice_facetas.version is None:
+            return  # Aún no construido: se construirá completo en la primera consulta
+        repo = CatalogoReadRepository(db)
+        codigos = list(dict.fromkeys(c.clave for c in cambios if c.entidad in (PRODUCTO, PRECIO_CAMBIO)))
+        categorias = repo.get_arbol_categorias() if any(c.entidad == CATEGORIA_CAMBIO for c in cambios) else None
+        filas = repo.get_atributos_facetas(codigos) if codigos else []
+        encontrados = {fila[0] for fila in filas}
+        indice_facetas.actualizar(filas, categorias)
+        indice_facetas.eliminar(c for c in codigos if c not in encontrados)
+        indice_facetas.marcar_version(cambios[-1].secuencia)
+
+
+seguidor_cambios.suscribir([PRODUCTO, PRECIO_CAMBIO, CATEGORIA_CAMBIO], aplicar_cambios)
@@ -0,0 +1,105 @@
+"""
+Cortes diarios del libro de movimientos de stock.
+
+    python -m app.services.inventario cortes [--hasta 2024-06-01]
+    python -m app.services.inventario stock --codigo MTL-001 --fecha 2024-05-15
+
+Cada corte guarda el stock al cierre del día de los productos que tuvieron movimientos
+desde el corte anterior, así el stock a una fecha es el último corte más un rango corto
+del libro en lugar de recorrer todos los movimientos del producto.
+"""
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+from config import settings
+from app.data.database import SessionLocal
+from app.data.repositories.inventario_repository import InventarioRepository
+from app.services.resumen_pagos import tomar_turno
+
+logger = logging.getLogger(__name__)
+
+MARGEN = timedelta(minutes=5)  # Un movimiento se confirma poco después de su fecha
+TURNO = "inventario:cortes"  # Con varios workers, solo el que lo toma genera el corte
+
+
+def generar_cortes(hasta: Optional[datetime] = None) -> int:
+    """Corte al cierre de `hasta` (por defecto, la última medianoche UTC). No repite cortes ya hechos."""
+    if hasta is None:
+        hasta = (datetime.utcnow() - MARGEN).replace(hour=0, minute=0, second=0, microsecond=0)
+    db = SessionLocal()
+    try:
+        escritos = InventarioRepository(db).generar_cortes(hasta)
+        db.commit()
+        if escritos:
+            logger.info(f"Corte de stock al {hasta.isoformat()}: {escritos} productos")
+        return escritos
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class ProgramadorCortes:
+    """
+    Hilo de fondo que revisa cada INVENTARIO_CORTES_HORAS si falta el corte del último día.
+    Cada worker tiene uno, pero en cada intervalo solo revisa el que toma el turno.
+    """
+
+    def __init__(self, intervalo_horas: float):
+        self.intervalo = intervalo_horas * 3600
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def ciclo():
+            while not self._detener.is_set():
+                try:
+                    if tomar_turno(self.intervalo, TURNO):
+                        generar_cortes()
+                except Exception as e:
+                    logger.warning(f"No se pudo generar el corte de stock: {e}")
+                self._detener.wait(self.intervalo)
+
+        self._hilo = threading.Thread(target=ciclo, name="cortes-stock", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+programador_cortes = ProgramadorCortes(settings.INVENTARIO_CORTES_HORAS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.services.inventario")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_cortes = sub.add_parser("cortes", help="Genera el corte de stock al cierre de un día")
+    p_cortes.add_argument("--hasta", type=datetime.fromisoformat, help="Por defecto, la última medianoche UTC")
+    p_stock = sub.add_parser("stock", help="Stock de un producto a una fecha")
+    p_stock.add_argument("--codigo", required=True)
+    p_stock.add_argument("--fecha")
+    args = parser.parse_args()
+
+    if args.comando == "cortes":
+        print(generar_cortes(args.hasta))
+    else:
+        # app.services.productos importa los schemas de app.api, cuyo __init__ carga los routers
+        # que a su vez importan el servicio: se carga primero el paquete para no caer en el ciclo
+        import app.api  # noqa: F401
+        from app.services.productos import ProductoService
+
+        db = SessionLocal()
+        try:
+            print(ProductoService(db).get_stock_al(args.codigo, args.fecha))
+        finally:
+            db.close()
@@ -0,0 +1,210 @@
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.data.database import SessionLocal
+from app.data.repositories.mensaje_repository import MensajeRepository, SIN_VENDEDOR
+
+logger = logging.getLogger(__name__)
+
+MAX_FALLOS_LOTE = 3  # Fallos seguidos de un lote antes de guardarlo fila por fila
+
+
+class ColaMensajes:
+    """
+    Cola write-behind de mensajes de contacto.
+
+    El endpoint solo encola (sin tocar la base) y un hilo de fondo inserta lo
+    acumulado en lotes de hasta CONTACTO_LOTE filas cada CONTACTO_FLUSH_SEG segundos,
+    o antes si se llena un lote. Si la inserción falla, el lote vuelve al frente de
+    la cola y se reintenta en la siguiente pasada. Tras MAX_FALLOS_LOTE fallos seguidos
+    se guarda fila por fila y se descartan (en el log) las filas que la base rechaza,
+    para que un mensaje inválido no bloquee a los demás.
+    """
+
+    def __init__(self, tamano_lote: int, intervalo: float, maximo: int):
+        self.tamano_lote = tamano_lote
+        self.intervalo = intervalo
+        self.maximo = maximo
+        self._pendientes: deque = deque()
+        self._lock = threading.Lock()
+        self._lote_listo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self._fallos = 0
+
+    def encolar(self, mensaje: Dict[str, Any]) -> bool:
+        """Agrega un mensaje; devuelve False si la cola está llena."""
+        with self._lock:
+            if len(self._pendientes) >= self.maximo:
+                return False
+            self._pendientes.append(mensaje)
+            if len(self._pendientes) >= self.tamano_lote:
+                self._lote_listo.set()
+        return True
+
+    def pendientes(self) -> int:
+        return len(self._pendientes)
+
+    def vaciar(self) -> int:
+        """Inserta todos los mensajes pendientes en lotes; devuelve cuántos se guardaron."""
+        guardados = 0
+        while True:
+            with self._lock:
+                lote = [self._pendientes.popleft() for _ in range(min(self.tamano_lote, len(self._pendientes)))]
+            if not lote:
+                return guardados
+
+            db = SessionLocal()
+            try:
+                MensajeRepository(db).create_many(lote)
+                db.commit()
+                guardados += len(lote)
+                self._fallos = 0
+                continue
+            except Exception as e:
+                db.rollback()
+                self._fallos += 1
+                logger.error(f"No se pudo guardar un lote de {len(lote)} mensajes de contacto: {e}")
+            finally:
+                db.close()
+
+            pendientes = lote
+            if self._fallos >= MAX_FALLOS_LOTE:
+                self._fallos = 0
+                guardados_lote, pendientes = self._guardar_de_a_uno(lote)
+                guardados += guardados_lote
+            if pendientes:
+                with self._lock:
+                    self._pendientes.extendleft(reversed(pendientes))
+                return guardados
+
+    def _guardar_de_a_uno(self, lote: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Inserta el lote fila por fila. Una fila que falla con la base disponible se descarta;
+        si la base no responde, esa fila y las siguientes se devuelven para reintentar.
+        """
+        guardados = 0
+        for i, mensaje in enumerate(lote):
+            db = SessionLocal()
+            try:
+                MensajeRepository(db).create_many([mensaje])
+                db.commit()
+                guardados += 1
+            except Exception as e:
+                db.rollback()
+                if not _base_disponible():
+                    return guardados, lote[i:]
+                logger.error(
+                    f"Mensaje de contacto descartado ({mensaje.get('cliente_email')!r}, {mensaje.get('fecha')}): {e}"
+                )
+            finally:
+                db.close()
+        return guardados, []
+
+    def iniciar(self) -> None:
+        """Arranca el hilo de vaciado (idempotente)."""
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def ciclo():
+            while not self._detener.is_set():
+                self._lote_listo.wait(self.intervalo)
+                self._lote_listo.clear()
+                self.vaciar()
+
+        self._hilo = threading.Thread(target=ciclo, name="cola-mensajes", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        """Detiene el hilo y guarda lo que quede en la cola."""
+        self._detener.set()
+        self._lote_listo.set()
+        if self._hilo:
+            self._hilo.join(timeout=self.intervalo + 5)
+        self.vaciar()
+
+
+def _base_disponible() -> bool:
+    db = SessionLocal()
+    try:
+        db.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
+    finally:
+        db.close()
+
+
+cola_mensajes = ColaMensajes(
+    tamano_lote=settings.CONTACTO_LOTE,
+    intervalo=settings.CONTACTO_FLUSH_SEG,
+    maximo=settings.CONTACTO_COLA_MAX
+)
+
+
+class MensajeService:
+    """Servicio de mensajes de contacto y bandeja de vendedores"""
+
+    def __init__(self, db: Optional[Session] = None):
+        self.db = db
+
+    def recibir_mensaje(self, datos: Dict[str, Any]) -> Dict[str, Any]:
+        """Acepta un mensaje de contacto en la cola de escritura diferida."""
+        mensaje = {
+            "cliente_nombre": datos.get("cliente_nombre") or "Cliente",
+            "cliente_email": datos.get("cliente_email") or "",
+            "cliente_telefono": datos.get("cliente_telefono"),
+            "vendedor_id": datos.get("vendedor_id"),
+            "asunto": datos.get("asunto"),
+            "contenido": datos["contenido"],
+            "fecha": datetime.utcnow(),
+            "leido": False,
+            "respondido": False,
+        }
+        if not cola_mensajes.encolar(mensaje):
+            return {"error": "Demasiados mensajes pendientes, intente nuevamente en unos segundos"}
+        return {"estado": "recibido", "fecha": mensaje["fecha"]}
+
+    def get_bandeja(self, vendedor_id: int, solo_no_leidos: bool = False,
+                    pagina: int = 1, por_pagina: int = 20) -> Dict[str, Any]:
+        """Página de la bandeja de un vendedor junto a su contador de no leídos."""
+        repo = MensajeRepository(self.db)
+        mensajes = repo.get_bandeja(
+            vendedor_id, only_unread=solo_no_leidos,
+            offset=(pagina - 1) * por_pagina, limit=por_pagina + 1
+        )
+        return {
+            "vendedor_id": vendedor_id,
+            "pagina": pagina,
+            "por_pagina": por_pagina,
+            "hay_mas": len(mensajes) > por_pagina,
+            "no_leidos": repo.contar_no_leidos(vendedor_id),
+            "mensajes": mensajes[:por_pagina],
+        }
+
+    def contar_no_leidos(self, vendedor_id: int) -> int:
+        return MensajeRepository(self.db).contar_no_leidos(vendedor_id)
+
+    def marcar_leido(self, mensaje_id: int, vendedor_id: Optional[int] = None) -> Dict[str, Any]:
+        """Marca el mensaje como leído; con `vendedor_id`, solo si el mensaje es de ese vendedor."""
+        try:
+            repo = MensajeRepository(self.db)
+            mensaje = repo.get_by_id(mensaje_id)
+            if mensaje is None:
+                return {"error": "Mensaje no encontrado"}
+            if vendedor_id is not None and (mensaje.vendedor_id or SIN_VENDEDOR) != vendedor_id:
+                return {"error": "El mensaje pertenece a otro vendedor", "prohibido": True}
+            repo.mark_as_read(mensaje_id)
+            self.db.commit()
+            return {"id": mensaje_id, "leido": True}
+        except Exception as e:
+            self.db.rollback()
+            return {"error": f"Error marcando mensaje: {str(e)}"}
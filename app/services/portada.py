@@ -0,0 +1,138 @@
+"""
+Portada precalculada: destacados (mayores rebajas y últimos lanzamientos) y lanzamientos.
+
+Un hilo de fondo arma las listas cada PORTADA_INTERVALO_SEG y, antes, cuando el registro
+de cambios trae escrituras de productos, precios, categorías o marcas. Las respuestas
+quedan serializadas en memoria con su ETag, así `/productos-destacados/` y
+`/lanzamientos/` no consultan la base. Cada worker arma su propia portada.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.core.http import calcular_etag, serializar_json
+from app.data.database import sesion_lectura
+from app.data.repositories.cambio_repository import CambioRegistrado, PRODUCTO, PRECIO, CATEGORIA, MARCA
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository, ProductoFila
+from app.services.cambios import seguidor_cambios
+from app.services.promociones import productos_en_promocion
+
+logger = logging.getLogger(__name__)
+
+# Definidos aquí y no en app.services.productos: ese módulo carga app.api, y main importa
+# este antes que app.api (importarlo desde aquí deja un import circular)
+MAX_DESTACADOS = 12  # Productos por lista en /productos-destacados/
+MAX_LANZAMIENTOS = 100
+DIAS_DESTACADOS = 30  # Lanzamientos que entran en /productos-destacados/
+DIAS_LANZAMIENTOS_MAX = 365  # Máximo de `dias` aceptado por /lanzamientos/
+
+
+class Portada:
+    """
+    Listas de una construcción, ya serializadas. Los lanzamientos son los MAX_LANZAMIENTOS
+    más recientes del último año: los de `dias` días son un prefijo de esa lista, así que
+    cada largo de prefijo se serializa una vez (a lo más MAX_LANZAMIENTOS + 1 cuerpos).
+    """
+
+    def __init__(self, generado: datetime, destacados: bytes, lanzamientos: List[Tuple[datetime, ProductoFila]]):
+        self.generado = generado
+        self.destacados = destacados
+        self.etag_destacados = calcular_etag(destacados)
+        self._lanzamientos = [fila._asdict() for _, fila in lanzamientos]
+        # Fechas de creación en orden ascendente, para ubicar el corte con bisect
+        self._fechas = [fecha for fecha, _ in reversed(lanzamientos)]
+        self._cuerpos: Dict[int, Tuple[bytes, str]] = {}
+
+    def lanzamientos(self, dias: int) -> Tuple[bytes, str]:
+        """Cuerpo y ETag de los lanzamientos de los últimos `dias` días."""
+        desde = self.generado - timedelta(days=dias)
+        largo = len(self._fechas) - bisect_left(self._fechas, desde)
+        cuerpo = self._cuerpos.get(largo)
+        if cuerpo is None:
+            contenido = serializar_json(self._lanzamientos[:largo])
+            cuerpo = self._cuerpos.setdefault(largo, (contenido, calcular_etag(contenido)))
+        return cuerpo
+
+
+def construir() -> Portada:
+    """Arma la portada desde la base: las rebajas salen de su caché y los lanzamientos del índice activo/fecha."""
+    generado = datetime.utcnow()
+    with sesion_lectura() as db:
+        promociones = productos_en_promocion(db, MAX_DESTACADOS)
+        lanzamientos = CatalogoReadRepository(db).get_lanzamientos(
+            generado - timedelta(days=DIAS_LANZAMIENTOS_MAX), MAX_LANZAMIENTOS
+        )
+    desde_destacados = generado - timedelta(days=DIAS_DESTACADOS)
+    destacados = serializar_json({
+        "promociones": promociones,
+        "lanzamientos": [fila._asdict() for fecha, fila in lanzamientos[:MAX_DESTACADOS] if fecha >= desde_destacados],
+    })
+    return Portada(generado, destacados, lanzamientos)
+
+
+class ConstructorPortada:
+    """
+    Mantiene la portada vigente. El hilo la reconstruye cada `intervalo_seg` o apenas el
+    seguidor de cambios avisa de una escritura relevante; las ráfagas de cambios se
+    agrupan en una sola reconstrucción.
+    """
+
+    def __init__(self, intervalo_seg: float):
+        self.intervalo = intervalo_seg
+        self._portada: Optional[Portada] = None
+        self._pendiente = threading.Event()
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def portada(self) -> Optional[Portada]:
+        """Última portada construida (None si el constructor no está activo o aún no construye)."""
+        return self._portada
+
+    def aplicar_cambios(self, db: Session, cambios: List[CambioRegistrado]) -> None:
+        self._pendiente.set()
+
+    def reconstruir(self) -> None:
+        t0 = time.perf_counter()
+        self._portada = construir()
+        logger.debug(f"Portada reconstruida en {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        try:
+            self.reconstruir()  # Lista antes de atender requests
+        except Exception as e:
+            logger.warning(f"No se pudo construir la portada: {e}")
+
+        def ciclo():
+            while not self._detener.is_set():
+                self._pendiente.wait(self.intervalo)
+                if self._detener.is_set():
+                    return
+                self._pendiente.clear()
+                try:
+                    self.reconstruir()
+                except Exception as e:
+                    logger.warning(f"No se pudo construir la portada: {e}")
+
+        self._hilo = threading.Thread(target=ciclo, name="portada", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+        self._pendiente.set()
+        self._portada = None
+
+
+constructor_portada = ConstructorPortada(settings.PORTADA_INTERVALO_SEG)
+
+# Nombres, stock, precios y altas o bajas de productos cambian las listas
+seguidor_cambios.suscribir([PRODUCTO, PRECIO, CATEGORIA, MARCA], constructor_portada.aplicar_cambios)
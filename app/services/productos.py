@@ -1,28 +1,44 @@
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import and_, or_, func, desc, asc
-from typing import Optional, List, Dict, Any
+from sqlalchemy import and_, or_, func, desc
+from typing import Optional, List, Dict, Any, Union
 from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 import math
 
+from config import settings
+from app.core.cache import cache
 from app.data.models import Producto, Categoria, Marca, PrecioHistorico
+from app.data.repositories.producto_repository import ProductoRepository
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository, ProductoFila
+from app.data.repositories.cambio_repository import PRODUCTO, MARCA, CATEGORIA
+from app.data.repositories.inventario_repository import InventarioRepository
+from app.services.cambios import seguidor_cambios
+from app.services.facetas import buscar_facetado
+from app.services.portada import MAX_DESTACADOS, MAX_LANZAMIENTOS
+from app.services.promociones import productos_en_promocion
 from app.api.schemas import (
     ProductoCreate, ProductoUpdate, ProductoResponse, ProductoBasic,
     CategoriaResponse, MarcaResponse, HistorialPreciosResponse,
-    ProductoSearch, EstadisticasGenerales, FiltrosProducto
+    ProductoSearch, EstadisticasGenerales, FiltrosProducto, LineaCotizacion
 )
 
+
 class ProductoService:
     def __init__(self, db: Session):
         self.db = db
 
+    def _get_producto_completo(self, codigo: str) -> Optional[Producto]:
+        """Carga un producto con su categoría, marca y precios"""
+        return self.db.query(Producto).options(
+            joinedload(Producto.categoria),
+            joinedload(Producto.marca),
+            joinedload(Producto.precios)
+        ).filter(Producto.codigo == codigo).first()
+
     def get_producto_by_codigo(self, codigo: str) -> Dict[str, Any]:
         """Obtiene un producto por su código"""
         try:
-            producto = self.db.query(Producto).options(
-                joinedload(Producto.categoria),
-                joinedload(Producto.marca),
-                joinedload(Producto.precios)
-            ).filter(Producto.codigo == codigo).first()
+            producto = self._get_producto_completo(codigo)
 
             if not producto:
                 return {"error": f"Producto con código '{codigo}' no encontrado"}
@@ -71,29 +87,53 @@ class ProductoService:
         except Exception as e:
             return {"error": f"Error obteniendo producto: {str(e)}"}
 
-    def search_productos_by_name(self, nombre: str, pagina: int = 1, por_pagina: int = 20) -> List[Dict[str, Any]]:
-        """Busca productos por nombre (búsqueda parcial)"""
+    def get_producto_detalle(self, codigo: str) -> Union[ProductoResponse, Dict[str, Any]]:
+        """
+        Obtiene el detalle de un producto como ProductoResponse ya construido.
+        Los datos vienen tipados desde la BD, por lo que el modelo se arma sin
+        re-validación y el endpoint puede serializarlo directamente.
+        """
         try:
-            query = self.db.query(Producto).options(
-                joinedload(Producto.categoria),
-                joinedload(Producto.marca)
-            ).filter(
-                and_(
-                    Producto.nombre.contains(nombre),
-                    Producto.activo == True
-                )
+            producto = self._get_producto_completo(codigo)
+
+            if not producto:
+                return {"error": f"Producto con código '{codigo}' no encontrado"}
+
+            return ProductoResponse.model_construct(
+                id=producto.id,
+                codigo=producto.codigo,
+                nombre=producto.nombre,
+                descripcion=producto.descripcion,
+                stock=producto.stock,
+                precio_actual=producto.precio_actual,
+                fecha_creacion=producto.fecha_creacion,
+                categoria=CategoriaResponse.model_construct(
+                    id=producto.categoria.id,
+                    nombre=producto.categoria.nombre,
+                    descripcion=producto.categoria.descripcion
+                ) if producto.categoria else None,
+                marca=MarcaResponse.model_construct(
+                    id=producto.marca.id,
+                    nombre=producto.marca.nombre,
+                    codigo=producto.marca.codigo
+                ) if producto.marca else None
             )
 
-            # Calcular paginación
-            total = query.count()
-            productos = query.offset((pagina - 1) * por_pagina).limit(por_pagina).all()
+        except Exception as e:
+            return {"error": f"Error obteniendo producto: {str(e)}"}
 
-            return self._format_productos_basicos(productos)
+    def search_productos_by_name(self, nombre: str, pagina: int = 1, por_pagina: int = 20) -> List[ProductoBasic]:
+        """Busca productos por nombre (búsqueda parcial)"""
+        try:
+            filas = CatalogoReadRepository(self.db).search_by_name(
+                nombre, offset=(pagina - 1) * por_pagina, limit=por_pagina
+            )
+            return self._format_productos_basicos(filas)
 
         except Exception as e:
             return {"error": f"Error buscando productos: {str(e)}"}
 
-    def get_productos_by_categoria(self, categoria_codigo: str, incluir_subcategorias: bool = True) -> List[Dict[str, Any]]:
+    def get_productos_by_categoria(self, categoria_codigo: str, incluir_subcategorias: bool = True) -> List[ProductoBasic]:
         """Obtiene productos de una categoría específica"""
         try:
             categoria = self.db.query(Categoria).filter(Categoria.codigo == categoria_codigo).first()
@@ -107,47 +147,82 @@ class ProductoService:
                 subcategorias = self._get_subcategorias_recursivo(categoria.id)
                 category_ids.extend(subcategorias)
 
-            productos = self.db.query(Producto).options(
-                joinedload(Producto.categoria),
-                joinedload(Producto.marca)
-            ).filter(
-                and_(
-                    Producto.categoria_id.in_(category_ids),
-                    Producto.activo == True
-                )
-            ).all()
-
-            return self._format_productos_basicos(productos)
+            filas = CatalogoReadRepository(self.db).get_by_categorias(category_ids)
+            return self._format_productos_basicos(filas)
 
         except Exception as e:
             return {"error": f"Error obteniendo productos por categoría: {str(e)}"}
 
-    def get_productos_by_stock(self, stock_max: int) -> List[Dict[str, Any]]:
-        """Obtiene productos con stock menor o igual al especificado"""
+    def cotizar_productos(self, lineas: List[LineaCotizacion]) -> Dict[str, Any]:
+        """
+        Resuelve un carrito o cotización en lote: un solo SELECT ... IN con el precio vigente
+        para todos los códigos. Las líneas vuelven en el orden pedido, las inexistentes o
+        inactivas marcadas con `encontrado=False`, y los totales se calculan aquí en CLP
+        (los montos a cobrar nunca vienen del cliente).
+        """
         try:
-            productos = self.db.query(Producto).options(
-                joinedload(Producto.categoria),
-                joinedload(Producto.marca)
-            ).filter(
-                and_(
-                    Producto.stock <= stock_max,
-                    Producto.activo == True
-                )
-            ).order_by(asc(Producto.stock)).all()
+            productos = CatalogoReadRepository(self.db).get_by_codigos(linea.codigo for linea in lineas)
+
+            items, no_encontrados = [], []
+            total, completo = Decimal(0), True
+            for linea in lineas:
+                fila = productos.get(linea.codigo)
+                if fila is None:
+                    no_encontrados.append(linea.codigo)
+                    completo = False
+                    items.append({"codigo": linea.codigo, "cantidad": linea.cantidad, "encontrado": False})
+                    continue
+
+                total_linea = None
+                if fila.precio_actual is None:
+                    completo = False
+                else:
+                    total_linea = (Decimal(str(fila.precio_actual)) * linea.cantidad).quantize(Decimal(1), rounding=ROUND_HALF_UP)
+                    total += total_linea
+                items.append({
+                    "codigo": linea.codigo,
+                    "cantidad": linea.cantidad,
+                    "encontrado": True,
+                    "producto": ProductoBasic.model_construct(**fila._asdict()),
+                    "precio_unitario": fila.precio_actual,
+                    "total_linea": total_linea,
+                    "stock_suficiente": fila.stock >= linea.cantidad
+                })
+
+            return {"items": items, "total": total, "completo": completo, "no_encontrados": no_encontrados}
 
-            return self._format_productos_basicos(productos)
+        except Exception as e:
+            return {"error": f"Error cotizando productos: {str(e)}"}
+
+    def get_productos_by_stock(self, stock_max: int) -> List[ProductoBasic]:
+        """Obtiene productos con stock menor o igual al especificado"""
+        try:
+            filas = CatalogoReadRepository(self.db).get_by_stock_max(stock_max)
+            return self._format_productos_basicos(filas)
 
         except Exception as e:
             return {"error": f"Error obteniendo productos por stock: {str(e)}"}
 
     def buscar_productos_avanzado(self, filtros: FiltrosProducto, pagina: int = 1, por_pagina: int = 20) -> Dict[str, Any]:
-        """Búsqueda avanzada de productos con múltiples filtros"""
+        """
+        Búsqueda avanzada de productos con múltiples filtros.
+        Sobre productos activos se resuelve con el índice de facetas en memoria, que además
+        entrega los conteos por categoría, marca, tramo de precio y de stock; con
+        `solo_activos=False` se consulta la base y no hay facetas.
+        """
         try:
-            query = self.db.query(Producto).options(
-                joinedload(Producto.categoria),
-                joinedload(Producto.marca),
-                joinedload(Producto.precios)
-            )
+            if filtros.solo_activos:
+                resultado = buscar_facetado(filtros, offset=(pagina - 1) * por_pagina, limite=por_pagina)
+                return {
+                    "productos": self._format_productos_basicos(resultado["filas"]),
+                    "total": resultado["total"],
+                    "pagina": pagina,
+                    "total_paginas": math.ceil(resultado["total"] / por_pagina),
+                    "productos_por_pagina": por_pagina,
+                    "facetas": resultado["facetas"]
+                }
+
+            repo = CatalogoReadRepository(self.db)
 
             # Construir filtros dinámicamente
             conditions = []
@@ -183,10 +258,6 @@ class ProductoService:
             if filtros.stock_bajo:
                 conditions.append(Producto.stock <= Producto.stock_minimo)
 
-            # Aplicar filtros
-            if conditions:
-                query = query.filter(and_(*conditions))
-
             # Filtros de precio (requieren subconsulta)
             if filtros.precio_min or filtros.precio_max:
                 subquery = self.db.query(
@@ -208,27 +279,59 @@ class ProductoService:
                     precio_query = precio_query.filter(PrecioHistorico.valor <= filtros.precio_max)
 
                 productos_con_precio_filtrado = [p.producto_id for p in precio_query.all()]
-                query = query.filter(Producto.id.in_(productos_con_precio_filtrado))
+                conditions.append(Producto.id.in_(productos_con_precio_filtrado))
 
             # Ordenar por relevancia
-            query = query.order_by(desc(Producto.destacado), desc(Producto.en_promocion), Producto.nombre)
+            stmt = repo.select_basico().where(*conditions).order_by(
+                desc(Producto.destacado), desc(Producto.en_promocion), Producto.nombre
+            )
 
             # Paginación
-            total = query.count()
+            total = repo.count(*conditions)
             total_paginas = math.ceil(total / por_pagina)
-            productos = query.offset((pagina - 1) * por_pagina).limit(por_pagina).all()
+            filas = repo.fetch(stmt.offset((pagina - 1) * por_pagina).limit(por_pagina))
 
             return {
-                "productos": self._format_productos_basicos(productos),
+                "productos": self._format_productos_basicos(filas),
                 "total": total,
                 "pagina": pagina,
                 "total_paginas": total_paginas,
-                "productos_por_pagina": por_pagina
+                "productos_por_pagina": por_pagina,
+                "facetas": None
             }
 
         except Exception as e:
             return {"error": f"Error en búsqueda avanzada: {str(e)}"}
 
+    def get_productos_en_promocion(self, limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Productos activos cuyo último cambio de precio de los últimos 15 días fue una rebaja,
+        de mayor a menor descuento, con el precio anterior y el porcentaje de descuento
+        """
+        try:
+            return productos_en_promocion(self.db, limite)
+        except Exception as e:
+            return {"error": f"Error obteniendo promociones: {str(e)}"}
+
+    def get_productos_lanzamiento(self, dias: int = 30, limite: int = MAX_LANZAMIENTOS) -> List[ProductoBasic]:
+        """Productos activos creados en los últimos `dias` días, del más reciente al más antiguo"""
+        try:
+            lanzamientos = CatalogoReadRepository(self.db).get_lanzamientos(datetime.utcnow() - timedelta(days=dias), limite)
+            return self._format_productos_basicos([fila for _, fila in lanzamientos])
+
+        except Exception as e:
+            return {"error": f"Error obteniendo lanzamientos: {str(e)}"}
+
+    def get_productos_destacados(self) -> Dict[str, Any]:
+        """Las mayores rebajas recientes y los últimos lanzamientos (30 días)"""
+        promociones = self.get_productos_en_promocion(MAX_DESTACADOS)
+        if isinstance(promociones, dict):
+            return promociones
+        lanzamientos = self.get_productos_lanzamiento(30, MAX_DESTACADOS)
+        if isinstance(lanzamientos, dict):
+            return lanzamientos
+        return {"promociones": promociones, "lanzamientos": lanzamientos}
+
     def get_historial_precios(self, codigo: str, fecha_desde: Optional[str] = None) -> Dict[str, Any]:
         """Obtiene el historial de precios de un producto"""
         try:
@@ -247,13 +350,7 @@ class ProductoService:
 
             precios = query.order_by(desc(PrecioHistorico.fecha)).all()
 
-            if not precios:
-                return {
-                    "producto_codigo": codigo,
-                    "producto_nombre": producto.nombre,
-                    "precios": [],
-                    "precio_actual": None
-                }   
+            # Misma forma que HistorialPreciosResponse
             precio_actual = precios[0].valor if precios else None
             historial = [
                 {
@@ -262,13 +359,183 @@ class ProductoService:
                     "usuario_id": p.usuario_id,
                     "motivo": p.motivo
                 } for p in precios
-            ]       
+            ]
             return {
-                "producto_codigo": codigo,
-                "producto_nombre": producto.nombre,
+                "producto": {"codigo": codigo, "nombre": producto.nombre},
                 "precio_actual": float(precio_actual) if precio_actual else None,
-                "precios": historial
+                "historial": historial
             }
         except Exception as e:
-            return {"error": f"Error obteniendo historial de precios: {str(e)}"}        
-        
\ No newline at end of file
+            return {"error": f"Error obteniendo historial de precios: {str(e)}"}
+
+    def get_stock_al(self, codigo: str, fecha: Optional[str] = None, dias_venta: int = 30) -> Dict[str, Any]:
+        """
+        Stock de un producto a una fecha (último corte más los movimientos posteriores) y
+        su velocidad de venta en los `dias_venta` días previos
+        """
+        try:
+            producto = self.db.query(Producto.id).filter(Producto.codigo == codigo).first()
+            if not producto:
+                return {"error": f"Producto con código '{codigo}' no encontrado"}
+
+            momento = datetime.utcnow()
+            if fecha:
+                try:
+                    momento = datetime.fromisoformat(fecha.replace('Z', '+00:00')).replace(tzinfo=None)
+                except ValueError:
+                    return {"error": "Formato de fecha inválido. Use formato ISO (YYYY-MM-DD)"}
+                if len(fecha) == 10:
+                    momento += timedelta(days=1)  # Una fecha sin hora es el cierre de ese día
+
+            repo = InventarioRepository(self.db)
+            vendidas = repo.ventas(producto.id, momento - timedelta(days=dias_venta), momento)
+            return {
+                "codigo": codigo,
+                "fecha": momento.isoformat(),
+                "stock": repo.stock_producto_al(producto.id, momento),
+                "ventas": vendidas,
+                "dias_venta": dias_venta,
+                "velocidad_diaria": round(vendidas / dias_venta, 2)
+            }
+        except Exception as e:
+            return {"error": f"Error obteniendo stock: {str(e)}"}
+
+    def create_producto(self, producto_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Crea un producto con su precio inicial"""
+        try:
+            existente = self.db.query(Producto.id).filter(Producto.codigo == producto_data["codigo"]).first()
+            if existente:
+                return {"error": f"Ya existe un producto con código '{producto_data['codigo']}'"}
+
+            datos = dict(producto_data)
+            datos["precio"] = datos.pop("precio_actual")
+            producto = ProductoRepository(self.db).create(datos)
+            self.db.commit()
+            self.invalidar_cache_catalogo()
+
+            return self.get_producto_by_codigo(producto.codigo)
+
+        except Exception as e:
+            self.db.rollback()
+            return {"error": f"Error creando producto: {str(e)}"}
+
+    def update_producto(self, codigo: str, producto_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Actualiza un producto; un nuevo precio queda registrado en el historial"""
+        try:
+            datos = dict(producto_data)
+            if "precio_actual" in datos:
+                datos["precio"] = datos.pop("precio_actual")
+
+            producto = ProductoRepository(self.db).update(codigo, datos)
+            if not producto:
+                return {"error": f"Producto con código '{codigo}' no encontrado"}
+            self.db.commit()
+            self.invalidar_cache_catalogo()
+
+            return self.get_producto_by_codigo(codigo)
+
+        except Exception as e:
+            self.db.rollback()
+            return {"error": f"Error actualizando producto: {str(e)}"}
+
+    def delete_producto(self, codigo: str) -> Dict[str, Any]:
+        """Elimina lógicamente un producto"""
+        try:
+            if not ProductoRepository(self.db).delete(codigo):
+                return {"error": f"Producto con código '{codigo}' no encontrado"}
+            self.db.commit()
+            self.invalidar_cache_catalogo()
+
+            return {"mensaje": f"Producto '{codigo}' eliminado correctamente", "codigo": codigo}
+
+        except Exception as e:
+            self.db.rollback()
+            return {"error": f"Error eliminando producto: {str(e)}"}
+
+    def get_marcas(self, por_categoria: bool = False) -> List[Dict[str, Any]]:
+        """
+        Lista las marcas activas con su total de productos activos.
+        Los conteos salen de un único GROUP BY (sin cargar los productos de cada marca)
+        y el resultado queda en caché hasta la próxima escritura del catálogo.
+        """
+        return cache.get_or_set(
+            "marcas", f"facetas={int(por_categoria)}",
+            lambda: self._calcular_marcas(por_categoria),
+            ttl=settings.CACHE_TTL_CATALOGO
+        )
+
+    def _calcular_marcas(self, por_categoria: bool) -> List[Dict[str, Any]]:
+        conteos = self.db.query(
+            Producto.marca_id.label("marca_id"),
+            func.count(Producto.id).label("total")
+        ).filter(
+            Producto.activo == True
+        ).group_by(Producto.marca_id).subquery()
+
+        filas = self.db.query(
+            Marca.id, Marca.nombre, Marca.codigo, func.coalesce(conteos.c.total, 0)
+        ).outerjoin(
+            conteos, conteos.c.marca_id == Marca.id
+        ).filter(
+            Marca.activo == True
+        ).order_by(Marca.nombre).all()
+
+        marcas = [
+            {
+                "id": marca_id,
+                "nombre": nombre,
+                "codigo": codigo,
+                "total_productos": int(total)
+            } for marca_id, nombre, codigo, total in filas
+        ]
+
+        if por_categoria:
+            facetas = self._conteo_marcas_por_categoria()
+            for marca in marcas:
+                marca["categorias"] = facetas.get(marca["id"], [])
+
+        return marcas
+
+    def _conteo_marcas_por_categoria(self) -> Dict[int, List[Dict[str, Any]]]:
+        """Conteo de productos activos por (marca, categoría) en un solo GROUP BY"""
+        filas = self.db.query(
+            Producto.marca_id, Producto.categoria_id, Categoria.nombre, func.count(Producto.id)
+        ).outerjoin(
+            Categoria, Categoria.id == Producto.categoria_id
+        ).filter(
+            and_(
+                Producto.activo == True,
+                Producto.marca_id.isnot(None)
+            )
+        ).group_by(
+            Producto.marca_id, Producto.categoria_id, Categoria.nombre
+        ).order_by(Producto.marca_id, desc(func.count(Producto.id))).all()
+
+        facetas: Dict[int, List[Dict[str, Any]]] = {}
+        for marca_id, categoria_id, categoria_nombre, total in filas:
+            facetas.setdefault(marca_id, []).append({
+                "categoria_id": categoria_id,
+                "categoria": categoria_nombre,
+                "total_productos": int(total)
+            })
+        return facetas
+
+    def _format_productos_basicos(self, filas: List[ProductoFila]) -> List[ProductoBasic]:
+        """Convierte filas de lectura a ProductoBasic sin re-validar (datos tipados desde la BD)"""
+        return [ProductoBasic.model_construct(**fila._asdict()) for fila in filas]
+
+    def _get_subcategorias_recursivo(self, categoria_id: int) -> List[int]:
+        """IDs de todas las subcategorías de una categoría"""
+        return CatalogoReadRepository(self.db).get_subcategoria_ids(categoria_id)
+
+    def invalidar_cache_catalogo(self) -> None:
+        """
+        Aplica en este worker, sin esperar al seguidor, los cambios recién confirmados
+        (índices en memoria y listados cacheados). El resto de los workers los toma del
+        registro de cambios.
+        """
+        seguidor_cambios.procesar(self.db)
+
+
+# Los listados de marcas dependen de los productos (conteos), las marcas y las categorías
+seguidor_cambios.suscribir_namespace("marcas", [PRODUCTO, MARCA, CATEGORIA])
@@ -0,0 +1,112 @@
+"""
+Promociones detectadas desde el historial de precios.
+
+Un producto está en promoción si su último cambio de precio, dentro de los últimos
+DIAS_PROMOCION días, lo dejó bajo el precio anterior. Los últimos cambios de todos los
+productos salen de una sola consulta agrupada sobre `precios_historicos`; el descuento
+se calcula para todos a la vez (con NumPy si está instalado) y el resultado queda en
+caché hasta la próxima escritura de precios; al leerlo se descartan las rebajas que ya
+salieron de la ventana, así que una promoción no se muestra vencida mientras dure la caché.
+
+No es lo mismo que la marca `Producto.en_promocion`, que se asigna a mano al crear o editar
+el producto y es la que usan el filtro `solo_promociones`, la faceta `en_promocion` y el
+orden de la búsqueda.
+"""
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.core.cache import cache
+from app.core.vectorizado import numpy_para
+from app.data.repositories.cambio_repository import PRECIO
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository
+from app.services.cambios import seguidor_cambios
+
+DIAS_PROMOCION = 15
+
+
+class Rebaja(NamedTuple):
+    codigo: str
+    precio_anterior: float
+    descuento: float  # Porcentaje bajo el precio anterior, con un decimal
+    fecha: datetime
+
+
+def calcular_rebajas(cambios: Sequence[tuple]) -> List[Rebaja]:
+    """
+    Rebajas a partir de filas (codigo, fecha, valor, valor_anterior), de mayor a menor
+    descuento. Se descartan las alzas, los precios sin cambio y los productos sin precio previo.
+    """
+    np = numpy_para(len(cambios))
+    if np is not None:
+        n = len(cambios)
+        valores = np.fromiter((c[2] for c in cambios), np.float64, n)
+        anteriores = np.fromiter((np.nan if c[3] is None else c[3] for c in cambios), np.float64, n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            descuentos = (anteriores - valores) / anteriores * 100
+        indices = np.flatnonzero((valores > 0) & (valores < anteriores))
+        orden = indices[np.argsort(-descuentos[indices], kind="stable")]
+        return [
+            Rebaja(cambios[i][0], anterior, descuento, cambios[i][1])
+            for i, anterior, descuento in zip(
+                orden.tolist(), anteriores[orden].tolist(), np.round(descuentos[orden], 1).tolist()
+            )
+        ]
+
+    rebajas = sorted(
+        ((codigo, float(anterior), (float(anterior) - float(valor)) / float(anterior) * 100, fecha)
+         for codigo, fecha, valor, anterior in cambios
+         if anterior is not None and 0 < valor < anterior),
+        key=lambda r: -r[2]
+    )
+    return [Rebaja(codigo, anterior, round(descuento, 1), fecha) for codigo, anterior, descuento, fecha in rebajas]
+
+
+def rebajas_vigentes(db: Session, dias: int = DIAS_PROMOCION) -> List[Rebaja]:
+    """
+    Rebajas de los últimos `dias` días, de mayor a menor descuento. El cálculo queda en caché
+    hasta el próximo cambio de precio; las que vencieron desde entonces se filtran al leer
+    (si el último cambio de un producto sale de la ventana, el producto deja de estar en promoción).
+    """
+    def calcular() -> List[Rebaja]:
+        desde = datetime.utcnow() - timedelta(days=dias)
+        return calcular_rebajas(CatalogoReadRepository(db).get_ultimos_cambios_precio(desde))
+
+    rebajas = cache.get_or_set("promociones", f"dias={dias}", calcular, ttl=settings.CACHE_TTL_CATALOGO)
+    desde = datetime.utcnow() - timedelta(days=dias)
+    return [rebaja for rebaja in rebajas if rebaja.fecha >= desde]
+
+
+def productos_en_promocion(db: Session, limite: Optional[int] = None) -> List[dict]:
+    """
+    Productos activos en promoción con su precio anterior y descuento. Los datos del
+    producto (stock, precio vigente) se leen con un IN sobre los códigos cacheados; con
+    `limite` solo los de las primeras rebajas (algunas pueden ser de productos inactivos).
+    """
+    rebajas = rebajas_vigentes(db)
+    repo = CatalogoReadRepository(db)
+    tramo = limite * 2 if limite else len(rebajas)
+    productos, vistos = [], set()
+    for inicio in range(0, len(rebajas), tramo or 1):
+        lote = rebajas[inicio:inicio + tramo]
+        filas = repo.get_by_codigos(r.codigo for r in lote)
+        for rebaja in lote:
+            fila = filas.get(rebaja.codigo)
+            if fila is None or rebaja.codigo in vistos:
+                continue
+            vistos.add(rebaja.codigo)
+            productos.append({
+                **fila._asdict(),
+                "precio_anterior": rebaja.precio_anterior,
+                "descuento": rebaja.descuento,
+                "fecha_cambio": rebaja.fecha,
+            })
+            if limite is not None and len(productos) >= limite:
+                return productos
+    return productos
+
+
+# El análisis solo depende del historial de precios; los datos de cada producto se leen aparte
+seguidor_cambios.suscribir_namespace("promociones", [PRECIO])
@@ -0,0 +1,194 @@
+"""
+Sincronización de listas de precios de proveedores.
+
+    python -m app.services.proveedores sincronizar --proveedor PRV-01 lista.csv [--delimitador ";"]
+
+El archivo (CSV con encabezado) se lee en streaming por lotes. La columna `codigo` es
+obligatoria y corresponde al código del producto; `precio` y las columnas de
+CAMPOS_PRODUCTO son opcionales (una celda vacía deja el valor actual). Cada fila se
+reduce a una huella (hash de su contenido normalizado) que se compara con la guardada en
+`productos_proveedores`: las filas iguales no generan lecturas de productos ni escrituras,
+así que el costo de una sincronización es proporcional a lo que cambió.
+"""
+import csv
+import hashlib
+import logging
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from sqlalchemy.orm import Session
+
+from app.data.database import SessionLocal
+from app.data.repositories.inventario_repository import AJUSTE
+from app.data.repositories.proveedor_repository import CAMPOS_PRODUCTO, ProveedorRepository
+from app.services.cambios import seguidor_cambios
+
+logger = logging.getLogger(__name__)
+
+LOTE = 1000  # Filas por lote: un IN de huellas y, si algo cambió, un commit
+DOS_DECIMALES = Decimal("0.01")
+TRES_DECIMALES = Decimal("0.001")
+
+_CONVERSIONES = {
+    "precio": lambda v: Decimal(v.replace(",", ".")).quantize(DOS_DECIMALES),
+    "stock": int,
+    "peso": lambda v: Decimal(v.replace(",", ".")).quantize(TRES_DECIMALES),
+}
+_COLUMNAS = CAMPOS_PRODUCTO + ("precio",)
+
+
+class FilaProveedor:
+    __slots__ = ("codigo", "valores", "huella")
+
+    def __init__(self, codigo: str, valores: Dict[str, Any]):
+        self.codigo = codigo
+        self.valores = valores
+        contenido = "\x1f".join(f"{campo}={valores[campo]}" for campo in _COLUMNAS if campo in valores)
+        self.huella = hashlib.blake2b(contenido.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _leer_fila(registro: Dict[str, str]) -> FilaProveedor:
+    """Normaliza una fila del archivo; lanza ValueError si el código falta o un número no es válido."""
+    codigo = (registro.get("codigo") or "").strip()
+    if not codigo:
+        raise ValueError("fila sin código")
+    valores = {}
+    for campo in _COLUMNAS:
+        texto = (registro.get(campo) or "").strip()
+        if texto:
+            try:
+                valores[campo] = _CONVERSIONES.get(campo, str)(texto)
+            except (InvalidOperation, ValueError):
+                raise ValueError(f"{campo} inválido: {texto!r}")
+    return FilaProveedor(codigo, valores)
+
+
+def leer_lista(archivo: TextIO, delimitador: str = ",") -> Iterator[Union[FilaProveedor, ValueError]]:
+    """Filas normalizadas del archivo en orden; las inválidas se entregan como el error."""
+    for registro in csv.DictReader(archivo, delimiter=delimitador):
+        try:
+            yield _leer_fila({(k or "").strip().lower(): v for k, v in registro.items()})
+        except ValueError as e:
+            yield e
+
+
+def _diferencias(fila: FilaProveedor, actual: Dict[str, Any]) -> Tuple[Optional[Decimal], Optional[Dict[str, Any]]]:
+    """(nuevo precio o None, fila para el UPDATE del producto o None) según lo que cambió."""
+    precio = fila.valores.get("precio")
+    if precio is not None and actual["precio"] is not None and Decimal(actual["precio"]) == precio:
+        precio = None
+
+    cambios = {
+        campo: valor for campo, valor in fila.valores.items()
+        if campo in CAMPOS_PRODUCTO and valor != (Decimal(actual[campo]) if campo == "peso" and actual[campo] is not None else actual[campo])
+    }
+    if not cambios:
+        return precio, None
+    # El UPDATE en bloque lleva todas las columnas: las que no cambian repiten su valor actual
+    return precio, {"codigo": actual["codigo"], "b_id": actual["id"],
+                    **{campo: actual[campo] for campo in CAMPOS_PRODUCTO}, **cambios}
+
+
+def _sincronizar_lote(repo: ProveedorRepository, proveedor_id: int, filas: List[FilaProveedor],
+                      motivo: str, resultado: Dict[str, int]) -> List[str]:
+    """Procesa un lote y devuelve los códigos de productos modificados."""
+    por_codigo = {fila.codigo: fila for fila in filas}  # Si un código se repite, gana la última fila
+    guardadas = repo.get_huellas(proveedor_id, por_codigo)
+    pendientes = [fila for codigo, fila in por_codigo.items() if guardadas.get(codigo) != fila.huella]
+    resultado["sin_cambios"] += len(por_codigo) - len(pendientes)
+    if not pendientes:
+        return []
+
+    actuales = repo.get_estado_productos(fila.codigo for fila in pendientes)
+    precios, productos, movimientos, huellas, modificados = [], [], [], [], []
+    for fila in pendientes:
+        actual = actuales.get(fila.codigo)
+        if actual is None:
+            resultado["desconocidos"] += 1
+            continue
+        precio, producto = _diferencias(fila, actual)
+        if precio is not None:
+            precios.append({"codigo": fila.codigo, "producto_id": actual["id"], "valor": precio})
+        if producto is not None:
+            productos.append(producto)
+            if producto["stock"] != actual["stock"]:
+                movimientos.append({"producto_id": actual["id"], "tipo": AJUSTE, "cantidad": producto["stock"] - actual["stock"]})
+        if precio is not None or producto is not None:
+            modificados.append(fila.codigo)
+        huellas.append({"codigo": fila.codigo, "producto_id": actual["id"], "huella": fila.huella})
+
+    repo.guardar_cambios(proveedor_id, precios, productos, huellas, guardadas, motivo, movimientos)
+    resultado["precios"] += len(precios)
+    resultado["productos"] += len(productos)
+    resultado["huellas"] += len(huellas)
+    return modificados
+
+
+def sincronizar_lista(proveedor_codigo: str, archivo: Union[str, TextIO], delimitador: str = ",",
+                      lote: int = LOTE, db: Optional[Session] = None) -> Dict[str, Any]:
+    """
+    Aplica la lista de precios de un proveedor. Solo escribe, en bloque y con un commit
+    por lote, los precios, stocks y atributos que cambiaron respecto de la última lista.
+    """
+    propia = db is None
+    db = db or SessionLocal()
+    try:
+        repo = ProveedorRepository(db)
+        proveedor = repo.get_by_codigo(proveedor_codigo)
+        if not proveedor:
+            return {"error": f"Proveedor '{proveedor_codigo}' no encontrado"}
+        proveedor_id = proveedor.id
+        motivo = f"Lista de precios proveedor {proveedor_codigo}"
+
+        manejador = open(archivo, newline="", encoding="utf-8-sig") if isinstance(archivo, str) else archivo
+        resultado = {"filas": 0, "invalidas": 0, "sin_cambios": 0, "desconocidos": 0,
+                     "precios": 0, "productos": 0, "huellas": 0}
+        modificados: List[str] = []
+        try:
+            filas = leer_lista(manejador, delimitador)
+            while True:
+                bloque = list(islice(filas, lote))
+                if not bloque:
+                    break
+                validas = [fila for fila in bloque if isinstance(fila, FilaProveedor)]
+                resultado["filas"] += len(bloque)
+                resultado["invalidas"] += len(bloque) - len(validas)
+                for error in bloque:
+                    if isinstance(error, ValueError) and resultado["invalidas"] <= 10:
+                        logger.warning(f"Lista {proveedor_codigo}: fila descartada ({error})")
+                if validas:
+                    modificados.extend(_sincronizar_lote(repo, proveedor_id, validas, motivo, resultado))
+                    db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            if manejador is not archivo:
+                manejador.close()
+
+        if modificados:
+            # Lo mismo que ProductoService.invalidar_cache_catalogo, sin importar el servicio:
+            # app.services.productos carga los routers de app.api y desde un script queda un ciclo
+            seguidor_cambios.procesar(db)
+        logger.info(f"Lista de precios {proveedor_codigo} sincronizada: {resultado}")
+        return resultado
+    finally:
+        if propia:
+            db.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.services.proveedores")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_sync = sub.add_parser("sincronizar", help="Aplica la lista de precios (CSV) de un proveedor")
+    p_sync.add_argument("archivo")
+    p_sync.add_argument("--proveedor", required=True, help="Código del proveedor")
+    p_sync.add_argument("--delimitador", default=",")
+    p_sync.add_argument("--lote", type=int, default=LOTE)
+    args = parser.parse_args()
+
+    print(sincronizar_lista(args.proveedor, args.archivo, args.delimitador, args.lote))
@@ -0,0 +1,183 @@
+"""
+Resúmenes de pagos por día y por hora para el dashboard de empleados.
+
+    python -m app.services.resumen_pagos actualizar
+    python -m app.services.resumen_pagos reconstruir
+    python -m app.services.resumen_pagos verificar
+
+Un hilo de fondo recalcula cada RESUMEN_PAGOS_INTERVALO_SEG las horas de los pagos que
+cambiaron desde la marca de agua; el reporte lee solo las tablas de resumen. Con varios
+workers, en cada intervalo actualiza solo el que toma el turno en `resumenes_avance`. `reconstruir`
+los recalcula desde cero y `verificar` los compara con el agregado de `pagos` sin escribir.
+"""
+import logging
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.data.database import SessionLocal
+from app.data.repositories.resumen_pagos_repository import ResumenPagosRepository, TURNO
+
+logger = logging.getLogger(__name__)
+
+MAX_DIAS_POR_HORA = 31  # Rango máximo del reporte por hora
+MAX_DIAS = 3660  # Rango máximo del reporte diario
+
+
+def _hasta() -> datetime:
+    # Un pago modificado se confirma poco después de su fecha_actualizacion: lo más
+    # reciente se deja para la siguiente pasada, que lo toma desde la marca de agua
+    return datetime.utcnow() - timedelta(seconds=settings.RESUMEN_PAGOS_MARGEN_SEG)
+
+
+def _ejecutar(operacion: str) -> int:
+    db = SessionLocal()
+    try:
+        repo = ResumenPagosRepository(db)
+        resultado = repo.reconstruir(_hasta()) if operacion == "reconstruir" else repo.actualizar(_hasta())
+        db.commit()
+        return resultado
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def actualizar() -> int:
+    """Recalcula las horas con pagos modificados desde la marca de agua. Devuelve cuántas."""
+    return _ejecutar("actualizar")
+
+
+def tomar_turno(duracion_seg: float, nombre: str = TURNO) -> bool:
+    """
+    Reserva el turno `nombre` (por defecto, el de la actualización de resúmenes) para este
+    worker por `duracion_seg` (False si otro lo tiene).
+    """
+    db = SessionLocal()
+    try:
+        return ResumenPagosRepository(db).tomar_turno(datetime.utcnow(), timedelta(seconds=duracion_seg), nombre)
+    finally:
+        db.close()
+
+
+def reconstruir() -> int:
+    """Recalcula los resúmenes desde cero. Devuelve las filas por hora escritas."""
+    return _ejecutar("reconstruir")
+
+
+def verificar() -> list:
+    db = SessionLocal()
+    try:
+        return ResumenPagosRepository(db).diferencias()
+    finally:
+        db.close()
+
+
+def consultar(db: Session, desde: date, hasta: date, granularidad: str = "dia",
+              estado: Optional[str] = None, metodo_pago: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Cantidad y monto de los pagos entre ambas fechas (UTC, inclusive) por periodo, estado y
+    método de pago, con totales por estado y por método. `actualizado_hasta` es la marca de
+    agua: los cambios posteriores aún no se reflejan.
+    """
+    if granularidad not in ("dia", "hora"):
+        return {"error": "La granularidad debe ser 'dia' u 'hora'"}
+    if hasta < desde:
+        return {"error": "La fecha 'hasta' es anterior a 'desde'"}
+    maximo = MAX_DIAS_POR_HORA if granularidad == "hora" else MAX_DIAS
+    if (hasta - desde).days >= maximo:
+        return {"error": f"El rango no puede superar {maximo} días con granularidad '{granularidad}'"}
+
+    repo = ResumenPagosRepository(db)
+    por_hora = granularidad == "hora"
+    filas = repo.consultar(desde, hasta, por_hora, estado, metodo_pago)
+
+    periodos = []
+    por_estado: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"cantidad": 0, "monto": Decimal(0)})
+    por_metodo: Dict[str, Dict[str, Any]] = defaultdict(lambda: {"cantidad": 0, "monto": Decimal(0)})
+    for fila in filas:
+        periodo = datetime.combine(fila.fecha, datetime.min.time()) + timedelta(hours=fila.hora) if por_hora else fila.fecha
+        periodos.append({
+            "periodo": periodo,
+            "estado": fila.estado,
+            "metodo_pago": fila.metodo_pago or None,
+            "cantidad": fila.cantidad,
+            "monto": fila.monto,
+        })
+        for totales, clave in ((por_estado, fila.estado), (por_metodo, fila.metodo_pago)):
+            totales[clave]["cantidad"] += fila.cantidad
+            totales[clave]["monto"] += fila.monto
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "granularidad": granularidad,
+        "actualizado_hasta": repo.avance(),
+        "filas": periodos,
+        "por_estado": [{"estado": k, **v} for k, v in sorted(por_estado.items())],
+        "por_metodo": [{"metodo_pago": k or None, **v} for k, v in sorted(por_metodo.items())],
+    }
+
+
+class ActualizadorResumenPagos:
+    """
+    Hilo de fondo que lleva los resúmenes de pagos hasta la marca de agua cada `intervalo_seg`.
+    Cada worker tiene uno, pero en cada intervalo solo actualiza el que toma el turno.
+    """
+
+    def __init__(self, intervalo_seg: float):
+        self.intervalo = intervalo_seg
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def ciclo():
+            while not self._detener.is_set():
+                try:
+                    if tomar_turno(self.intervalo):
+                        horas = actualizar()
+                        if horas:
+                            logger.debug(f"Resumen de pagos: {horas} horas recalculadas")
+                except Exception as e:
+                    logger.warning(f"No se pudo actualizar el resumen de pagos: {e}")
+                self._detener.wait(self.intervalo)
+
+        self._hilo = threading.Thread(target=ciclo, name="resumen-pagos", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+actualizador_resumen_pagos = ActualizadorResumenPagos(settings.RESUMEN_PAGOS_INTERVALO_SEG)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.services.resumen_pagos")
+    parser.add_argument("comando", choices=["actualizar", "reconstruir", "verificar"])
+    args = parser.parse_args()
+
+    if args.comando == "actualizar":
+        print(f"{actualizar()} horas recalculadas")
+    elif args.comando == "reconstruir":
+        print(f"{reconstruir()} filas por hora escritas")
+    else:
+        diferencias = verificar()
+        for d in diferencias[:50]:
+            print(f"{d['resumen']:<5} {d['clave']}: esperado {d['esperado']}, guardado {d['guardado']}")
+        print(f"{len(diferencias)} diferencias")
+        sys.exit(1 if diferencias else 0)
@@ -0,0 +1,120 @@
+"""
+Sincronización incremental del catálogo para terminales POS y clientes móviles.
+
+Un dispositivo nuevo descarga la foto completa (`snapshot`, JSON con gzip) y guarda su
+token; desde ahí pide `cambios_desde(token)` y recibe solo los productos creados,
+modificados, con nuevo precio o eliminados, en el orden del registro de cambios
+(paginado por su PK). Cada respuesta trae el token desde el que seguir.
+"""
+import base64
+import gzip
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from config import settings
+from app.core.cache import cache
+from app.core.http import serializar_json
+from app.data.models import Producto
+from app.data.repositories.cambio_repository import (
+    CambioRegistrado, CambioRepository, PRODUCTO, PRECIO, CATEGORIA, MARCA, CREAR
+)
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository
+
+LIMITE_MAXIMO = 5000  # Cambios leídos por página
+
+
+def generar_token(secuencia: int) -> str:
+    return base64.urlsafe_b64encode(f"v1:{secuencia}".encode()).decode().rstrip("=")
+
+
+def leer_token(token: str) -> Optional[int]:
+    """Secuencia del token, o None si no es un token válido."""
+    try:
+        version, secuencia = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode().split(":")
+        return int(secuencia) if version == "v1" and int(secuencia) >= 0 else None
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _entregables(cambios: List[CambioRegistrado], desde: int, ahora: datetime) -> List[CambioRegistrado]:
+    """
+    Cambios que se pueden entregar sin saltarse ninguno. Un número faltante en la secuencia
+    puede ser una transacción que todavía no confirma: si el cambio que lo sigue es reciente
+    se corta ahí y el cliente lo vuelve a pedir; pasado el margen se asume un rollback.
+    """
+    margen = timedelta(seconds=settings.SINCRONIZACION_MARGEN_SEG)
+    anterior = desde
+    for i, cambio in enumerate(cambios):
+        if cambio.secuencia != anterior + 1 and ahora - cambio.fecha < margen:
+            return cambios[:i]
+        anterior = cambio.secuencia
+    return cambios
+
+
+def cambios_desde(db: Session, token: str, limite: int = 500) -> Dict[str, Any]:
+    """
+    Productos que cambiaron después del token, con su estado actual. Los inactivos o
+    inexistentes se informan en `eliminados`. Un cambio de categoría o marca (renombrarla
+    registra `ACTUALIZAR` con su id) reenvía todos sus productos activos, que llevan el
+    nombre. Si `hay_mas` es True conviene pedir de inmediato la siguiente página con el
+    token devuelto.
+    """
+    desde = leer_token(token)
+    if desde is None:
+        return {"error": "Token de sincronización inválido"}
+
+    repo = CambioRepository(db)
+    primera = repo.primera_secuencia()
+    if primera is not None and desde < primera - 1:
+        return {"error": "El token de sincronización expiró: descarga el catálogo completo", "expirado": True}
+
+    limite = min(limite, LIMITE_MAXIMO)
+    leidos = repo.siguientes(desde, limite)
+    cambios = _entregables(leidos, desde, datetime.utcnow())
+
+    codigos = list(dict.fromkeys(c.clave for c in cambios if c.entidad in (PRODUCTO, PRECIO)))
+    # Una categoría o marca nueva todavía no tiene productos sincronizados que actualizar
+    categorias = [int(c.clave) for c in cambios if c.entidad == CATEGORIA and c.operacion != CREAR]
+    marcas = [int(c.clave) for c in cambios if c.entidad == MARCA and c.operacion != CREAR]
+    if categorias or marcas:
+        codigos = list(dict.fromkeys(
+            codigos + CatalogoReadRepository(db).get_codigos_por_categoria_marca(categorias, marcas)
+        ))
+    vigentes = CatalogoReadRepository(db).get_by_codigos(codigos) if codigos else {}
+    return {
+        "token": generar_token(cambios[-1].secuencia if cambios else desde),
+        "hay_mas": len(cambios) == limite,
+        "productos": [vigentes[codigo]._asdict() for codigo in codigos if codigo in vigentes],
+        "eliminados": [codigo for codigo in codigos if codigo not in vigentes],
+    }
+
+
+def snapshot(db: Session) -> bytes:
+    """
+    Catálogo activo completo en JSON comprimido con gzip, con el token desde el que pedir
+    cambios. Se cachea hasta el siguiente cambio registrado, así que los dispositivos que
+    se inicializan juntos comparten la misma foto.
+    """
+    repo = CambioRepository(db)
+    return cache.get_or_set(
+        "snapshot", str(repo.ultima_secuencia()),
+        lambda: _generar_snapshot(db),
+        ttl=settings.CACHE_TTL_CATALOGO
+    )
+
+
+def _generar_snapshot(db: Session) -> bytes:
+    ahora = datetime.utcnow()
+    # El token se toma antes de leer los productos y sin los cambios recientes (que pueden
+    # tener huecos aún sin confirmar): lo posterior se vuelve a enviar como delta.
+    secuencia = CambioRepository(db).ultima_secuencia(antes_de=ahora - timedelta(seconds=settings.SINCRONIZACION_MARGEN_SEG))
+    catalogo = CatalogoReadRepository(db)
+    filas = catalogo.fetch(catalogo.select_basico().where(Producto.activo == True).order_by(Producto.codigo))
+    return gzip.compress(serializar_json({
+        "token": generar_token(secuencia),
+        "generado": ahora.isoformat(),
+        "total": len(filas),
+        "productos": [fila._asdict() for fila in filas],
+    }), compresslevel=6)
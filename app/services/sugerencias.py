@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.data.database import sesion_lectura
+from app.data.repositories.cambio_repository import CambioRegistrado, PRODUCTO
+from app.data.repositories.catalogo_read_repository import CatalogoReadRepository
+from app.services.cambios import seguidor_cambios
+
+logger = logging.getLogger(__name__)
+
+# Clases de coincidencia en orden de prioridad: código exacto, prefijo de código,
+# inicio del nombre, inicio de otra palabra del nombre, marca
+CODIGO_EXACTO, CODIGO, NOMBRE, PALABRA, MARCA = range(5)
+TIPOS = {CODIGO_EXACTO: "codigo", CODIGO: "codigo", NOMBRE: "nombre", PALABRA: "nombre", MARCA: "marca"}
+CLASES = (CODIGO, NOMBRE, PALABRA, MARCA)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas, sin tildes y con espacios simples: 'Martíllo  Stanley' -> 'martillo stanley'."""
+    descompuesto = unicodedata.normalize("NFKD", texto or "")
+    sin_tildes = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return " ".join(sin_tildes.lower().split())
+
+
+class Sugerencia(NamedTuple):
+    codigo: str
+    nombre: str
+    marca: Optional[str]
+
+
+class IndicePrefijos:
+    """
+    Índice en memoria de códigos, nombres y marcas para autocompletar.
+
+    Hay un arreglo ordenado de pares (término normalizado, código) por clase de
+    coincidencia; con bisect se ubica el inicio del rango que empieza con el prefijo
+    y se recorren las clases en orden de prioridad hasta juntar `limite` productos,
+    así que cada consulta cuesta O(log n + limite). Cada nombre aporta un término por
+    palabra ("martillo stanley", "stanley") para encontrar coincidencias a mitad del nombre.
+
+    Las escrituras de cualquier worker llegan por el registro de cambios y se aplican
+    producto a producto (`actualizar`); la versión es la última secuencia aplicada.
+    """
+
+    def __init__(self):
+        self._arreglos: Dict[int, List[Tuple[str, str]]] = {clase: [] for clase in CLASES}
+        self._codigos: Dict[str, str] = {}  # código normalizado -> código
+        self._productos: Dict[str, Sugerencia] = {}
+        self._por_codigo: Dict[str, List[Tuple[int, Tuple[str, str]]]] = {}
+        self._version: Optional[int] = None
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _terminos_de(producto: Sugerencia) -> List[Tuple[int, Tuple[str, str]]]:
+        terminos = [(CODIGO, (normalizar(producto.codigo), producto.codigo))]
+        palabras = normalizar(producto.nombre).split()
+        for i in range(len(palabras)):
+            terminos.append((NOMBRE if i == 0 else PALABRA, (" ".join(palabras[i:]), producto.codigo)))
+        if producto.marca:
+            terminos.append((MARCA, (normalizar(producto.marca), producto.codigo)))
+        return terminos
+
+    def construir(self, filas: Iterable[tuple], version: Optional[int] = None) -> None:
+        """Reconstruye el índice desde filas (codigo, nombre, marca[, activo])."""
+        arreglos: Dict[int, List[Tuple[str, str]]] = {clase: [] for clase in CLASES}
+        codigos: Dict[str, str] = {}
+        productos: Dict[str, Sugerencia] = {}
+        por_codigo: Dict[str, List[Tuple[int, Tuple[str, str]]]] = {}
+        for fila in filas:
+            producto = Sugerencia(*fila[:3])
+            productos[producto.codigo] = producto
+            codigos[normalizar(producto.codigo)] = producto.codigo
+            por_codigo[producto.codigo] = self._terminos_de(producto)
+            for clase, termino in por_codigo[producto.codigo]:
+                arreglos[clase].append(termino)
+        for arreglo in arreglos.values():
+            arreglo.sort()
+        with self._lock:
+            self._arreglos, self._codigos, self._productos, self._por_codigo = arreglos, codigos, productos, por_codigo
+            self._version = version
+
+    def actualizar(self, filas: Iterable[tuple]) -> None:
+        """Aplica cambios de productos (codigo, nombre, marca, activo); los inactivos se quitan."""
+        with self._lock:
+            for codigo, nombre, marca, activo in filas:
+                self._quitar(codigo)
+                if activo:
+                    producto = Sugerencia(codigo, nombre, marca)
+                    self._productos[codigo] = producto
+                    self._codigos[normalizar(codigo)] = codigo
+                    self._por_codigo[codigo] = self._terminos_de(producto)
+                    for clase, termino in self._por_codigo[codigo]:
+                        insort(self._arreglos[clase], termino)
+
+    def eliminar(self, codigos: Iterable[str]) -> None:
+        with self._lock:
+            for codigo in codigos:
+                self._quitar(codigo)
+
+    def _quitar(self, codigo: str) -> None:
+        for clase, termino in self._por_codigo.pop(codigo, []):
+            arreglo = self._arreglos[clase]
+            posicion = bisect_left(arreglo, termino)
+            if posicion < len(arreglo) and arreglo[posicion] == termino:
+                del arreglo[posicion]
+        self._codigos.pop(normalizar(codigo), None)
+        self._productos.pop(codigo, None)
+
+    def buscar(self, texto: str, limite: int = 8) -> List[Dict[str, str]]:
+        """Hasta `limite` sugerencias para el prefijo, con el código exacto primero."""
+        prefijo = normalizar(texto)
+        if not prefijo:
+            return []
+
+        elegidos: Dict[str, int] = {}
+        with self._lock:
+            exacto = self._codigos.get(prefijo)
+            if exacto is not None:
+                elegidos[exacto] = CODIGO_EXACTO
+            for clase in CLASES:
+                if len(elegidos) >= limite:
+                    break
+                arreglo = self._arreglos[clase]
+                posicion = bisect_left(arreglo, (prefijo,))
+                while posicion < len(arreglo) and len(elegidos) < limite:
+                    termino, codigo = arreglo[posicion]
+                    if not termino.startswith(prefijo):
+                        break
+                    elegidos.setdefault(codigo, clase)
+                    posicion += 1
+
+            productos = self._productos
+            return [
+                {
+                    "codigo": codigo,
+                    "nombre": productos[codigo].nombre,
+                    "marca": productos[codigo].marca,
+                    "coincidencia": TIPOS[clase],
+                }
+                for codigo, clase in elegidos.items()
+            ]
+
+    @property
+    def version(self) -> Optional[int]:
+        return self._version
+
+    def marcar_version(self, version: int) -> None:
+        self._version = version
+
+    def __len__(self) -> int:
+        return len(self._productos)
+
+
+indice_sugerencias = IndicePrefijos()
+_lock_construccion = threading.Lock()
+
+
+def _indice_vigente() -> IndicePrefijos:
+    """Construye el índice en el primer uso o tras una invalidación."""
+    if indice_sugerencias.version is not None:
+        return indice_sugerencias
+    with _lock_construccion:
+        if indice_sugerencias.version is None:
+            inicio = time.perf_counter()
+            with sesion_lectura() as db:
+                filas = CatalogoReadRepository(db).get_terminos_busqueda()
+            indice_sugerencias.construir(filas, seguidor_cambios.secuencia or 0)
+            logger.info(f"Índice de sugerencias construido: {len(indice_sugerencias)} productos "
+                        f"en {(time.perf_counter() - inicio) * 1000:.0f}ms")
+    return indice_sugerencias
+
+
+def sugerir(texto: str, limite: int = 8) -> List[Dict[str, str]]:
+    return _indice_vigente().buscar(texto, limite)
+
+
+def aplicar_cambios(db, cambios: List[CambioRegistrado]) -> None:
+    """Suscriptor del registro de cambios: actualiza el índice con el estado actual de esos productos."""
+    with _lock_construccion:
+        if indice_sugerencias.version is None:
+            return  # Aún no construido: se construirá completo en la primera consulta
+        codigos = list(dict.fromkeys(cambio.clave for cambio in cambios))
+        filas = CatalogoReadRepository(db).get_terminos_busqueda(codigos)
+        encontrados = {fila[0] for fila in filas}
+        indice_sugerencias.actualizar(filas)
+        indice_sugerencias.eliminar(c for c in codigos if c not in encontrados)
+        indice_sugerencias.marcar_version(cambios[-1].secuencia)
+
+
+seguidor_cambios.suscribir([PRODUCTO], aplicar_cambios)
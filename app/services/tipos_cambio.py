@@ -0,0 +1,127 @@
+"""
+Sincronización de la serie local de tipos de cambio con el Banco Central.
+
+    python -m app.services.tipos_cambio backfill --desde 2015-01-01 [--hasta 2024-12-31] [--moneda usd]
+    python -m app.services.tipos_cambio actualizar
+
+El backfill hace UNA llamada por serie para todo el rango; la actualización diaria
+pide solo los días posteriores a la última observación guardada.
+"""
+import logging
+import threading
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from config import settings
+from app.core.cache import cache
+from app.data.database import SessionLocal
+from app.data.repositories.tipo_cambio_repository import TipoCambioRepository
+from app.integrations.banco_central import CURRENCY_CODES, DIAS_BUSQUEDA_OBSERVACION, obtener_observaciones
+from app.services.resumen_pagos import tomar_turno
+
+logger = logging.getLogger(__name__)
+
+CUATRO_DECIMALES = Decimal("0.0001")
+TURNO = "tipos_cambio:turno"  # Con varios workers, solo el que lo toma consulta al Banco Central
+
+
+def _a_decimal(valor: float) -> Decimal:
+    return Decimal(str(valor)).quantize(CUATRO_DECIMALES)
+
+
+def sincronizar_rango(desde: date, hasta: date, monedas: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, int]]:
+    """Descarga y guarda las observaciones de cada moneda entre dos fechas (una llamada por serie)."""
+    resultado = {}
+    for moneda in monedas or CURRENCY_CODES:
+        observaciones = obtener_observaciones(CURRENCY_CODES[moneda], desde.isoformat(), hasta.isoformat())
+        filas = [(date.fromisoformat(fecha), _a_decimal(valor)) for fecha, valor in observaciones]
+        db = SessionLocal()
+        try:
+            resultado[moneda] = TipoCambioRepository(db).guardar_observaciones(moneda, filas)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        logger.info(f"Tipos de cambio {moneda.upper()} {desde} → {hasta}: {resultado[moneda]}")
+    cache.invalidar("tasas")
+    return resultado
+
+
+def actualizar_incremental(hoy: Optional[date] = None) -> Dict[str, Dict[str, int]]:
+    """
+    Trae las observaciones posteriores a la última guardada de cada moneda. Se repasan
+    también los últimos días para recoger cifras publicadas con atraso.
+    """
+    hoy = hoy or date.today()
+    db = SessionLocal()
+    try:
+        repo = TipoCambioRepository(db)
+        ultimas = {moneda: repo.ultima_fecha(moneda) for moneda in CURRENCY_CODES}
+    finally:
+        db.close()
+
+    resultado = {}
+    for moneda, ultima in ultimas.items():
+        if ultima is None:
+            desde = hoy - timedelta(days=DIAS_BUSQUEDA_OBSERVACION)
+        else:
+            desde = min(ultima, hoy) - timedelta(days=DIAS_BUSQUEDA_OBSERVACION)
+        resultado.update(sincronizar_rango(desde, hoy, [moneda]))
+    return resultado
+
+
+class ActualizadorTiposCambio:
+    """
+    Hilo de fondo que ejecuta `actualizar_incremental` cada TIPOS_CAMBIO_SYNC_HORAS.
+    Cada worker tiene uno, pero en cada intervalo solo actualiza el que toma el turno.
+    """
+
+    def __init__(self, intervalo_horas: float):
+        self.intervalo = intervalo_horas * 3600
+        self._detener = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+
+    def iniciar(self) -> None:
+        if self._hilo and self._hilo.is_alive():
+            return
+        self._detener.clear()
+
+        def ciclo():
+            while not self._detener.is_set():
+                try:
+                    if tomar_turno(self.intervalo, TURNO):
+                        actualizar_incremental()
+                except Exception as e:
+                    logger.warning(f"No se pudieron actualizar los tipos de cambio: {e}")
+                self._detener.wait(self.intervalo)
+
+        self._hilo = threading.Thread(target=ciclo, name="tipos-cambio", daemon=True)
+        self._hilo.start()
+
+    def detener(self) -> None:
+        self._detener.set()
+
+
+actualizador_tipos_cambio = ActualizadorTiposCambio(settings.TIPOS_CAMBIO_SYNC_HORAS)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(prog="python -m app.services.tipos_cambio")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_backfill = sub.add_parser("backfill", help="Carga histórica (una llamada por serie)")
+    p_backfill.add_argument("--desde", required=True, type=date.fromisoformat)
+    p_backfill.add_argument("--hasta", type=date.fromisoformat, default=date.today())
+    p_backfill.add_argument("--moneda", action="append", choices=sorted(CURRENCY_CODES))
+    sub.add_parser("actualizar", help="Trae los días posteriores a la última observación")
+    args = parser.parse_args()
+
+    if args.comando == "backfill":
+        print(sincronizar_rango(args.desde, args.hasta, args.moneda))
+    else:
+        print(actualizar_incremental())
@@ -0,0 +1,144 @@
+"""
+Punto de entrada de los benchmarks.
+
+    python -m benchmarks generar --escala 1k --db sqlite:///bench_1k.db
+    python -m benchmarks carga --db sqlite:///bench_1k.db [--modo http --url http://localhost:8000]
+    python -m benchmarks comparar benchmarks/baselines/<base>.json benchmarks/baselines/<nueva>.json
+    python -m benchmarks arranque [--modulo main]
+    python -m benchmarks sugerencias --db sqlite:///bench_100k.db [--usuarios 50]
+    python -m benchmarks proveedores --db sqlite:///bench_100k.db [--cambios 0.02]
+    python -m benchmarks inventario --db sqlite:///bench_100k.db [--movimientos 2000000 --dias 365]
+    python -m benchmarks pagos --db sqlite:///bench_100k.db [--cambios 1000 --dias 30]
+    python -m benchmarks divisas [--precios 10000]
+    python -m benchmarks serializacion --db sqlite:///bench_100k.db [--peticiones 200]
+"""
+import argparse
+import sys
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmarks de la API Ferremas")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p_generar = sub.add_parser("generar", help="Carga un catálogo sintético determinista")
+    p_generar.add_argument("--escala", choices=["1k", "100k", "1m"], default="1k")
+    p_generar.add_argument("--db", required=True, help="URL SQLAlchemy de la base destino")
+    p_generar.add_argument("--semilla", type=int, default=42)
+    p_generar.add_argument("--productos", type=int, help="Sobrescribe la cantidad de productos de la escala")
+    p_generar.add_argument("--precios-por-producto", type=int, help="Sobrescribe el largo del historial de precios")
+    p_generar.add_argument("--profundidad", type=int, help="Sobrescribe la profundidad del árbol de categorías")
+    p_generar.add_argument("--pagos", type=int, help="Sobrescribe la cantidad de pagos")
+
+    p_carga = sub.add_parser("carga", help="Ejecuta los escenarios de carga y guarda un baseline")
+    p_carga.add_argument("--db", required=True, help="URL de la base generada (para muestras y modo inproceso)")
+    p_carga.add_argument("--modo", choices=["inproceso", "http"], default="inproceso")
+    p_carga.add_argument("--url", default="http://localhost:8000", help="Servidor para el modo http")
+    p_carga.add_argument("--peticiones", type=int, default=500)
+    p_carga.add_argument("--concurrencia", type=int, default=8)
+    p_carga.add_argument("--escenario", action="append", help="Limitar a uno o más escenarios")
+    p_carga.add_argument("--incluir-externos", action="store_true", help="Incluir escenarios que llaman a Webpay")
+    p_carga.add_argument("--etiqueta", help="Nombre del baseline (por defecto, el commit actual)")
+
+    p_comparar = sub.add_parser("comparar", help="Compara dos baselines y marca regresiones")
+    p_comparar.add_argument("base")
+    p_comparar.add_argument("nueva")
+    p_comparar.add_argument("--umbral", type=float, default=10.0, help="Porcentaje tolerado de empeoramiento")
+
+    p_arranque = sub.add_parser("arranque", help="Tiempo de importación y RSS en frío (-X importtime)")
+    p_arranque.add_argument("--modulo", default="main")
+    p_arranque.add_argument("--top", type=int, default=20)
+
+    p_sugerencias = sub.add_parser("sugerencias", help="Índice de autocompletar a ritmo de tecleo")
+    p_sugerencias.add_argument("--db", required=True, help="URL de la base generada")
+    p_sugerencias.add_argument("--usuarios", type=int, default=50)
+    p_sugerencias.add_argument("--teclas-por-seg", type=float, default=8.0)
+
+    p_proveedores = sub.add_parser("proveedores", help="Sincronización de una lista de precios de proveedor")
+    p_proveedores.add_argument("--db", required=True, help="URL de la base generada (se escribe en ella)")
+    p_proveedores.add_argument("--cambios", type=float, default=0.02, help="Fracción de filas modificadas")
+
+    p_inventario = sub.add_parser("inventario", help="Libro de movimientos de stock y stock a una fecha")
+    p_inventario.add_argument("--db", required=True, help="URL de la base generada (se escribe en ella)")
+    p_inventario.add_argument("--movimientos", type=int, default=2_000_000)
+    p_inventario.add_argument("--dias", type=int, default=365)
+
+    p_pagos = sub.add_parser("pagos", help="Resúmenes de pagos del dashboard y su actualización incremental")
+    p_pagos.add_argument("--db", required=True, help="URL de la base generada (se escribe en ella)")
+    p_pagos.add_argument("--cambios", type=int, default=1000, help="Pagos que cambian de estado")
+    p_pagos.add_argument("--dias", type=int, default=30, help="Largo del rango del reporte")
+
+    p_divisas = sub.add_parser("divisas", help="Conversión de precios con NumPy vs. Decimal (mismo redondeo)")
+    p_divisas.add_argument("--precios", type=int, default=10_000, help="Precios por moneda y tasa")
+
+    p_serializacion = sub.add_parser("serializacion", help="Listados por la ruta orjson vs. la clásica de FastAPI")
+    p_serializacion.add_argument("--db", required=True, help="URL de la base generada")
+    p_serializacion.add_argument("--peticiones", type=int, default=200, help="Peticiones por escenario y ruta")
+    p_serializacion.add_argument("--concurrencia", type=int, default=4)
+
+    args = parser.parse_args()
+
+    if args.comando == "generar":
+        from dataclasses import replace
+        from benchmarks.generador import ESCALAS, generar
+
+        escala = ESCALAS[args.escala]
+        cambios = {
+            "productos": args.productos,
+            "precios_por_producto": args.precios_por_producto,
+            "profundidad_categorias": args.profundidad,
+            "pagos": args.pagos,
+        }
+        escala = replace(escala, **{k: v for k, v in cambios.items() if v is not None})
+        print(f"Generando dataset {args.escala} en {args.db.split('@')[-1]}: {escala}")
+        generar(args.db, escala, semilla=args.semilla)
+
+    elif args.comando == "carga":
+        from benchmarks.carga import ejecutar
+
+        ejecutar(args.db, modo=args.modo, url=args.url, peticiones=args.peticiones,
+                 concurrencia=args.concurrencia, escenarios=args.escenario,
+                 incluir_externos=args.incluir_externos, etiqueta=args.etiqueta)
+
+    elif args.comando == "comparar":
+        from benchmarks.carga import comparar
+
+        sys.exit(1 if comparar(args.base, args.nueva, args.umbral) else 0)
+
+    elif args.comando == "arranque":
+        from benchmarks.arranque import reportar
+
+        sys.exit(0 if reportar(args.modulo, args.top) else 1)
+
+    elif args.comando == "sugerencias":
+        from benchmarks.sugerencias import reportar
+
+        reportar(args.db, args.usuarios, args.teclas_por_seg)
+
+    elif args.comando == "proveedores":
+        from benchmarks.proveedores import reportar
+
+        reportar(args.db, args.cambios)
+
+    elif args.comando == "inventario":
+        from benchmarks.inventario import reportar
+
+        reportar(args.db, args.movimientos, args.dias)
+
+    elif args.comando == "pagos":
+        from benchmarks.resumen_pagos import reportar
+
+        reportar(args.db, args.cambios, args.dias)
+
+    elif args.comando == "divisas":
+        from benchmarks.divisas import reportar
+
+        sys.exit(0 if reportar(args.precios) else 1)
+
+    elif args.comando == "serializacion":
+        from benchmarks.serializacion import reportar
+
+        sys.exit(0 if reportar(args.db, args.peticiones, args.concurrencia) else 1)
+
+
+if __name__ == "__main__":
+    main()
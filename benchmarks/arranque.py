@@ -0,0 +1,78 @@
+"""
+Reporte de arranque en frío: tiempo de importación por módulo (`-X importtime`)
+y memoria residente de un proceso que solo importa el módulo indicado.
+
+Además verifica que el módulo se pueda importar (por ejemplo, sin imports
+circulares) y que ningún módulo pesado prohibido (pandas, bcchapi, ...) se
+cargue al importar; si falla alguna de las dos termina con código 1, por lo que
+sirve como chequeo en CI.
+
+Uso:
+    python -m benchmarks arranque                      # importa main
+    python -m benchmarks arranque --modulo crear_usuario --top 15
+"""
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+MODULOS_PROHIBIDOS = ["pandas", "numpy", "bcchapi", "requests"]
+
+_LINEA_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+_SCRIPT_HIJO = """
+import sys, resource, time
+inicio = time.perf_counter()
+import {modulo}
+duracion = time.perf_counter() - inicio
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if sys.platform == "darwin":
+    rss_kb //= 1024
+print("##", duracion, rss_kb, ",".join(sorted(m for m in sys.modules if "." not in m)))
+"""
+
+
+def medir_importacion(modulo: str = "main") -> Dict[str, object]:
+    """Importa `modulo` en un proceso nuevo y devuelve tiempos, RSS y módulos cargados."""
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT_HIJO.format(modulo=modulo)],
+        capture_output=True, text=True
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"No se pudo importar {modulo}:\n{proceso.stderr[-2000:]}")
+
+    acumulados: List[Tuple[int, int, str]] = []
+    for linea in proceso.stderr.splitlines():
+        match = _LINEA_IMPORTTIME.match(linea)
+        if match:
+            propio, acumulado, sangria, nombre = match.groups()
+            acumulados.append((int(acumulado), int(propio), nombre))
+
+    resumen = next(l for l in proceso.stdout.splitlines() if l.startswith("## ")).split(" ", 3)
+    cargados = set(resumen[3].split(",")) if len(resumen) > 3 else set()
+    return {
+        "modulo": modulo,
+        "segundos": float(resumen[1]),
+        "rss_mb": round(int(resumen[2]) / 1024, 1),
+        "modulos": sorted(acumulados, reverse=True),
+        "prohibidos_cargados": [m for m in MODULOS_PROHIBIDOS if m in cargados],
+    }
+
+
+def reportar(modulo: str = "main", top: int = 20) -> bool:
+    """Imprime el reporte; devuelve False si el módulo no se importa o si se cargó algún módulo prohibido."""
+    try:
+        resultado = medir_importacion(modulo)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return False
+    print(f"import {resultado['modulo']}: {resultado['segundos'] * 1000:.0f} ms, RSS {resultado['rss_mb']} MB")
+    print(f"{'acumulado ms':>13} {'propio ms':>10}  módulo")
+    for acumulado, propio, nombre in resultado["modulos"][:top]:
+        print(f"{acumulado / 1000:>13.1f} {propio / 1000:>10.1f}  {nombre}")
+
+    if resultado["prohibidos_cargados"]:
+        print(f"❌ Módulos pesados cargados al importar: {', '.join(resultado['prohibidos_cargados'])}")
+        return False
+    print("✅ Ningún módulo pesado se carga al importar")
+    return True
@@ -0,0 +1,230 @@
+"""
+Pruebas de carga sobre los endpoints del catálogo y de pagos.
+
+Los escenarios se ejecutan en proceso (TestClient sobre `main.app`, sin red) o
+por HTTP contra un servidor levantado con uvicorn. Cada escenario reporta
+throughput y latencias p50/p95/p99; el resultado completo se guarda como JSON
+en `benchmarks/baselines/` para comparar entre commits.
+
+Uso:
+    python -m benchmarks carga --db sqlite:///bench_1k.db --modo inproceso
+    python -m benchmarks carga --modo http --url http://localhost:8000 --db mysql+...
+    python -m benchmarks comparar benchmarks/baselines/a.json benchmarks/baselines/b.json
+"""
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, select
+
+from benchmarks.estadisticas import resumen_latencias
+
+DIRECTORIO_BASELINES = Path(__file__).parent / "baselines"
+TERMINOS_BUSQUEDA = ["Martillo", "Taladro", "Pintura", "Profesional", "Compacto", "Tornillo", "Sierra"]
+
+
+@dataclass
+class Muestras:
+    """Claves reales del dataset sobre las que se construyen las peticiones"""
+    codigos: List[str]
+    categorias: List[str]
+    tokens_pago: List[str]
+
+
+@dataclass(frozen=True)
+class Escenario:
+    nombre: str
+    ruta: Callable[[random.Random, Muestras], str]
+    externo: bool = False  # Depende de servicios externos (Webpay): solo con --incluir-externos
+
+
+ESCENARIOS: List[Escenario] = [
+    Escenario("busqueda_nombre", lambda r, m: f"/api/productos/productos/?nombre={r.choice(TERMINOS_BUSQUEDA)}"),
+    Escenario("detalle_producto", lambda r, m: f"/api/productos/productos/{r.choice(m.codigos)}"),
+    Escenario("historial_precios", lambda r, m: f"/api/productos/productos/{r.choice(m.codigos)}/precios"),
+    Escenario("productos_categoria", lambda r, m: f"/api/productos/productos/?categoria={r.choice(m.categorias)}"),
+    Escenario("stock_bajo", lambda r, m: f"/api/productos/productos/?stock_max={r.randint(0, 10)}"),
+    Escenario("marcas", lambda r, m: "/api/productos/marcas/"),
+    Escenario("busqueda_facetada", lambda r, m: f"/api/productos/busqueda/?stock_min={r.randint(0, 20)}&solo_destacados={r.random() < 0.3}"),
+    Escenario("sugerencias", lambda r, m: f"/api/productos/sugerencias/?q={r.choice(TERMINOS_BUSQUEDA)[:r.randint(1, 6)]}"),
+    Escenario("estado_pago", lambda r, m: f"/api/pagos/webpay/estado/{r.choice(m.tokens_pago)}", externo=True),
+]
+
+
+def cargar_muestras(db_url: str, cantidad: int = 500) -> Muestras:
+    """Toma claves repartidas uniformemente por id (determinista para un mismo dataset)."""
+    from app.data.models import Producto, Categoria, Pago
+
+    engine = create_engine(db_url)
+    with engine.connect() as conn:
+        def repartidas(columna, id_columna) -> List[str]:
+            valores = conn.execute(select(columna).order_by(id_columna)).scalars().all()
+            paso = max(1, len(valores) // cantidad)
+            return list(valores[::paso][:cantidad])
+
+        muestras = Muestras(
+            codigos=repartidas(Producto.codigo, Producto.id),
+            categorias=repartidas(Categoria.codigo, Categoria.id),
+            tokens_pago=repartidas(Pago.token, Pago.id),
+        )
+    engine.dispose()
+    if not muestras.codigos:
+        raise RuntimeError("La base no tiene productos: ejecute primero `python -m benchmarks generar`")
+    return muestras
+
+
+def cliente_inproceso(db_url: str) -> Callable[[], Callable[[str], int]]:
+    """
+    Fábrica de clientes que llaman a la app sin red (TestClient). Debe crearse antes de
+    importar cualquier módulo de `app`: `config` fija la base al importarse.
+    """
+    os.environ["DATABASE_URL"] = db_url
+    from config import settings
+    if settings.DATABASE_URL != db_url:
+        raise RuntimeError(f"La app ya se importó con otra base ({settings.DATABASE_URL.split('@')[-1]})")
+    from starlette.testclient import TestClient
+    import main
+
+    def crear() -> Callable[[str], int]:
+        # Los errores del servidor llegan como 500, igual que en el modo http
+        cliente = TestClient(main.app, raise_server_exceptions=False)
+        return lambda ruta: cliente.get(ruta).status_code
+    return crear
+
+
+def cliente_http(base_url: str) -> Callable[[], Callable[[str], int]]:
+    """Fábrica de clientes HTTP con conexión persistente por hilo."""
+    import requests
+
+    def crear() -> Callable[[str], int]:
+        sesion = requests.Session()
+        return lambda ruta: sesion.get(base_url.rstrip("/") + ruta).status_code
+    return crear
+
+
+def ejecutar_escenario(fabrica_cliente: Callable[[], Callable[[str], int]], escenario: Escenario,
+                       muestras: Muestras, peticiones: int, concurrencia: int, semilla: int = 42) -> Dict[str, Any]:
+    """Ejecuta `peticiones` repartidas en `concurrencia` hilos y resume las latencias."""
+    latencias: List[float] = []
+    errores = [0]
+    lock = threading.Lock()
+
+    def trabajador(indice: int, cantidad: int) -> None:
+        rnd = random.Random(semilla + indice)
+        llamar = fabrica_cliente()
+        locales, fallidas = [], 0
+        for _ in range(cantidad):
+            ruta = escenario.ruta(rnd, muestras)
+            inicio = time.perf_counter()
+            try:
+                estado = llamar(ruta)
+            except Exception:
+                estado = 599
+            locales.append((time.perf_counter() - inicio) * 1000)
+            if estado >= 400:
+                fallidas += 1
+        with lock:
+            latencias.extend(locales)
+            errores[0] += fallidas
+
+    # Calentamiento: una petición fuera de la medición (imports, caches, conexiones)
+    fabrica_cliente()(escenario.ruta(random.Random(semilla), muestras))
+
+    por_hilo = [peticiones // concurrencia + (1 if i < peticiones % concurrencia else 0) for i in range(concurrencia)]
+    hilos = [threading.Thread(target=trabajador, args=(i, n)) for i, n in enumerate(por_hilo)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    return {
+        "peticiones": len(latencias),
+        "errores": errores[0],
+        "duracion_s": round(duracion, 3),
+        "rps": round(len(latencias) / duracion, 1) if duracion else 0.0,
+        **resumen_latencias(latencias),
+    }
+
+
+def _commit_actual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def ejecutar(db_url: str, modo: str = "inproceso", url: Optional[str] = None, peticiones: int = 500,
+             concurrencia: int = 8, escenarios: Optional[List[str]] = None, incluir_externos: bool = False,
+             etiqueta: Optional[str] = None) -> Path:
+    """Corre los escenarios seleccionados y guarda el resultado como baseline JSON."""
+    # El cliente en proceso va primero: cargar_muestras importa los modelos y con ellos `config`
+    fabrica = cliente_inproceso(db_url) if modo == "inproceso" else cliente_http(url)
+    muestras = cargar_muestras(db_url)
+
+    seleccion = [
+        e for e in ESCENARIOS
+        if (not escenarios or e.nombre in escenarios) and (incluir_externos or not e.externo)
+    ]
+    resultados: Dict[str, Any] = {}
+    print(f"{'escenario':<22} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errores':>8}")
+    for escenario in seleccion:
+        r = ejecutar_escenario(fabrica, escenario, muestras, peticiones, concurrencia)
+        resultados[escenario.nombre] = r
+        print(f"{escenario.nombre:<22} {r['rps']:>8} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9} {r['errores']:>8}")
+
+    commit = _commit_actual()
+    baseline = {
+        "fecha": datetime.utcnow().isoformat(),
+        "commit": commit,
+        "modo": modo,
+        "db": db_url.split("@")[-1],  # sin credenciales
+        "peticiones": peticiones,
+        "concurrencia": concurrencia,
+        "escenarios": resultados,
+    }
+    DIRECTORIO_BASELINES.mkdir(exist_ok=True)
+    destino = DIRECTORIO_BASELINES / f"{etiqueta or commit or 'sin-commit'}-{modo}.json"
+    destino.write_text(json.dumps(baseline, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Baseline guardado en {destino}")
+    return destino
+
+
+def comparar(ruta_base: str, ruta_nueva: str, umbral_pct: float = 10.0) -> bool:
+    """
+    Compara dos baselines escenario por escenario. Devuelve True si hay regresiones:
+    p95 más de `umbral_pct`% peor o throughput más de `umbral_pct`% menor.
+    """
+    base = json.loads(Path(ruta_base).read_text(encoding="utf-8"))
+    nueva = json.loads(Path(ruta_nueva).read_text(encoding="utf-8"))
+    print(f"Base: {base.get('commit')}  Nueva: {nueva.get('commit')}")
+    print(f"{'escenario':<22} {'rps':>16} {'p95 ms':>18} {'p99 ms':>18}")
+
+    def delta(antes: float, despues: float) -> float:
+        return (despues - antes) / antes * 100 if antes else 0.0
+
+    regresion = False
+    for nombre, r_nueva in nueva["escenarios"].items():
+        r_base = base["escenarios"].get(nombre)
+        if r_base is None:
+            print(f"{nombre:<22} (sin datos en la base)")
+            continue
+        d_rps = delta(r_base["rps"], r_nueva["rps"])
+        d_p95 = delta(r_base["p95_ms"], r_nueva["p95_ms"])
+        d_p99 = delta(r_base["p99_ms"], r_nueva["p99_ms"])
+        marca = ""
+        if d_p95 > umbral_pct or d_rps < -umbral_pct:
+            marca = "  ⚠️ REGRESIÓN"
+            regresion = True
+        print(f"{nombre:<22} {r_nueva['rps']:>8} ({d_rps:+6.1f}%) {r_nueva['p95_ms']:>9} ({d_p95:+6.1f}%) "
+              f"{r_nueva['p99_ms']:>9} ({d_p99:+6.1f}%){marca}")
+    return regresion
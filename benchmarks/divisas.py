@@ -0,0 +1,80 @@
+"""
+Benchmark y verificación de la conversión de precios a otra moneda.
+
+Convierte una página de precios con NumPy (lotes desde UMBRAL_NUMPY) y de a uno con
+Decimal, compara los tiempos y verifica que ambos caminos entreguen exactamente los mismos
+montos, incluidos los casos límite: montos que caen justo en la mitad al redondear, sus
+vecinos a un CLP, montos con decimales y negativos. Termina con código 1 si encuentra
+alguna diferencia, por lo que sirve como chequeo en CI (requiere NumPy).
+
+Uso:
+    python -m benchmarks divisas [--precios 10000]
+"""
+import random
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+TASAS = [Decimal("943.57"), Decimal("1000"), Decimal("1024.5"), Decimal("0.0123"), Decimal("3.3333")]
+
+
+def montos_limite(tasa: Decimal, decimales: int, cantidad: int, rnd: random.Random) -> List[Decimal]:
+    """Montos en CLP cuya conversión queda en la mitad exacta (o a un CLP de ella)."""
+    montos = []
+    for _ in range(cantidad):
+        empate = (Decimal(rnd.randrange(1, 10_000_000)) + Decimal("0.5")).scaleb(-decimales) * tasa
+        for monto in (empate, empate - 1, empate + 1, empate.quantize(Decimal(1)), -empate):
+            montos.append(monto)
+    return montos
+
+
+def medir(precios: int = 10_000, semilla: int = 42) -> Dict[str, Any]:
+    import numpy  # noqa: F401  (el camino vectorizado lo necesita)
+    from app.core.divisas import DECIMALES_MONEDA, convertir_montos
+    from app.core.vectorizado import UMBRAL_NUMPY
+
+    rnd = random.Random(semilla)
+    diferencias: List[tuple] = []
+    tiempo_numpy = tiempo_decimal = 0.0
+    casos = 0
+    for moneda, decimales in DECIMALES_MONEDA.items():
+        for tasa in TASAS:
+            montos: List[Any] = [rnd.randrange(100, 5_000_000) for _ in range(precios)]
+            montos += [float(m) for m in montos_limite(tasa, decimales, 200, rnd)[:UMBRAL_NUMPY]]
+            montos += montos_limite(tasa, decimales, 200, rnd)
+
+            t = time.perf_counter()
+            vectorizado = convertir_montos(montos, tasa, moneda)
+            tiempo_numpy += time.perf_counter() - t
+            t = time.perf_counter()
+            uno_a_uno = [convertir_montos([monto], tasa, moneda)[0] for monto in montos]
+            tiempo_decimal += time.perf_counter() - t
+
+            casos += len(montos)
+            diferencias += [
+                (moneda, tasa, monto, a, b) for monto, a, b in zip(montos, vectorizado, uno_a_uno) if a != b
+            ]
+
+    return {
+        "casos": casos,
+        "numpy_ms": round(tiempo_numpy * 1000, 1),
+        "decimal_ms": round(tiempo_decimal * 1000, 1),
+        "diferencias": diferencias,
+    }
+
+
+def reportar(precios: int) -> bool:
+    """Imprime el reporte; devuelve False si los caminos NumPy y Decimal difieren en algún monto."""
+    try:
+        r = medir(precios)
+    except ImportError:
+        print("❌ NumPy no está instalado: no se puede comparar el camino vectorizado")
+        return False
+    print(f"{r['casos']} conversiones: NumPy {r['numpy_ms']}ms, Decimal de a uno {r['decimal_ms']}ms")
+    for moneda, tasa, monto, a, b in r["diferencias"][:20]:
+        print(f"  {moneda} tasa {tasa} monto {monto}: NumPy {a}, Decimal {b}")
+    if r["diferencias"]:
+        print(f"❌ {len(r['diferencias'])} montos difieren entre NumPy y Decimal")
+        return False
+    print("✅ NumPy y Decimal redondean igual, incluidos los casos en la mitad")
+    return True
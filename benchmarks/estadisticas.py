@@ -0,0 +1,22 @@
+"""Funciones estadísticas compartidas por los benchmarks."""
+import statistics
+from typing import Dict, List
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil por vecino más cercano (valores no vacíos)."""
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+
+def resumen_latencias(latencias_ms: List[float]) -> Dict[str, float]:
+    """Media y percentiles p50/p95/p99 de una serie de latencias en ms."""
+    if not latencias_ms:
+        return {"media_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0}
+    return {
+        "media_ms": round(statistics.mean(latencias_ms), 3),
+        "p50_ms": round(percentil(latencias_ms, 50), 3),
+        "p95_ms": round(percentil(latencias_ms, 95), 3),
+        "p99_ms": round(percentil(latencias_ms, 99), 3),
+    }
@@ -0,0 +1,161 @@
+"""
+Benchmark del libro de movimientos de stock y sus cortes diarios.
+
+Carga `movimientos` movimientos sintéticos (entradas, ventas, ajustes y reservas)
+repartidos en `dias` días sobre los productos de la base generada, escribe los cortes
+diarios como lo haría el proceso en segundo plano y compara el stock a una fecha
+calculado con cortes (último corte + rango corto del libro) contra la reconstrucción
+completa (suma de todos los movimientos del producto hasta la fecha), verificando que
+coincidan. Escribe en la base indicada: usar una base generada para benchmarks.
+
+Uso:
+    python -m benchmarks inventario --db sqlite:///bench_100k.db [--movimientos 2000000 --dias 365]
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List
+
+from sqlalchemy import bindparam, create_engine, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from benchmarks.estadisticas import resumen_latencias
+
+LOTE = 20000
+TIPOS = [("venta", 0.6), ("entrada", 0.15), ("reserva", 0.15), ("ajuste", 0.1)]
+
+
+def _movimientos(ids: List[int], cantidad: int, inicio: datetime, dias: int, rnd: random.Random) -> Iterator[Dict[str, Any]]:
+    """Movimientos en orden cronológico; algunos productos concentran la mayor parte."""
+    tipos, pesos = zip(*TIPOS)
+    paso = dias * 86400 / cantidad
+    for i in range(cantidad):
+        tipo = rnd.choices(tipos, pesos)[0]
+        if tipo == "entrada":
+            delta = rnd.randint(20, 200)
+        elif tipo == "ajuste":
+            delta = rnd.randint(-5, 5) or 1
+        elif tipo == "reserva":
+            delta = rnd.choice((-1, 1)) * rnd.randint(1, 5)
+        else:
+            delta = -rnd.randint(1, 10)
+        yield {
+            "producto_id": ids[min(int(rnd.paretovariate(1.2)) - 1, len(ids) - 1)] if rnd.random() < 0.5 else rnd.choice(ids),
+            "tipo": tipo,
+            "cantidad": delta,
+            "fecha": inicio + timedelta(seconds=i * paso),
+        }
+
+
+def medir(db_url: str, movimientos: int = 2_000_000, dias: int = 365, consultas: int = 2000,
+          semilla: int = 42) -> Dict[str, Any]:
+    from app.data.database import Base
+    from app.data.models import Producto, MovimientoStock, CorteStock
+    from app.data.repositories.inventario_repository import InventarioRepository
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine, tables=[MovimientoStock.__table__, CorteStock.__table__])
+    rnd = random.Random(semilla)
+    inicio = (datetime.utcnow() - timedelta(days=dias + 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+    with Session(engine) as db:
+        if db.execute(select(func.count()).select_from(MovimientoStock)).scalar():
+            raise RuntimeError("La base ya tiene movimientos de stock: use una base recién generada")
+        ids = [fila[0] for fila in db.execute(select(Producto.id).order_by(Producto.id))]
+        if not ids:
+            raise RuntimeError("La base no tiene productos: ejecute primero `python -m benchmarks generar`")
+        repo = InventarioRepository(db)
+
+        # El stock actual es el de antes del primer movimiento: el corte inicial lo toma
+        repo.generar_cortes(inicio)
+        db.commit()
+
+        # Carga del libro por lotes, aplicando cada día los movimientos al stock y
+        # escribiendo el corte de ese día
+        t0 = time.perf_counter()
+        escritura = cortes = 0.0
+        filas_cortes = 0
+        totales: Dict[int, int] = {}
+        pendientes: List[Dict[str, Any]] = []
+        consultados: List[int] = []  # Muestra de productos proporcional a su actividad
+        dia = inicio + timedelta(days=1)
+
+        def volcar() -> None:
+            nonlocal escritura
+            if not pendientes:
+                return
+            t = time.perf_counter()
+            db.execute(insert(MovimientoStock), pendientes)
+            tabla = Producto.__table__
+            db.execute(
+                update(tabla).where(tabla.c.id == bindparam("b_id")).values(stock=tabla.c.stock + bindparam("b_cantidad")),
+                [{"b_id": i, "b_cantidad": c} for i, c in totales.items()]
+            )
+            db.commit()
+            escritura += time.perf_counter() - t
+            pendientes.clear()
+            totales.clear()
+
+        for movimiento in _movimientos(ids, movimientos, inicio, dias, rnd):
+            while movimiento["fecha"] > dia:
+                volcar()
+                t = time.perf_counter()
+                filas_cortes += repo.generar_cortes(dia)
+                db.commit()
+                cortes += time.perf_counter() - t
+                dia += timedelta(days=1)
+            pendientes.append(movimiento)
+            if len(consultados) < consultas:
+                consultados.append(movimiento["producto_id"])
+            elif rnd.random() < consultas / movimientos:
+                consultados[rnd.randrange(consultas)] = movimiento["producto_id"]
+            totales[movimiento["producto_id"]] = totales.get(movimiento["producto_id"], 0) + movimiento["cantidad"]
+            if len(pendientes) >= LOTE:
+                volcar()
+        volcar()
+        carga = time.perf_counter() - t0
+
+        # Stock a una fecha: con cortes vs. reconstrucción completa desde el corte inicial, con
+        # cada producto consultado con la frecuencia con que se mueve
+        iniciales = dict(db.execute(select(CorteStock.producto_id, CorteStock.stock).where(CorteStock.fecha == inicio)).all())
+
+        con_cortes: List[float] = []
+        completa: List[float] = []
+        diferencias = 0
+        for _ in range(consultas):
+            producto_id = rnd.choice(consultados)
+            fecha = inicio + timedelta(seconds=rnd.uniform(0, dias * 86400))
+            t = time.perf_counter()
+            stock = repo.stock_producto_al(producto_id, fecha)
+            con_cortes.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            suma = db.execute(select(func.coalesce(func.sum(MovimientoStock.cantidad), 0)).where(
+                MovimientoStock.producto_id == producto_id, MovimientoStock.fecha <= fecha
+            )).scalar()
+            completa.append((time.perf_counter() - t) * 1000)
+            diferencias += stock != iniciales[producto_id] + int(suma)
+
+    engine.dispose()
+    return {
+        "productos": len(ids),
+        "movimientos": movimientos,
+        "dias": dias,
+        "carga_seg": round(carga, 1),
+        "movimientos_por_seg": round(movimientos / escritura) if escritura else None,
+        "cortes_seg": round(cortes, 1),
+        "filas_cortes": filas_cortes,
+        "con_cortes": resumen_latencias(con_cortes),
+        "completa": resumen_latencias(completa),
+        "diferencias": diferencias,
+    }
+
+
+def reportar(db_url: str, movimientos: int, dias: int) -> None:
+    r = medir(db_url, movimientos=movimientos, dias=dias)
+    print(f"{r['movimientos']} movimientos en {r['dias']} días sobre {r['productos']} productos "
+          f"(carga {r['carga_seg']}s, {r['movimientos_por_seg']} movimientos/s en bloque)")
+    print(f"Cortes diarios: {r['filas_cortes']} filas en {r['cortes_seg']}s")
+    for nombre in ("con_cortes", "completa"):
+        l = r[nombre]
+        print(f"  stock a una fecha ({nombre:<10}) p50 {l['p50_ms']:.2f}ms  p95 {l['p95_ms']:.2f}ms  p99 {l['p99_ms']:.2f}ms")
+    print(f"Diferencias entre ambos cálculos: {r['diferencias']}")
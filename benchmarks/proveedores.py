@@ -0,0 +1,103 @@
+"""
+Benchmark de la sincronización de listas de precios de proveedores.
+
+Exporta el catálogo de la base generada como lista de un proveedor, la sincroniza una vez
+(carga de huellas), cambia precio o stock de una fracción de las filas y vuelve a
+sincronizar. Reporta el tiempo de cada pasada y las filas que llegaron a la base en
+INSERT/UPDATE, que deben ser proporcionales a los cambios y no al tamaño de la lista.
+Escribe en la base indicada: usar una base generada para benchmarks.
+
+Uso:
+    python -m benchmarks proveedores --db sqlite:///bench_100k.db [--cambios 0.02]
+"""
+import csv
+import os
+import random
+import tempfile
+import time
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import Session
+
+
+def _exportar(db: Session, ruta: str) -> List[List[Any]]:
+    from app.data.repositories.catalogo_read_repository import CatalogoReadRepository
+    from app.data.models import Producto
+
+    repo = CatalogoReadRepository(db)
+    filas = [
+        [fila.codigo, fila.nombre, f"{fila.precio_actual:.2f}" if fila.precio_actual is not None else "", fila.stock]
+        for fila in repo.fetch(repo.select_basico().where(Producto.activo == True))
+    ]
+    _escribir(ruta, filas)
+    return filas
+
+
+def _escribir(ruta: str, filas: List[List[Any]]) -> None:
+    with open(ruta, "w", newline="", encoding="utf-8") as archivo:
+        escritor = csv.writer(archivo)
+        escritor.writerow(["codigo", "nombre", "precio", "stock"])
+        escritor.writerows(filas)
+
+
+def medir(db_url: str, cambios: float = 0.02, semilla: int = 42) -> Dict[str, Any]:
+    from app.data.database import Base
+    from app.data.models import Cambio, Proveedor, ProductoProveedor
+    from app.services.proveedores import sincronizar_lista
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine, tables=[Proveedor.__table__, ProductoProveedor.__table__, Cambio.__table__])
+
+    escrituras = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def contar(conn, cursor, sentencia, parametros, contexto, executemany):
+        if sentencia.lstrip().upper().startswith(("INSERT", "UPDATE")):
+            escrituras[0] += len(parametros) if executemany else 1
+
+    directorio = tempfile.mkdtemp(prefix="ferremas_proveedor_")
+    ruta = os.path.join(directorio, "lista.csv")
+    pasadas = {}
+    with Session(engine) as db:
+        if not db.execute(select(Proveedor.id).where(Proveedor.codigo == "BENCH")).first():
+            db.add(Proveedor(nombre="Proveedor benchmark", codigo="BENCH"))
+            db.commit()
+        filas = _exportar(db, ruta)
+
+        def pasada(nombre: str) -> None:
+            escrituras[0] = 0
+            inicio = time.perf_counter()
+            resultado = sincronizar_lista("BENCH", ruta, db=db)
+            pasadas[nombre] = {
+                "segundos": round(time.perf_counter() - inicio, 2),
+                "filas_escritas": escrituras[0],
+                **resultado,
+            }
+
+        pasada("inicial")
+        pasada("sin_cambios")
+
+        rnd = random.Random(semilla)
+        for fila in rnd.sample(filas, int(len(filas) * cambios)):
+            if fila[2] and rnd.random() < 0.5:
+                fila[2] = f"{Decimal(fila[2]) * Decimal('1.05'):.2f}"
+            else:
+                fila[3] = int(fila[3]) + rnd.randint(1, 20)
+        _escribir(ruta, filas)
+        pasada("con_cambios")
+
+    engine.dispose()
+    os.remove(ruta)
+    os.rmdir(directorio)
+    return {"filas": len(filas), "cambios": cambios, "pasadas": pasadas}
+
+
+def reportar(db_url: str, cambios: float) -> None:
+    r = medir(db_url, cambios=cambios)
+    print(f"Lista de {r['filas']} filas, {r['cambios']:.0%} modificadas entre pasadas")
+    for nombre, p in r["pasadas"].items():
+        print(f"  {nombre:<12} {p['segundos']:>7}s  filas escritas {p['filas_escritas']:>7}  "
+              f"(precios {p['precios']}, productos {p['productos']}, huellas {p['huellas']}, "
+              f"sin cambios {p['sin_cambios']})")
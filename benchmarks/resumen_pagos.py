@@ -0,0 +1,110 @@
+"""
+Benchmark de los resúmenes de pagos del dashboard.
+
+Reconstruye los resúmenes sobre los pagos de la base generada y compara el reporte de
+un rango de días leído de `resumen_pagos_dia` contra el mismo agregado sobre `pagos`.
+Luego cambia de estado `cambios` pagos, mide la actualización incremental desde la marca
+de agua y verifica que los resúmenes coincidan con una reconstrucción completa. Escribe
+en la base indicada: usar una base generada para benchmarks.
+
+Uso:
+    python -m benchmarks pagos --db sqlite:///bench_100k.db [--cambios 1000 --dias 30]
+"""
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import bindparam, create_engine, func, select, update
+from sqlalchemy.orm import Session
+
+from benchmarks.estadisticas import resumen_latencias
+
+ESTADOS = ["AUTORIZADO", "RECHAZADO", "ANULADO"]
+
+
+def medir(db_url: str, cambios: int = 1000, dias: int = 30, consultas: int = 200, semilla: int = 42) -> Dict[str, Any]:
+    from app.data.database import Base
+    from app.data.models import Pago, ResumenPagosHora, ResumenPagosDia, AvanceResumen
+    from app.data.repositories.resumen_pagos_repository import ResumenPagosRepository
+
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine, tables=[
+        ResumenPagosHora.__table__, ResumenPagosDia.__table__, AvanceResumen.__table__
+    ])
+    rnd = random.Random(semilla)
+
+    with Session(engine) as db:
+        pagos, inicio, fin = db.execute(
+            select(func.count(), func.min(Pago.fecha_creacion), func.max(Pago.fecha_creacion))
+        ).one()
+        if not pagos:
+            raise RuntimeError("La base no tiene pagos: ejecute primero `python -m benchmarks generar`")
+        repo = ResumenPagosRepository(db)
+
+        t = time.perf_counter()
+        filas_hora = repo.reconstruir(datetime.utcnow())
+        db.commit()
+        reconstruccion = time.perf_counter() - t
+
+        # Reporte de `dias` días: resumen diario vs. agregado sobre los pagos
+        tramo = max((fin - inicio).days - dias, 1)
+        con_resumen: List[float] = []
+        sin_resumen: List[float] = []
+        for _ in range(consultas):
+            desde = (inicio + timedelta(days=rnd.randrange(tramo))).date()
+            hasta = desde + timedelta(days=dias - 1)
+            t = time.perf_counter()
+            repo.consultar(desde, hasta)
+            con_resumen.append((time.perf_counter() - t) * 1000)
+            t = time.perf_counter()
+            db.execute(
+                select(func.date(Pago.fecha_creacion), Pago.estado, Pago.metodo_pago, func.count(), func.sum(Pago.monto))
+                .where(Pago.fecha_creacion >= desde, Pago.fecha_creacion < hasta + timedelta(days=1))
+                .group_by(func.date(Pago.fecha_creacion), Pago.estado, Pago.metodo_pago)
+            ).all()
+            sin_resumen.append((time.perf_counter() - t) * 1000)
+
+        # Cambios de estado y actualización incremental
+        ids = db.execute(select(Pago.id).order_by(func.random()).limit(cambios)).scalars().all()
+        tabla = Pago.__table__
+        db.execute(
+            update(tabla).where(tabla.c.id == bindparam("b_id")).values(
+                estado=bindparam("b_estado"), fecha_actualizacion=datetime.utcnow()
+            ),
+            [{"b_id": i, "b_estado": rnd.choice(ESTADOS)} for i in ids]
+        )
+        db.commit()
+        t = time.perf_counter()
+        horas = repo.actualizar(datetime.utcnow() + timedelta(seconds=1))
+        db.commit()
+        incremental = time.perf_counter() - t
+
+        t = time.perf_counter()
+        diferencias = len(repo.diferencias())
+        verificacion = time.perf_counter() - t
+
+    engine.dispose()
+    return {
+        "pagos": pagos,
+        "filas_hora": filas_hora,
+        "reconstruccion_seg": round(reconstruccion, 2),
+        "dias": dias,
+        "con_resumen": resumen_latencias(con_resumen),
+        "sin_resumen": resumen_latencias(sin_resumen),
+        "cambios": len(ids),
+        "horas_recalculadas": horas,
+        "incremental_ms": round(incremental * 1000, 1),
+        "verificacion_seg": round(verificacion, 2),
+        "diferencias": diferencias,
+    }
+
+
+def reportar(db_url: str, cambios: int, dias: int) -> None:
+    r = medir(db_url, cambios=cambios, dias=dias)
+    print(f"{r['pagos']} pagos: reconstrucción en {r['reconstruccion_seg']}s ({r['filas_hora']} filas por hora)")
+    for nombre in ("con_resumen", "sin_resumen"):
+        l = r[nombre]
+        print(f"  reporte de {r['dias']} días ({nombre:<11}) p50 {l['p50_ms']:.2f}ms  p95 {l['p95_ms']:.2f}ms  p99 {l['p99_ms']:.2f}ms")
+    print(f"{r['cambios']} cambios de estado: {r['horas_recalculadas']} horas recalculadas en {r['incremental_ms']}ms")
+    print(f"Diferencias contra el agregado de pagos: {r['diferencias']} (verificado en {r['verificacion_seg']}s)")
@@ -0,0 +1,113 @@
+"""
+Benchmark de serialización de los listados de productos.
+
+Lleva `GET /api/productos/productos/` y `GET /api/productos/busqueda/` por las dos rutas de
+respuesta con el harness de carga en proceso (`benchmarks.carga`) sobre una base generada:
+
+- rápida (la de la app): el servicio entrega ProductoBasic ya construidos y el endpoint
+  devuelve `RespuestaJSON` (orjson) sin re-validar.
+- clásica: el endpoint devuelve los mismos datos como dicts, FastAPI los valida contra
+  `response_model` y los serializa con el encoder `json` estándar.
+
+Antes de medir verifica que ambas rutas entreguen el mismo JSON; termina con código 1 si
+difieren o si alguna petición falla.
+
+Uso:
+    python -m benchmarks serializacion --db sqlite:///bench_100k.db [--peticiones 200 --concurrencia 4]
+"""
+import json
+import random
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+
+from benchmarks.carga import TERMINOS_BUSQUEDA, Escenario, cargar_muestras, cliente_inproceso, ejecutar_escenario
+
+ESCENARIOS: List[Escenario] = [
+    Escenario("listado_nombre", lambda r, m: f"/api/productos/productos/?nombre={r.choice(TERMINOS_BUSQUEDA)}"),
+    Escenario("listado_categoria", lambda r, m: f"/api/productos/productos/?categoria={r.choice(m.categorias)}"),
+    Escenario("listado_stock", lambda r, m: f"/api/productos/productos/?stock_max={r.randint(50, 500)}"),
+    Escenario("busqueda_facetada", lambda r, m: f"/api/productos/busqueda/?por_pagina=100&stock_min={r.randint(0, 20)}"),
+]
+RUTAS = ("rapida", "clasica")
+
+
+def _a_dicts(contenido: Any) -> Any:
+    """Modelos ya construidos -> dicts, como los entregaba el servicio antes de la ruta rápida."""
+    from pydantic import BaseModel
+
+    if isinstance(contenido, BaseModel):
+        return {campo: _a_dicts(valor) for campo, valor in contenido.__dict__.items()}
+    if isinstance(contenido, dict):
+        return {clave: _a_dicts(valor) for clave, valor in contenido.items()}
+    if isinstance(contenido, list):
+        return [_a_dicts(valor) for valor in contenido]
+    return contenido
+
+
+@contextmanager
+def ruta_clasica() -> Iterator[None]:
+    """Mientras dura, los endpoints de productos responden por la ruta clásica de FastAPI."""
+    from fastapi.responses import JSONResponse
+    from app.api import productos as api_productos
+    from app.core.http import RespuestaJSON
+
+    render = RespuestaJSON.__dict__["render"]
+    # Sin envolver en una Response, FastAPI valida contra response_model; la clase de respuesta
+    # por defecto de la app (RespuestaJSON) pasa a serializar con `json` como JSONResponse
+    api_productos.RespuestaJSON = lambda contenido, headers=None: _a_dicts(contenido)
+    RespuestaJSON.render = JSONResponse.render
+    try:
+        yield
+    finally:
+        api_productos.RespuestaJSON = RespuestaJSON
+        RespuestaJSON.render = render
+
+
+def diferencias(muestras, semilla: int = 42) -> List[str]:
+    """Rutas de ejemplo de cada escenario cuyo JSON difiere entre la ruta rápida y la clásica."""
+    from starlette.testclient import TestClient
+    import main
+
+    cliente = TestClient(main.app, raise_server_exceptions=False)
+    distintas = []
+    for escenario in ESCENARIOS:
+        ruta = escenario.ruta(random.Random(semilla), muestras)
+        rapida = cliente.get(ruta)
+        with ruta_clasica():
+            clasica = cliente.get(ruta)
+        if rapida.status_code != 200 or clasica.status_code != 200 or json.loads(rapida.content) != json.loads(clasica.content):
+            distintas.append(f"{ruta} (rápida {rapida.status_code}, clásica {clasica.status_code})")
+    return distintas
+
+
+def medir(db_url: str, peticiones: int = 200, concurrencia: int = 4) -> Dict[str, Any]:
+    fabrica = cliente_inproceso(db_url)  # Antes de cualquier import de `app`
+    muestras = cargar_muestras(db_url)
+    resultados: Dict[str, Dict[str, Any]] = {escenario.nombre: {} for escenario in ESCENARIOS}
+    for escenario in ESCENARIOS:
+        resultados[escenario.nombre]["rapida"] = ejecutar_escenario(fabrica, escenario, muestras, peticiones, concurrencia)
+        with ruta_clasica():
+            resultados[escenario.nombre]["clasica"] = ejecutar_escenario(fabrica, escenario, muestras, peticiones, concurrencia)
+    return {"escenarios": resultados, "diferencias": diferencias(muestras)}
+
+
+def reportar(db_url: str, peticiones: int, concurrencia: int) -> bool:
+    """Imprime el reporte; devuelve False si las rutas difieren o alguna petición falló."""
+    r = medir(db_url, peticiones, concurrencia)
+    print(f"{'escenario':<20} {'ruta':>8} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'errores':>8} {'aceleración':>12}")
+    errores = 0
+    for nombre, por_ruta in r["escenarios"].items():
+        rapida, clasica = por_ruta["rapida"], por_ruta["clasica"]
+        aceleracion = f"{clasica['p50_ms'] / rapida['p50_ms']:.1f}x" if rapida["p50_ms"] else ""
+        for ruta in RUTAS:
+            m = por_ruta[ruta]
+            errores += m["errores"]
+            print(f"{nombre:<20} {ruta:>8} {m['rps']:>8} {m['p50_ms']:>9} {m['p95_ms']:>9} {m['errores']:>8} "
+                  f"{aceleracion if ruta == 'rapida' else '':>12}")
+    for ruta in r["diferencias"]:
+        print(f"  difiere: {ruta}")
+    if r["diferencias"] or errores:
+        print(f"❌ {len(r['diferencias'])} rutas con respuestas distintas, {errores} peticiones con error")
+        return False
+    print("✅ Ambas rutas entregan el mismo JSON")
+    return True
@@ -0,0 +1,97 @@
+"""
+Benchmark del índice de sugerencias (autocompletar) a ritmo de tecleo.
+
+Simula `usuarios` personas escribiendo nombres y códigos reales del dataset, una
+consulta por tecla a `teclas_por_seg`, contra el índice en memoria (sin HTTP).
+Reporta el tiempo de construcción, la latencia por consulta y el costo de aplicar
+cambios incrementales.
+
+Uso:
+    python -m benchmarks sugerencias --db sqlite:///bench_100k.db [--usuarios 50 --teclas-por-seg 8]
+"""
+import random
+import threading
+import time
+from typing import Any, Dict, List
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from benchmarks.estadisticas import resumen_latencias
+
+
+def _secuencias(nombres: List[str], codigos: List[str], rnd: random.Random, cantidad: int) -> List[List[str]]:
+    """Prefijos crecientes de lo que escribiría un usuario (a veces un código)."""
+    secuencias = []
+    for _ in range(cantidad):
+        texto = rnd.choice(codigos) if rnd.random() < 0.2 else rnd.choice(nombres)
+        largo = rnd.randint(3, min(len(texto), 14))
+        secuencias.append([texto[:i] for i in range(1, largo + 1)])
+    return secuencias
+
+
+def medir(db_url: str, usuarios: int = 50, teclas_por_seg: float = 8.0, busquedas_por_usuario: int = 20,
+          semilla: int = 42) -> Dict[str, Any]:
+    from app.data.repositories.catalogo_read_repository import CatalogoReadRepository
+    from app.services.sugerencias import IndicePrefijos
+
+    engine = create_engine(db_url)
+    with Session(engine) as db:
+        filas = CatalogoReadRepository(db).get_terminos_busqueda()
+    engine.dispose()
+    if not filas:
+        raise RuntimeError("La base no tiene productos: ejecute primero `python -m benchmarks generar`")
+
+    indice = IndicePrefijos()
+    inicio = time.perf_counter()
+    indice.construir(filas, version=0)
+    construccion_ms = (time.perf_counter() - inicio) * 1000
+
+    nombres = [fila[1] for fila in filas]
+    codigos = [fila[0] for fila in filas]
+    latencias: List[float] = []
+    lock = threading.Lock()
+
+    def usuario(indice_usuario: int) -> None:
+        rnd = random.Random(semilla + indice_usuario)
+        locales = []
+        for secuencia in _secuencias(nombres, codigos, rnd, busquedas_por_usuario):
+            for prefijo in secuencia:
+                t0 = time.perf_counter()
+                indice.buscar(prefijo, 8)
+                locales.append((time.perf_counter() - t0) * 1000)
+                time.sleep(max(0.0, 1 / teclas_por_seg - (time.perf_counter() - t0)))
+        with lock:
+            latencias.extend(locales)
+
+    hilos = [threading.Thread(target=usuario, args=(i,)) for i in range(usuarios)]
+    inicio = time.perf_counter()
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    duracion = time.perf_counter() - inicio
+
+    # Cambios incrementales: renombrar 100 productos como lo haría update_producto
+    rnd = random.Random(semilla)
+    cambios = [(c, f"{n} Renovado", m, True) for c, n, m, _ in rnd.sample(filas, min(100, len(filas)))]
+    inicio = time.perf_counter()
+    indice.actualizar(cambios)
+    actualizacion_ms = (time.perf_counter() - inicio) * 1000 / len(cambios)
+
+    return {
+        "productos": len(indice),
+        "construccion_ms": round(construccion_ms, 1),
+        "consultas": len(latencias),
+        "qps": round(len(latencias) / duracion, 1),
+        "actualizacion_por_producto_ms": round(actualizacion_ms, 3),
+        **resumen_latencias(latencias),
+    }
+
+
+def reportar(db_url: str, usuarios: int, teclas_por_seg: float) -> None:
+    r = medir(db_url, usuarios=usuarios, teclas_por_seg=teclas_por_seg)
+    print(f"Índice: {r['productos']} productos construidos en {r['construccion_ms']} ms")
+    print(f"{r['consultas']} consultas a {r['qps']} qps ({usuarios} usuarios a {teclas_por_seg} teclas/s)")
+    print(f"latencia p50 {r['p50_ms']} ms  p95 {r['p95_ms']} ms  p99 {r['p99_ms']} ms")
+    print(f"actualización incremental: {r['actualizacion_por_producto_ms']} ms por producto")
@@ -18,17 +18,90 @@ class Settings(BaseSettings):
     DB_PASSWORD: str = "Losurales2163%40"
     DB_NAME: str = "ferreteria_db"
     DATABASE_URL: str = ""
+    DATABASE_REPLICA_URLS: list[str] = []  # Réplicas de solo lectura (vacío = todo al primario)
+    REPLICA_LAG_TOLERANCIA_SEG: float = 2.0  # Ventana tras una escritura en que el cliente lee del primario
+
+    # Pool de conexiones
+    DB_POOL_SIZE: int = 10          # Conexiones permanentes del pool
+    DB_MAX_OVERFLOW: int = 20       # Conexiones adicionales permitidas
+    DB_POOL_TIMEOUT: int = 30       # Segundos de espera máxima por una conexión libre
+    DB_POOL_RECYCLE: int = 3600     # Reciclar conexiones cada hora
+    DB_POOL_PRE_PING: bool = True   # Verificar conexiones antes de usarlas
+    DB_LECTURA_AUTOCOMMIT: bool = True  # Lecturas GET por un pool en AUTOCOMMIT (sin BEGIN/ROLLBACK)
+    DB_FUGA_UMBRAL_SEG: float = 30.0  # Retención que se reporta como posible fuga (0 = desactivado)
+
+    # Perfilado SQL por request
+    SQL_ECHO: bool = False            # Registrar todas las sentencias SQL en el log
+    SQL_PERFIL_ACTIVO: bool = True    # Contar consultas y tiempo de BD por request
+    SQL_N_MAS_1_UMBRAL: int = 5       # Repeticiones de un mismo SELECT que se marcan como N+1
+    SLOW_REQUEST_MS: int = 500        # Requests más lentas se registran con su perfil SQL
 
     # Configuración Webpay
     WEBPAY_COMMERCE_CODE: str = "597055555532"
     WEBPAY_API_KEY: str = ""
     WEBPAY_ENV: str = "INTEGRACION"
     WEBPAY_SIMULATOR: bool = True  # ← agregado
+    WEBPAY_MONTO_SIN_ITEMS: bool = False  # Aceptar solo `amount` sin carrito (monto del cliente, sin validar)
 
     # Configuración Banco Central
     BANCO_CENTRAL_API_URL: AnyUrl = "https://api.sbif.cl/api-sbifv3/recursos_api"
     BANCO_CENTRAL_API_KEY: str = ""
 
+    # Límite de tasa por ruta ("METODO /ruta": "N/segundo|minuto|hora"), por IP y por usuario
+    RATE_LIMIT_ACTIVO: bool = True
+    RATE_LIMIT_POLITICAS: dict[str, str] = {
+        "POST /api/usuarios/login": "10/minuto",
+        "POST /api/usuarios/": "5/minuto",
+        "POST /api/pagos/webpay/iniciar": "20/minuto",
+        "GET /api/pagos/webpay/confirmar/{token}": "30/minuto",
+        "GET /api/pagos/webpay/estado/{token}": "30/minuto",  # También confirma en Webpay y escribe
+    }
+    RATE_LIMIT_CONCURRENCIA: dict[str, int] = {  # Requests simultáneas por worker
+        "POST /api/usuarios/login": 4,
+        "POST /api/pagos/webpay/iniciar": 8,
+    }
+    RATE_LIMIT_COMPARTIDO: bool = False  # Buckets en la caché compartida (varios workers)
+    RATE_LIMIT_CONFIAR_PROXY: bool = False  # Tomar la IP de X-Forwarded-For
+
+    # Tipos de cambio (serie local tipos_cambio)
+    TIPOS_CAMBIO_SYNC_ACTIVO: bool = True  # Actualización incremental en segundo plano
+    TIPOS_CAMBIO_SYNC_HORAS: float = 24.0  # Intervalo entre actualizaciones
+
+    # Configuración de mensajes de contacto (escritura diferida)
+    CONTACTO_LOTE: int = 100  # Mensajes por INSERT en lote
+    CONTACTO_FLUSH_SEG: float = 1.0  # Máximo tiempo que un mensaje espera en la cola
+    CONTACTO_COLA_MAX: int = 10000  # Sobre este tamaño se responde 503
+
+    # Configuración de caché
+    CACHE_TTL_CATALOGO: int = 3600  # Segundos de vida de listados del catálogo (se invalidan por el registro de cambios)
+    CACHE_LOCAL_MAX_MB: int = 32  # Tamaño máximo del nivel LRU en memoria de cada worker
+    CACHE_COMPARTIDA_ACTIVA: bool = True  # Nivel compartido entre workers (SQLite en disco local)
+    CACHE_DIR: str = ""  # Directorio del nivel compartido (vacío: directorio temporal del sistema)
+    CACHE_VERSION_TTL_SEG: float = 1.0  # Cada cuánto relee un worker la versión de los namespaces
+
+    # Configuración de facetas del catálogo (índice de bitmaps en memoria)
+    FACETAS_TRAMOS_PRECIO: list[int] = [5000, 10000, 25000, 50000, 100000]  # Límites de los tramos de precio (CLP)
+    FACETAS_TRAMOS_STOCK: list[int] = [1, 11, 51, 101]  # Límites de los tramos de stock (el primero aparta "sin stock")
+
+    # Configuración del registro de cambios (invalidación entre workers)
+    CAMBIOS_INTERVALO_SEG: float = 0.5  # Cada cuánto lee cada worker los cambios nuevos
+    CAMBIOS_LOTE: int = 1000  # Cambios por lectura
+    CAMBIOS_RETENCION_DIAS: int = 30  # Antigüedad a partir de la cual se purgan
+    SINCRONIZACION_MARGEN_SEG: float = 5.0  # Un hueco en la secuencia más reciente que esto puede ser una transacción sin confirmar
+
+    # Configuración del inventario (libro de movimientos de stock)
+    INVENTARIO_CORTES_ACTIVO: bool = True  # Corte diario de stock en segundo plano
+    INVENTARIO_CORTES_HORAS: float = 6.0  # Cada cuánto se revisa si falta el corte del último día
+
+    # Configuración de la portada (destacados y lanzamientos precalculados)
+    PORTADA_ACTIVA: bool = True  # Servir /productos-destacados/ y /lanzamientos/ desde memoria
+    PORTADA_INTERVALO_SEG: float = 300.0  # Reconstrucción periódica (además de la que disparan las escrituras)
+
+    # Configuración de resúmenes de pagos (dashboard de empleados)
+    RESUMEN_PAGOS_ACTIVO: bool = True  # Actualización incremental en segundo plano
+    RESUMEN_PAGOS_INTERVALO_SEG: float = 60.0  # Cada cuánto se recalculan las horas con pagos modificados
+    RESUMEN_PAGOS_MARGEN_SEG: float = 120.0  # Los pagos modificados hace menos que esto esperan a la siguiente pasada
+
     # Validaciones
     @field_validator("APP_ENV")
     @classmethod
@@ -52,8 +125,9 @@ class Settings(BaseSettings):
 
 settings = Settings()
 
-# Generar la URL de base de datos con las variables cargadas
-settings.DATABASE_URL = (
-    f"mysql+mysqlconnector://{settings.DB_USER}:{settings.DB_PASSWORD}"
-    f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
-)
+# Generar la URL de base de datos con las variables cargadas (si no se definió explícitamente)
+if not settings.DATABASE_URL:
+    settings.DATABASE_URL = (
+        f"mysql+mysqlconnector://{settings.DB_USER}:{settings.DB_PASSWORD}"
+        f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
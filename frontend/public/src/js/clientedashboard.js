@@ -317,6 +317,7 @@ async function initPayment(productCode, amount) {
         buy_order: `ORD-${Date.now()}`,
         session_id: localStorage.getItem("username") || 'guest',
         amount: amount,
+        items: [{ codigo: productCode, cantidad: 1 }],
         return_url: `${window.location.origin}/pago-exitoso.html`
       })
     });
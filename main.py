@@ -1,23 +1,29 @@
-from fastapi import FastAPI, Request, status, Depends, HTTPException
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse, HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.security import HTTPBearer
 from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 import logging
 from datetime import datetime
 from pathlib import Path
-import jwt  # Asegúrate de tener instalado PyJWT
 
 from config import settings
+from app.core.cache import cache
 from app.core.cors import setup_cors
+from app.core.http import RespuestaJSON
 from app.core.middlewares import setup_middlewares
-from app.data.database import get_db
-SECRET_KEY = "h3n1234sdfg1234h3n1234sdfg1234h3n1234sdfg1234"
-ALGORITHM = "HS256"
+from app.core.paginas import PaginasHTML
+from app.data.database import engine, todos_los_engines
+from app.data.pool_monitor import monitor_pool
+from app.services.cambios import seguidor_cambios
+from app.services.inventario import programador_cortes
+from app.services.resumen_pagos import actualizador_resumen_pagos
+from app.services.portada import constructor_portada
+from app.services.mensajes import cola_mensajes
+from app.services.tipos_cambio import actualizador_tipos_cambio
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # Routers de la API
@@ -25,7 +31,8 @@ from app.api import (
     productos_router,
     pagos_router,
     usuarios_router,
-    divisas_router
+    divisas_router,
+    contacto_router
 )
 
 app = FastAPI(
@@ -34,26 +41,10 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=RespuestaJSON,
     debug=settings.DEBUG
 )
 
-# Seguridad con HTTP Bearer (JWT)
-security = HTTPBearer()
-
-# Dependencia para obtener el usuario actual a partir del JWT
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-        # Aquí podrías consultar la base de datos para obtener el usuario si lo necesitas
-        return {"user_id": user_id}
-    except jwt.ExpiredSignatureError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token expirado")
-    except jwt.InvalidTokenError:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token inválido")
-
 logging.basicConfig(
     level=logging.DEBUG if settings.DEBUG else logging.INFO,
     format='%(asctime)s - %(levelname)s - %(name)s - %(message)s',
@@ -67,6 +58,7 @@ app = FastAPI(
     version=settings.APP_VERSION,
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
+    default_response_class=RespuestaJSON,
     debug=settings.DEBUG
 )
 
@@ -110,45 +102,48 @@ app.mount("/js", StaticFiles(directory="frontend/public/src/js"), name="js")
 
 # Templates
 BASE_DIR = Path(__file__).resolve().parent
-templates = Jinja2Templates(directory=str(BASE_DIR / "frontend" / "public" / "src" / "html"))
+
+# Página del dashboard mientras no exista frontend/public/src/html/dashboard.html
+DASHBOARD_RESPALDO = """
+<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Dashboard - Ferremas</title>
+    <link rel="stylesheet" href="/css/style.css">
+</head>
+<body>
+    <div class="header">
+        <h1>Dashboard Ferremas</h1>
+        <button class="logout" onclick="logout()">Cerrar Sesión</button>
+    </div>
+    <script>
+        function logout() {
+            fetch('/api/usuarios/logout', {
+                method: 'POST'
+            }).finally(() => {
+                window.location.href = '/';
+            });
+        }
+    </script>
+</body>
+</html>
+"""
+
+# Se compilan al arrancar; cada página se renderiza una vez por versión de la app
+paginas = PaginasHTML(BASE_DIR / "frontend" / "public" / "src" / "html", recargar=settings.DEBUG)
+paginas.registrar("login.html")
+paginas.registrar("dashboard.html", respaldo=DASHBOARD_RESPALDO)
 
 # Rutas del frontend
 @app.get("/", response_class=HTMLResponse, tags=["Frontend"])
 async def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return paginas.respuesta(request, "login.html", version=settings.APP_VERSION)
 
 @app.get("/dashboard", response_class=HTMLResponse, tags=["Frontend"])
 async def dashboard_page(request: Request):
-    try:
-        return templates.TemplateResponse("dashboard.html", {"request": request})
-    except:
-        dashboard_html = """
-        <!DOCTYPE html>
-        <html lang="es">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>Dashboard - Ferremas</title>
-            <link rel="stylesheet" href="/css/style.css">
-        </head>
-        <body>
-            <div class="header">
-                <h1>Dashboard Ferremas</h1>
-                <button class="logout" onclick="logout()">Cerrar Sesión</button>
-            </div>
-            <script>
-                function logout() {
-                    fetch('/api/usuarios/logout', {
-                        method: 'POST'
-                    }).finally(() => {
-                        window.location.href = '/';
-                    });
-                }
-            </script>
-        </body>
-        </html>
-        """
-        return HTMLResponse(dashboard_html)
+    return paginas.respuesta(request, "dashboard.html", version=settings.APP_VERSION)
 
 # Ejemplo: proteger rutas incluyendo en los routers
 app.include_router(
@@ -179,6 +174,12 @@ app.include_router(
     
 )
 
+app.include_router(
+    contacto_router,
+    prefix="/api/contacto",
+    tags=["Contacto"],
+)
+
 # Exception handler
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -193,33 +194,50 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 async def startup_event():
     try:
         logger.info("🚀 Iniciando aplicación en modo %s", settings.APP_ENV.upper())
-        db = next(get_db())
-        result = db.execute(text("SELECT 1")).fetchone()
+        paginas.precompilar()
+        with engine.connect() as conn:
+            result = conn.execute(text("SELECT 1")).fetchone()
         if result:
             logger.info("✅ Conexión a la base de datos establecida correctamente")
+        monitor_pool.iniciar_detector()
+        cola_mensajes.iniciar()
+        seguidor_cambios.iniciar()
+        if settings.TIPOS_CAMBIO_SYNC_ACTIVO:
+            actualizador_tipos_cambio.iniciar()
+        if settings.INVENTARIO_CORTES_ACTIVO:
+            programador_cortes.iniciar()
+        if settings.RESUMEN_PAGOS_ACTIVO:
+            actualizador_resumen_pagos.iniciar()
+        if settings.PORTADA_ACTIVA:
+            constructor_portada.iniciar()
     except SQLAlchemyError as e:
         logger.error(f"❌ Error al conectar con la base de datos: {e}")
         raise
     except Exception as e:
         logger.error(f"❌ Error durante el startup: {e}")
         raise
-    finally:
-        if 'db' in locals():
-            db.close()
+
+# Shutdown event
+@app.on_event("shutdown")
+def shutdown_event():
+    # Guardar los mensajes de contacto que sigan en la cola
+    cola_mensajes.detener()
+    seguidor_cambios.detener()
+    actualizador_tipos_cambio.detener()
+    programador_cortes.detener()
+    actualizador_resumen_pagos.detener()
+    constructor_portada.detener()
 
 # Health check
 @app.get("/health", tags=["General"])
 def health_check():
     try:
-        db = next(get_db())
-        db.execute(text("SELECT 1"))
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
         db_status = "ok"
     except Exception as e:
         logger.error(f"Database health check failed: {e}")
         db_status = "error"
-    finally:
-        if 'db' in locals():
-            db.close()
     
     return {
         "status": "healthy" if db_status == "ok" else "degraded",
@@ -228,6 +246,16 @@ def health_check():
         "timestamp": datetime.utcnow().isoformat()
     }
 
+# Estado del pool de conexiones (solo en modo debug)
+if settings.DEBUG:
+    @app.get("/debug/pool", tags=["General"])
+    def debug_pool():
+        return monitor_pool.estado(todos_los_engines())
+
+    @app.get("/debug/cache", tags=["General"])
+    def debug_cache():
+        return cache.metricas()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(